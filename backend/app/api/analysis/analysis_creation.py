@@ -318,7 +318,8 @@ async def create_pending_analysis(
     # Store prompt information in metadata
     analysis.analysis_metadata = {
         "prompt_id": prompt_id,
-        "analysis_type": analysis_type
+        "analysis_type": analysis_type,
+        "bypass_cache": bool(request.get("bypass_cache", False))
     }
     db.commit()
     
@@ -434,7 +435,8 @@ async def create_pending_analyses_batch(
             analysis.analysis_metadata = {
                 "prompt_id": prompt_id,
                 "analysis_type": analysis_type,
-                "batch_analysis": True
+                "batch_analysis": True,
+                "bypass_cache": bool(request.get("bypass_cache", False))
             }
             
             created_analyses.append({
@@ -463,7 +465,8 @@ async def create_pending_analyses_batch(
             analysis.analysis_metadata = {
                 "prompt_id": prompt_id,
                 "analysis_type": analysis_type,
-                "batch_analysis": True
+                "batch_analysis": True,
+                "bypass_cache": bool(request.get("bypass_cache", False))
             }
             
             created_analyses.append({
@@ -570,7 +573,8 @@ async def analyze_file(
     analysis.analysis_metadata = {
         "prompt_id": prompt_id,
         "prompt_data": prompt_data,
-        "provider_priority": provider_priority
+        "provider_priority": provider_priority,
+        "bypass_cache": bool(request.get("bypass_cache", False))
     }
     db.commit()
     
@@ -3,14 +3,18 @@ Gestion des analyses - Endpoints de gestion et contrôle des analyses
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import asyncio
+import json
 import logging
 from sqlalchemy import desc, asc
 
-from ...core.database import get_db
+from ...core.database import get_db, SessionLocal
 from ...core.permissions import require_permission, Permissions, Features
 from ...services.analysis_service import AnalysisService
+from ...services.analysis_stream_broker import analysis_stream_broker
 from ...models.analysis import Analysis, AnalysisStatus
 from ...models.file import File
 from ...models.user import User
@@ -155,6 +159,84 @@ async def get_analysis_by_id(
     )
 
 
+@router.get("/{analysis_id}/stream")
+@require_permission(Permissions.READ_ANALYSES, Features.ANALYSIS_VIEWING)
+async def stream_analysis(
+    analysis_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream an analysis over SSE: partial tokens, progress steps, then the final result
+    """
+    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    def final_event(current: Optional[Analysis]) -> Optional[Dict[str, Any]]:
+        if current is None:
+            # Supprimée pendant le streaming
+            return {"type": "failed", "error": "Analysis not found"}
+        if current.status == AnalysisStatus.COMPLETED:
+            return {"type": "completed", "result": current.result}
+        if current.status == AnalysisStatus.FAILED:
+            return {"type": "failed", "error": current.error_message}
+        return None
+
+    def reload() -> Optional[Analysis]:
+        # La session de la requête peut être fermée pendant le streaming : session dédiée
+        stream_db = SessionLocal()
+        try:
+            return stream_db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        finally:
+            stream_db.close()
+
+    async def event_stream():
+        # S'abonner avant de relire le statut pour ne pas rater la fin de l'analyse
+        queue = analysis_stream_broker.subscribe(analysis_id)
+        try:
+            current = await asyncio.to_thread(reload)
+            event = final_event(current)
+            if event:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                return
+
+            snapshot = {
+                "type": "snapshot",
+                "status": current.status.value,
+                "progress": current.progress,
+                "step": current.current_step,
+                "result": analysis_stream_broker.get_partial(analysis_id) or current.result
+            }
+            yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep-alive, et filet de sécurité si l'analyse s'est terminée ailleurs
+                    event = final_event(await asyncio.to_thread(reload))
+                    if not event:
+                        yield ": keepalive\n\n"
+                        continue
+
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event["type"] in ("completed", "failed"):
+                    return
+        finally:
+            analysis_stream_broker.unsubscribe(analysis_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.get("/stats")
 @APIUtils.handle_errors
 async def get_analysis_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
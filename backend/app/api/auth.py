@@ -249,43 +249,37 @@ async def refresh_token(
         )
     )
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Récupérer l'utilisateur connecté (fonction utilitaire)"""
+def authenticate_token(token: str, db: Session) -> User:
+    """Utilisateur actif d'un token d'accès, ou HTTPException 401 (caches de token et d'utilisateur)"""
     auth_service = AuthService(db)
     
-    logger.info(f"🔐 Vérification du token: {credentials.credentials[:20]}...")
-        
     # Vérifier le token
-    payload = auth_service.verify_token(credentials.credentials)
-    logger.info(f"🔐 Payload du token: {payload}")
-    
+    payload = auth_service.verify_token(token)
     if not payload or payload.get("type") != "access":
-        logger.error(f"❌ Token invalide - Payload: {payload}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token invalide"
         )
-        
+    
     # Récupérer l'utilisateur
     user_id = int(payload.get("sub"))
-    logger.info(f"🔐 User ID extrait: {user_id}")
-    
-    user = auth_service.get_user_by_id(user_id)
-    logger.info(f"🔐 Utilisateur trouvé: {user.username if user else 'None'}")
-    
-    if not user or not user.is_active:
-        logger.error(f"❌ Utilisateur non trouvé ou désactivé: {user_id}")
+    user = auth_service.get_authenticated_user(user_id)
+    if not user:
+        logger.warning(f"Utilisateur non trouvé ou désactivé: {user_id}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Utilisateur non trouvé ou désactivé"
         )
     
-    logger.info(f"[SUCCESS] Authentification réussie pour: {user.username}")
     return user
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Récupérer l'utilisateur connecté (fonction utilitaire)"""
+    return authenticate_token(credentials.credentials, db)
+
 @router.get("/me", response_model=UserInfo)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user)
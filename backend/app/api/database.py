@@ -14,6 +14,7 @@ from pathlib import Path
 from ..core.database import get_db
 from ..models.file import File, FileStatus
 from ..models.analysis import Analysis
+from ..services.analysis_worker_pool import QUEUED_STEP
 
 from ..core.database_migration import DatabaseMigrationManager, check_database_consistency
 from ..schemas.database import (
@@ -415,7 +416,8 @@ async def retry_analysis(analysis_id: int, db: Session = Depends(get_db)):
         # Réinitialiser l'analyse pour la relancer
         analysis.status = 'pending'
         analysis.progress = 0.0
-        analysis.current_step = None
+        # Reprise par le pool de workers au prochain passage sur la base
+        analysis.current_step = QUEUED_STEP
         analysis.error_message = None
         analysis.started_at = None
         analysis.completed_at = None
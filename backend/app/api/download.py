@@ -87,7 +87,7 @@ async def download_directory(
         session_token: Token de session (injecté automatiquement)
         
     Returns:
-        FileResponse: Fichier ZIP à télécharger
+        StreamingResponse: Archive ZIP générée pendant l'envoi
     """
     # Décoder le chemin du répertoire
     decoded_path = urllib.parse.unquote(directory_path)
@@ -113,7 +113,7 @@ async def download_multiple_files(
         session_token: Token de session (injecté automatiquement)
         
     Returns:
-        FileResponse: Fichier ZIP à télécharger
+        StreamingResponse: Archive ZIP générée pendant l'envoi
     """
     # Convertir les chemins en objets Path
     file_paths = [Path(urllib.parse.unquote(path)) for path in request.file_paths]
@@ -2,8 +2,8 @@
 File management endpoints for DocuSense AI
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header, UploadFile, Form, status
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, Header, UploadFile, Form, status
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
@@ -18,8 +18,10 @@ import urllib.parse
 
 from ..core.database import get_db
 from ..services.file_service import FileService
+from ..services.search_service import SearchService
 from ..services.download_service import download_service
 from ..core.file_validation import FileValidator
+from ..core.http_ranges import build_file_response, etag_matches
 from ..models.file import FileStatus
 from ..models.user import User
 from ..schemas.file import FileListResponse, FileStatusUpdate
@@ -241,6 +243,32 @@ async def get_selected_files(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/search")
+@APIUtils.monitor_api_performance
+async def search_content(
+    q: str = Query(..., min_length=1, max_length=500, description="Texte recherché"),
+    scope: str = Query("all", pattern="^(all|files|analyses)$", description="Fichiers, analyses ou les deux"),
+    page: int = Query(1, ge=1, description="Numéro de page"),
+    page_size: int = Query(20, ge=1, le=100, description="Taille de page"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recherche plein texte classée dans les noms, textes extraits et résultats d'analyse
+    """
+    try:
+        result = SearchService(db).search(q, scope=scope, page=page, page_size=page_size)
+        return ResponseFormatter.success_response(
+            data=result,
+            message=f"{result['total']} résultat(s) pour « {q} »"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erreur lors de la recherche '{q}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/list/{directory:path}")
 @APIUtils.monitor_api_performance
 async def list_directory_content(
@@ -248,10 +276,13 @@ async def list_directory_content(
     page: int = Query(1, ge=1, description="Numéro de page"),
     page_size: int = Query(50, ge=1, le=1000, description="Taille de page"),
     offset: int = Query(0, ge=0, description="Offset"),
+    sort_by: str = Query("name", pattern="^(name|size|mtime|status)$", description="Champ de tri"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Ordre de tri"),
+    cursor: Optional[str] = Query(None, description="Curseur next_cursor/previous_cursor d'une page précédente"),
     db: Session = Depends(get_db)
 ):
     """
-    Liste le contenu d'un répertoire avec pagination
+    Liste le contenu d'un répertoire avec pagination par curseur
     """
     try:
         # Décoder le chemin et valider le répertoire
@@ -259,9 +290,13 @@ async def list_directory_content(
         
         # Continuer avec la logique existante
         file_service = FileService(db)
-        result = file_service.list_directory_content_paginated(
-            decoded_directory, page, page_size, offset
-        )
+        try:
+            result = file_service.list_directory_content_paginated(
+                decoded_directory, page, page_size, offset,
+                sort_by=sort_by, order=order, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Vérifier si le résultat indique un disque non accessible
         if not result.get("success", True) and result.get("error") in ["DISK_LOCKED", "DISK_NOT_READY", "DISK_ERROR"]:
@@ -569,7 +604,7 @@ class DownloadSelectedRequest(BaseModel):
 async def download_selected_files(
     request: DownloadSelectedRequest,
     db: Session = Depends(get_db)
-) -> FileResponse:
+) -> StreamingResponse:
     """
     Download selected files as a ZIP archive
     """
@@ -681,10 +716,14 @@ async def test_media_compatibility(file_path: str) -> Dict[str, Any]:
 @router.get("/stream-by-path/{file_path:path}")
 async def stream_file_by_path(
     file_path: str,
+    request: Request,
     native: bool = Query(False, description="Stream natif sans conversion"),
     hls: bool = Query(False, description="Stream HLS pour vidéos"),
     direct: bool = Query(False, description="Téléchargement direct"),
     html: bool = Query(False, description="Conversion en HTML pour Office"),
+    page: int = Query(1, ge=1, description="Page du rendu HTML Office"),
+    page_size: int = Query(5, ge=1, le=50, description="Feuilles, diapositives ou sections par page HTML"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -725,115 +764,25 @@ async def stream_file_by_path(
                 office_viewer = OfficeViewerService(db)
                 
                 if office_viewer.is_format_supported(extension):
-                    result = await office_viewer.convert_to_html(str(file_path_obj))
+                    # ETag calculé depuis (chemin, mtime, taille) : pas de conversion pour un 304
+                    etag = office_viewer.get_page_etag(str(file_path_obj), page, page_size)
+                    cache_headers = {
+                        "ETag": etag,
+                        # Revalidation à chaque ouverture, le rendu est servi par le cache disque
+                        "Cache-Control": "private, no-cache",
+                    }
+                    if etag_matches(if_none_match, etag):
+                        return Response(status_code=304, headers=cache_headers)
+                    
+                    result = await office_viewer.render_page(str(file_path_obj), page, page_size)
                     
                     if result["success"]:
-                        html_content = result["data"]["html"]
-                        
-                        # Créer une page HTML complète avec styles
-                        full_html = f"""
-                        <!DOCTYPE html>
-                        <html lang="fr">
-                        <head>
-                            <meta charset="UTF-8">
-                            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                            <title>{file_path_obj.name}</title>
-                            <style>
-                                body {{
-                                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                                    margin: 0;
-                                    padding: 20px;
-                                    background-color: #1e293b;
-                                    color: #e2e8f0;
-                                    line-height: 1.6;
-                                }}
-                                .office-document, .office-spreadsheet, .office-presentation {{
-                                    max-width: 1200px;
-                                    margin: 0 auto;
-                                    background-color: #334155;
-                                    padding: 30px;
-                                    border-radius: 8px;
-                                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                                }}
-                                .document-title {{
-                                    color: #3b82f6;
-                                    border-bottom: 2px solid #3b82f6;
-                                    padding-bottom: 10px;
-                                    margin-bottom: 30px;
-                                }}
-                                .paragraph {{
-                                    margin-bottom: 15px;
-                                    text-align: justify;
-                                }}
-                                .document-table, .spreadsheet-table {{
-                                    width: 100%;
-                                    border-collapse: collapse;
-                                    margin: 20px 0;
-                                    background-color: #475569;
-                                }}
-                                .document-table td, .spreadsheet-table td {{
-                                    border: 1px solid #64748b;
-                                    padding: 8px 12px;
-                                    text-align: left;
-                                }}
-                                .document-table tr:nth-child(even), .spreadsheet-table tr:nth-child(even) {{
-                                    background-color: #526480;
-                                }}
-                                .sheet-title, .slide-title {{
-                                    color: #10b981;
-                                    margin: 25px 0 15px 0;
-                                    font-size: 1.2em;
-                                }}
-                                .slide {{
-                                    margin: 20px 0;
-                                    padding: 20px;
-                                    background-color: #475569;
-                                    border-radius: 6px;
-                                    border-left: 4px solid #10b981;
-                                }}
-                                .slide-text {{
-                                    margin: 10px 0;
-                                }}
-                                .spreadsheet-content, .presentation-content {{
-                                    background-color: #475569;
-                                    padding: 20px;
-                                    border-radius: 6px;
-                                    margin: 15px 0;
-                                }}
-                                .spreadsheet-text, .presentation-text {{
-                                    white-space: pre-wrap;
-                                    font-family: 'Courier New', monospace;
-                                    font-size: 0.9em;
-                                    line-height: 1.4;
-                                }}
-                                .fallback {{
-                                    text-align: center;
-                                    padding: 40px;
-                                }}
-                                .fallback-message {{
-                                    background-color: #dc2626;
-                                    color: #fecaca;
-                                    padding: 20px;
-                                    border-radius: 6px;
-                                    margin: 20px 0;
-                                }}
-                                .fallback-message p {{
-                                    margin: 10px 0;
-                                }}
-                            </style>
-                        </head>
-                        <body>
-                            {html_content}
-                        </body>
-                        </html>
-                        """
-                        
                         return Response(
-                            content=full_html,
+                            content=result["data"]["html"],
                             media_type="text/html",
                             headers={
                                 "Content-Disposition": f"inline; filename={file_path_obj.stem}.html",
-                                "Cache-Control": "public, max-age=3600",  # 1h pour les conversions
+                                **cache_headers,
                             }
                         )
                     else:
@@ -857,34 +806,39 @@ async def stream_file_by_path(
         if mime_type.startswith('image/'):
             native = True
         
+        # Range/If-Range (206), If-None-Match/If-Modified-Since (304) gérés pour toutes les réponses fichier
+        attachment = {"Content-Disposition": f"attachment; filename*=utf-8''{urllib.parse.quote(file_path_obj.name)}"}
+        
         # Si téléchargement direct demandé
         if direct:
-            return FileResponse(
-                path=str(file_path_obj),
-                filename=file_path_obj.name,
-                media_type=mime_type
+            return build_file_response(
+                file_path_obj,
+                request_headers=request.headers,
+                media_type=mime_type,
+                headers=attachment
             )
         
         # Stream natif pour PDFs et images
         if native or mime_type == 'application/pdf' or mime_type.startswith('image/'):
             # OPTIMISATION: Cache plus agressif pour les images et PDFs
             cache_headers = {
-                "Content-Disposition": f"inline; filename={file_path_obj.name}",
-                "Cache-Control": "public, max-age=86400, immutable",  # 24h pour les fichiers statiques
-                "ETag": f'"{file_path_obj.stat().st_mtime}"'  # ETag basé sur la date de modification
+                "Content-Disposition": f"inline; filename*=utf-8''{urllib.parse.quote(file_path_obj.name)}",
+                "Cache-Control": "public, max-age=86400",  # 24h, puis revalidation par ETag
             }
             
-            return FileResponse(
-                path=str(file_path_obj),
+            return build_file_response(
+                file_path_obj,
+                request_headers=request.headers,
                 media_type=mime_type,
                 headers=cache_headers
             )
         
         # Pour les autres types, téléchargement par défaut
-        return FileResponse(
-            path=str(file_path_obj),
-            filename=file_path_obj.name,
-            media_type=mime_type
+        return build_file_response(
+            file_path_obj,
+            request_headers=request.headers,
+            media_type=mime_type,
+            headers=attachment
         )
         
     except HTTPException:
@@ -966,8 +920,6 @@ async def download_multiple_files_by_path(
     """
     try:
         from urllib.parse import unquote
-        import tempfile
-        import zipfile
         from datetime import datetime
         
         # Décoder les chemins
@@ -985,27 +937,11 @@ async def download_multiple_files_by_path(
         if not valid_paths:
             raise HTTPException(status_code=404, detail="Aucun fichier valide trouvé")
         
-        # Créer un fichier ZIP temporaire
+        # Archive générée à la volée pendant l'envoi
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         zip_name = request.zip_name or f"documents_{timestamp}.zip"
         
-        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_zip:
-            with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in valid_paths:
-                    try:
-                        # Ajouter le fichier au ZIP avec un nom relatif
-                        zipf.write(file_path, file_path.name)
-                    except Exception as e:
-                        logger.error(f"Erreur lors de l'ajout du fichier {file_path} au ZIP: {e}")
-                        continue
-            
-            # Retourner le fichier ZIP
-            return FileResponse(
-                path=temp_zip.name,
-                filename=zip_name,
-                media_type='application/zip',
-                background=lambda: os.unlink(temp_zip.name)  # Supprimer le fichier temporaire après envoi
-            )
+        return download_service.download_multiple_files(valid_paths, zip_name)
             
     except HTTPException:
         raise
@@ -2,7 +2,7 @@
 API endpoints for log management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
@@ -12,7 +12,7 @@ import asyncio
 import time
 
 from ..core.database import get_db
-from ..core.logging import log_cleanup_manager
+from ..core.logging import log_cleanup_manager, get_frontend_handler
 from ..utils.response_formatter import ResponseFormatter
 from ..utils.api_utils import APIUtils
 
@@ -20,48 +20,75 @@ router = APIRouter(tags=["logs"])
 
 @router.get("/backend/stream")
 @APIUtils.monitor_api_performance
-async def stream_backend_logs():
+async def stream_backend_logs(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    since: Optional[int] = Query(None, ge=0, description="Reprendre après ce numéro de séquence (si pas de Last-Event-ID)")
+):
     """
     Endpoint de streaming des logs backend en temps réel
+    
+    Chaque entrée porte son numéro de séquence comme id SSE : à la reconnexion,
+    le navigateur renvoie Last-Event-ID et le flux reprend sans trou tant que
+    les entrées manquées sont encore dans l'anneau (sinon un événement "gap"
+    indique combien ont été perdues).
     """
+    handler = get_frontend_handler()
+    
+    resume_from = since
+    if last_event_id and last_event_id.isdigit():
+        resume_from = int(last_event_id)
+    if resume_from is not None and resume_from > handler.last_seq:
+        # Numéro d'une exécution précédente du serveur : la séquence a redémarré
+        resume_from = None
+    
+    def format_entry(entry: Dict[str, Any]) -> str:
+        return f"id: {entry['seq']}\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+    
+    def format_gap(missed: int) -> str:
+        gap = {"type": "gap", "missed": missed, "timestamp": datetime.now().isoformat()}
+        return f"data: {json.dumps(gap)}\n\n"
+    
     async def log_stream():
+        # S'abonner avant de relire l'anneau pour ne rien manquer entre les deux
+        queue = handler.subscribe()
         try:
-            from ..core.logging import FrontendLogHandler
-            import logging
-            
-            # Trouver le handler frontend
-            frontend_handler = None
-            root_logger = logging.getLogger()
-            for handler in root_logger.handlers:
-                if isinstance(handler, FrontendLogHandler):
-                    frontend_handler = handler
-                    break
-            
-            if not frontend_handler:
-                # Créer un handler temporaire si nécessaire
-                frontend_handler = FrontendLogHandler()
-                root_logger.addHandler(frontend_handler)
-            
             # Envoyer les logs existants d'abord
-            recent_logs = frontend_handler.get_recent_logs(50)
-            for log in recent_logs:
-                yield f"data: {json.dumps(log, ensure_ascii=False)}\n\n"
+            if resume_from is None:
+                backlog, missed = handler.get_recent_logs(50), 0
+            else:
+                backlog, missed = handler.get_entries_since(resume_from)
+            if missed:
+                yield format_gap(missed)
             
-            # Stream des nouveaux logs
-            last_log_count = len(recent_logs)
+            last_seq = resume_from or 0
+            for entry in backlog:
+                yield format_entry(entry)
+                last_seq = entry["seq"]
+            
+            # Stream des nouveaux logs, poussés par le handler
             while True:
-                await asyncio.sleep(1)  # Vérifier toutes les secondes
+                try:
+                    entry = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                
+                if entry["seq"] <= last_seq:
+                    # Déjà envoyé avec l'historique
+                    continue
                 
-                current_logs = frontend_handler.get_recent_logs(100)
-                if len(current_logs) > last_log_count:
-                    # Envoyer seulement les nouveaux logs
-                    new_logs = current_logs[last_log_count:]
-                    for log in new_logs:
-                        yield f"data: {json.dumps(log, ensure_ascii=False)}\n\n"
-                    last_log_count = len(current_logs)
+                if entry["seq"] == last_seq + 1:
+                    yield format_entry(entry)
+                    last_seq = entry["seq"]
+                    continue
                 
-                # Keep-alive
-                yield f"data: {json.dumps({'type': 'keepalive', 'timestamp': datetime.now().isoformat()})}\n\n"
+                # File de l'abonné saturée : rattrapage depuis l'anneau
+                entries, missed = handler.get_entries_since(last_seq)
+                if missed:
+                    yield format_gap(missed)
+                for missed_entry in entries:
+                    yield format_entry(missed_entry)
+                    last_seq = missed_entry["seq"]
                 
         except Exception as e:
             error_data = {
@@ -70,6 +97,8 @@ async def stream_backend_logs():
                 "timestamp": datetime.now().isoformat()
             }
             yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        finally:
+            handler.unsubscribe(queue)
     
     return StreamingResponse(
         log_stream(),
@@ -77,6 +106,7 @@ async def stream_backend_logs():
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "Cache-Control"
         }
@@ -96,21 +126,7 @@ async def get_logs(
     """
     try:
         # Récupérer les logs récents depuis le buffer frontend
-        from ..core.logging import FrontendLogHandler
-        import logging
-        
-        # Trouver le handler frontend
-        frontend_handler = None
-        root_logger = logging.getLogger()
-        for handler in root_logger.handlers:
-            if isinstance(handler, FrontendLogHandler):
-                frontend_handler = handler
-                break
-        
-        if frontend_handler:
-            recent_logs = frontend_handler.get_recent_logs(limit + offset)
-        else:
-            recent_logs = []
+        recent_logs = get_frontend_handler().get_recent_logs(limit + offset)
         
         # Appliquer les filtres
         filtered_logs = []
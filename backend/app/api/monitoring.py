@@ -46,12 +46,48 @@ async def get_performance_metrics(
         
         # Utiliser les fonctions réintégrées pour les métriques AI
         from ..services.ai_service import get_ai_service
+        from ..services.ai_scheduler import ai_scheduler
         ai_service = get_ai_service(db)
         ai_metrics = {
             "cache_size": ai_service.get_cache_size(),
-            "providers_count": len(ai_service.providers) if hasattr(ai_service, 'providers') else 0
+            "providers_count": len(ai_service.providers) if hasattr(ai_service, 'providers') else 0,
+            "schedulers": ai_scheduler.get_stats()
         }
         
+        # Cache persistant des résultats IA
+        from ..services.ai_result_cache import ai_result_cache
+        ai_metrics["result_cache"] = ai_result_cache.get_stats()
+        
+        # Métriques du pool de workers d'analyse
+        from ..services.analysis_worker_pool import analysis_worker_pool
+        analysis_pool_stats = analysis_worker_pool.get_stats()
+        
+        # Index des répertoires (navigation)
+        from ..services.directory_indexer import directory_indexer
+        directory_index_stats = directory_indexer.get_stats()
+        
+        # Pool de processus d'extraction de texte
+        from ..services.extraction_engine import extraction_engine
+        extraction_stats = extraction_engine.get_stats()
+        from ..services.extraction_cache import extraction_cache
+        extraction_stats["cache"] = extraction_cache.get_stats()
+        
+        # Cache disque des rendus HTML Office
+        from ..services.office_render_cache import office_render_cache
+        office_render_stats = office_render_cache.get_stats()
+        
+        # Empreintes des fichiers servis (hash complet en tâche de fond)
+        from ..services.file_fingerprints import file_fingerprints
+        fingerprint_stats = file_fingerprints.get_stats()
+        
+        # Écriture par lots du journal système
+        from ..services.system_log_writer import system_log_writer
+        system_log_stats = system_log_writer.get_stats()
+        
+        # Caches de l'authentification (jetons vérifiés, utilisateurs)
+        from ..core.auth_cache import auth_cache
+        auth_cache_stats = auth_cache.get_stats()
+        
         # Déterminer le statut global
         cpu_percent = system_metrics.get("cpu_percent", 0)
         memory_percent = system_metrics.get("memory_percent", 0)
@@ -64,6 +100,13 @@ async def get_performance_metrics(
             "downloads": download_stats,
             "database": db_metrics,
             "ai_service": ai_metrics,
+            "analysis_pool": analysis_pool_stats,
+            "directory_index": directory_index_stats,
+            "extraction": extraction_stats,
+            "office_render_cache": office_render_stats,
+            "file_fingerprints": fingerprint_stats,
+            "system_log_writer": system_log_stats,
+            "auth_cache": auth_cache_stats,
             "status": status
         }
         
@@ -7,6 +7,7 @@ from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pathlib import Path
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 
 from ..core.database import get_db
@@ -48,8 +49,10 @@ async def get_secure_file_info(
         
         logger.info(f"Demande d'informations sécurisées pour: {file_path_obj}")
         
-        # Récupérer les informations sécurisées
-        file_info = secure_streaming_service.get_file_info_secure(file_path_obj, current_user.username)
+        # Récupérer les informations sécurisées (stat, base et hash du fichier : hors boucle d'événements)
+        file_info = await asyncio.to_thread(
+            secure_streaming_service.get_file_info_secure, file_path_obj, current_user.username
+        )
         
         return {
             "success": True,
@@ -66,8 +69,9 @@ async def get_secure_file_info(
 @APIUtils.handle_errors
 async def stream_file_for_viewing(
     file_path: str,
+    request: Request,
     current_user: User = Depends(AuthMiddleware.get_current_user_jwt),
-    chunk_size: Optional[int] = Query(8192, description="Taille des chunks en bytes"),
+    chunk_size: Optional[int] = Query(None, description="Taille des chunks en bytes (sans sendfile)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -79,7 +83,7 @@ async def stream_file_for_viewing(
         chunk_size: Taille des chunks (optionnel)
         
     Returns:
-        StreamingResponse: Fichier streamé pour visualisation
+        StreamingResponse: Fichier streamé pour visualisation (206 si Range, 304 si inchangé)
     """
     try:
         from urllib.parse import unquote
@@ -95,7 +99,8 @@ async def stream_file_for_viewing(
             file_path_obj, 
             current_user.username, 
             mode='view', 
-            chunk_size=chunk_size
+            chunk_size=chunk_size,
+            request_headers=request.headers
         )
         
     except HTTPException:
@@ -108,6 +113,7 @@ async def stream_file_for_viewing(
 @APIUtils.handle_errors
 async def download_file_secure(
     file_path: str,
+    request: Request,
     current_user: User = Depends(AuthMiddleware.get_current_user_jwt),
     db: Session = Depends(get_db)
 ):
@@ -134,7 +140,8 @@ async def download_file_secure(
         return secure_streaming_service.stream_file_secure(
             file_path_obj, 
             current_user.username, 
-            mode='download'
+            mode='download',
+            request_headers=request.headers
         )
         
     except HTTPException:
@@ -202,8 +209,9 @@ async def create_temporary_access_token(
 @APIUtils.handle_errors
 async def access_file_with_temp_token(
     temp_token: str,
+    request: Request,
     mode: str = Query('view', description="Mode d'accès: 'view' ou 'download'"),
-    chunk_size: Optional[int] = Query(8192, description="Taille des chunks en bytes"),
+    chunk_size: Optional[int] = Query(None, description="Taille des chunks en bytes (sans sendfile)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -233,7 +241,8 @@ async def access_file_with_temp_token(
             file_path, 
             None,  # Pas de session_token pour les tokens temporaires
             mode=mode, 
-            chunk_size=chunk_size
+            chunk_size=chunk_size,
+            request_headers=request.headers
         )
         
     except HTTPException:
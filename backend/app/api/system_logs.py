@@ -9,11 +9,12 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.models.system_log import (
-    SystemLog, SystemLogResponse, SystemLogListResponse, 
+    SystemLogResponse, SystemLogListResponse, 
     SecurityEventSummary, LogLevel
 )
 from app.models.user import User
 from app.services.system_log_service import SystemLogService
+from app.services.system_log_storage import system_log_storage
 from app.middleware.auth_middleware import get_current_user, require_admin
 from app.core.logging import get_logger
 
@@ -59,26 +60,27 @@ async def get_system_logs(
         from datetime import timedelta
         
         since = datetime.utcnow() - timedelta(hours=hours)
-        query = db.query(SystemLog).filter(SystemLog.timestamp >= since)
+        Log = system_log_storage.log_entity(db, since)
+        query = db.query(Log).filter(Log.timestamp >= since)
         
         # Apply filters
         if level:
-            query = query.filter(SystemLog.level == level)
+            query = query.filter(Log.level == level)
         
         if source:
-            query = query.filter(SystemLog.source == source)
+            query = query.filter(Log.source == source)
         
         if security_only:
-            query = query.filter(SystemLog.is_security_event == True)
+            query = query.filter(Log.is_security_event == True)
         
         if suspicious_only:
-            query = query.filter(SystemLog.is_suspicious == True)
+            query = query.filter(Log.is_suspicious == True)
         
         # Get total count
         total = query.count()
         
         # Get paginated results
-        logs = query.order_by(desc(SystemLog.timestamp)).limit(limit).offset(offset).all()
+        logs = query.order_by(desc(Log.timestamp)).limit(limit).offset(offset).all()
         
         return SystemLogListResponse(
             logs=[SystemLogResponse.from_orm(log) for log in logs],
@@ -232,7 +234,8 @@ async def get_log_sources(
     try:
         from sqlalchemy import distinct
         
-        sources = db.query(distinct(SystemLog.source)).all()
+        Log = system_log_storage.log_entity(db)
+        sources = db.query(distinct(Log.source)).all()
         source_list = [source[0] for source in sources if source[0]]
         
         return {
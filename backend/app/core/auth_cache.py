@@ -0,0 +1,138 @@
+"""
+Caches de l'authentification JWT
+Jetons vérifiés (jusqu'à leur expiration) et utilisateurs (courte durée de vie)
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from .config import settings
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _token_key(token: str) -> str:
+    # Le jeton lui-même n'est jamais conservé en mémoire comme clé
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    """
+    Évite le décodage JWT et la requête utilisateur à chaque requête authentifiée
+
+    - jetons : empreinte SHA-256 du jeton -> payload vérifié, valable jusqu'au
+      `exp` du jeton, au plus `auth_token_cache_size` entrées (LRU) ;
+    - utilisateurs : id -> valeurs des colonnes, pendant `auth_user_cache_ttl`
+      secondes ; l'entrée est invalidée à chaque modification ou suppression
+      de l'utilisateur par l'ORM (rôle, activation, suivi d'usage...).
+    L'utilisateur rendu est rattaché à la session de la requête sans requête
+    SQL : il se modifie et se valide comme un utilisateur chargé normalement.
+    """
+
+    def __init__(self, token_cache_size: Optional[int] = None, user_ttl: Optional[float] = None):
+        self.token_cache_size = token_cache_size or settings.auth_token_cache_size
+        self.user_ttl = user_ttl if user_ttl is not None else settings.auth_user_cache_ttl
+        self.lock = threading.Lock()
+        self._tokens: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._users: Dict[int, Tuple[Dict[str, Any], float]] = {}
+        self.stats = {
+            'token_hits': 0,
+            'token_misses': 0,
+            'user_hits': 0,
+            'user_misses': 0,
+            'user_invalidations': 0
+        }
+
+    # Jetons
+
+    def get_payload(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload d'un jeton déjà vérifié et pas encore expiré (à ne pas modifier)"""
+        key = _token_key(token)
+        with self.lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._tokens.move_to_end(key)
+                self.stats['token_hits'] += 1
+                return entry[0]
+            if entry is not None:
+                del self._tokens[key]
+            self.stats['token_misses'] += 1
+            return None
+
+    def store_payload(self, token: str, payload: Dict[str, Any]) -> None:
+        """Mémorise un payload vérifié jusqu'à l'expiration du jeton (jetons sans `exp` non mémorisés)"""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        key = _token_key(token)
+        with self.lock:
+            self._tokens[key] = (payload, float(expires_at))
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.token_cache_size:
+                self._tokens.popitem(last=False)
+
+    # Utilisateurs
+
+    def get_user(self, db: Session, user_id: int) -> Optional[User]:
+        """Utilisateur en cache rattaché à `db`, ou None (absent ou expiré)"""
+        if self.user_ttl <= 0:
+            return None
+        with self.lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self._users.pop(user_id, None)
+                self.stats['user_misses'] += 1
+                return None
+            self.stats['user_hits'] += 1
+            state = copy.deepcopy(entry[0])
+
+        user = User(**state)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def store_user(self, user: User) -> None:
+        if self.user_ttl <= 0 or user.id is None:
+            return
+        state = {column.key: copy.deepcopy(getattr(user, column.key)) for column in user.__table__.columns}
+        with self.lock:
+            self._users[user.id] = (state, time.monotonic() + self.user_ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self.lock:
+            if self._users.pop(user_id, None) is not None:
+                self.stats['user_invalidations'] += 1
+
+    def clear_users(self) -> None:
+        """Vide le cache des utilisateurs (après une modification en masse, hors ORM)"""
+        with self.lock:
+            self.stats['user_invalidations'] += len(self._users)
+            self._users.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+            stats['cached_tokens'] = len(self._tokens)
+            stats['cached_users'] = len(self._users)
+        stats['token_cache_size'] = self.token_cache_size
+        stats['user_ttl'] = self.user_ttl
+        return stats
+
+
+# Instance globale
+auth_cache = AuthCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    auth_cache.invalidate_user(target.id)
@@ -4,7 +4,7 @@ Configuration settings for DocuSense AI
 
 import os
 import secrets
-from typing import List, Optional
+from typing import List, Optional, Dict
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
 
@@ -36,6 +36,10 @@ class Settings(BaseSettings):
     )
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    auth_token_cache_size: int = Field(
+        default=10000, env="AUTH_TOKEN_CACHE_SIZE")  # Jetons vérifiés gardés en mémoire jusqu'à leur expiration
+    auth_user_cache_ttl: float = Field(
+        default=30.0, env="AUTH_USER_CACHE_TTL")  # seconds, utilisateurs authentifiés en cache (0 = désactivé)
 
     # CORS - OPTIMISATION: Configuration plus restrictive
     cors_origins: List[str] = Field(
@@ -58,6 +62,16 @@ class Settings(BaseSettings):
     rate_limit_requests: int = Field(default=100, env="RATE_LIMIT_REQUESTS")
     rate_limit_window: int = Field(
         default=60, env="RATE_LIMIT_WINDOW")  # seconds
+    rate_limit_user_requests: int = Field(
+        default=0, env="RATE_LIMIT_USER_REQUESTS")  # Par utilisateur authentifié (0 = même limite que par IP)
+    rate_limit_routes: Dict[str, int] = Field(
+        default={"/api/auth/login": 10, "/api/auth/register": 5},
+        env="RATE_LIMIT_ROUTES")  # Préfixe de route -> requêtes par IP et par fenêtre
+    rate_limit_exempt_paths: List[str] = Field(
+        default=["/api/health", "/api/secure-streaming/", "/api/files/stream-by-path/"],
+        env="RATE_LIMIT_EXEMPT_PATHS")  # Requêtes Range d'un lecteur multimédia : trop nombreuses pour être limitées
+    rate_limit_trusted_proxies: List[str] = Field(
+        default=[], env="RATE_LIMIT_TRUSTED_PROXIES")  # IP/réseaux des reverse proxies dont X-Forwarded-For est cru
 
     # AI Providers - NOUVEAU: Chargement depuis la base de données au démarrage
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
@@ -70,30 +84,110 @@ class Settings(BaseSettings):
         env="OLLAMA_BASE_URL"
     )
 
+    # AI Providers - Limites de concurrence et de débit par provider (0 = illimité)
+    ai_rate_limits: Dict[str, Dict[str, int]] = Field(
+        default={
+            "openai": {"max_concurrent": 4, "requests_per_minute": 60, "tokens_per_minute": 90000},
+            "claude": {"max_concurrent": 4, "requests_per_minute": 50, "tokens_per_minute": 40000},
+            "mistral": {"max_concurrent": 2, "requests_per_minute": 60, "tokens_per_minute": 60000},
+            "gemini": {"max_concurrent": 2, "requests_per_minute": 60, "tokens_per_minute": 32000},
+            "ollama": {"max_concurrent": 1, "requests_per_minute": 0, "tokens_per_minute": 0},
+            "default": {"max_concurrent": 2, "requests_per_minute": 30, "tokens_per_minute": 0}
+        },
+        env="AI_RATE_LIMITS")
+    ai_max_output_tokens: int = Field(default=2000, env="AI_MAX_OUTPUT_TOKENS")
+    # Taille max (tokens estimés) du document envoyé en un seul appel ; au-delà, analyse par morceaux
+    ai_chunk_token_budget: int = Field(default=6000, env="AI_CHUNK_TOKEN_BUDGET")
+    ai_streaming_enabled: bool = Field(default=True, env="AI_STREAMING_ENABLED")
+    ai_stream_flush_interval: float = Field(
+        default=2.0, env="AI_STREAM_FLUSH_INTERVAL")  # seconds between partial writes to Analysis.result
+    ai_rate_limit_backoff: float = Field(
+        default=20.0, env="AI_RATE_LIMIT_BACKOFF")  # seconds, quand le provider ne renvoie pas Retry-After
+
     # Redis (optional)
     redis_url: Optional[str] = Field(default=None, env="REDIS_URL")
 
     # Logging
     log_level: str = Field(default="WARNING", env="LOG_LEVEL")  # OPTIMISATION: Réduit de INFO à WARNING
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    system_log_batch_size: int = Field(
+        default=200, env="SYSTEM_LOG_BATCH_SIZE")  # Événements SystemLog insérés par lot
+    system_log_flush_interval: float = Field(
+        default=1.0, env="SYSTEM_LOG_FLUSH_INTERVAL")  # seconds, écriture d'un lot incomplet
+    system_log_queue_size: int = Field(
+        default=10000, env="SYSTEM_LOG_QUEUE_SIZE")  # Au-delà, les événements courants sont abandonnés
 
     # File Processing
     max_file_size: int = Field(
         default=100 * 1024 * 1024,
         env="MAX_FILE_SIZE")  # 100MB
+    zip_compression_workers: int = Field(
+        default=4, env="ZIP_COMPRESSION_WORKERS")  # Blocs deflate compressés en parallèle (0 = séquentiel)
+    zip_compression_level: int = Field(default=6, env="ZIP_COMPRESSION_LEVEL")
+
+    # Index des répertoires (navigation)
+    directory_index_max_directories: int = Field(
+        default=200, env="DIRECTORY_INDEX_MAX_DIRECTORIES")
+    directory_index_max_age: int = Field(
+        default=300, env="DIRECTORY_INDEX_MAX_AGE")  # Re-scan complet même sans changement de mtime
+    directory_index_refresh_interval: int = Field(
+        default=30, env="DIRECTORY_INDEX_REFRESH_INTERVAL")
+    directory_index_idle_ttl: int = Field(
+        default=1800, env="DIRECTORY_INDEX_IDLE_TTL")  # Oubli des répertoires non consultés
+    directory_scan_workers: int = Field(
+        default=4, env="DIRECTORY_SCAN_WORKERS")  # Parcours parallèles (0 = séquentiel)
+    directory_index_prefetch_limit: int = Field(
+        default=16, env="DIRECTORY_INDEX_PREFETCH_LIMIT")  # Sous-répertoires pré-scannés par visite
 
     # OCR
     ocr_enabled: bool = Field(default=True, env="OCR_ENABLED")
     tesseract_cmd: Optional[str] = Field(default=None, env="TESSERACT_CMD")
+    ocr_dpi: int = Field(default=300, env="OCR_DPI")  # Résolution de rastérisation des pages PDF scannées
+    pdf_ocr_min_chars: int = Field(
+        default=25, env="PDF_OCR_MIN_CHARS")  # En dessous, une page avec images est considérée comme scannée
+    pdf_pages_per_job: int = Field(
+        default=8, env="PDF_PAGES_PER_JOB")  # Pages d'un PDF traitées par job du pool d'extraction
+
+    # Extraction - Pool de processus pour l'OCR et le parsing de documents
+    extraction_workers: int = Field(
+        default=2, env="EXTRACTION_WORKERS")  # 0 = exécution dans un thread, sans isolation
+    extraction_timeout: int = Field(
+        default=300, env="EXTRACTION_TIMEOUT")  # seconds par document
+    extraction_memory_limit_mb: int = Field(
+        default=2048, env="EXTRACTION_MEMORY_LIMIT_MB")  # RLIMIT_AS par worker (POSIX uniquement, 0 = illimité)
+    extraction_max_tasks_per_child: int = Field(
+        default=50, env="EXTRACTION_MAX_TASKS_PER_CHILD")  # Recyclage des workers (fuites mémoire des librairies C)
+    spreadsheet_max_rows: int = Field(
+        default=100000, env="SPREADSHEET_MAX_ROWS")  # Lignes extraites d'un tableur/CSV (0 = illimité)
+    spreadsheet_max_text_mb: int = Field(
+        default=20, env="SPREADSHEET_MAX_TEXT_MB")  # Texte extrait d'un tableur/CSV (0 = illimité)
 
     # Queue
     max_concurrent_analyses: int = Field(
         default=3, env="MAX_CONCURRENT_ANALYSES")
     queue_poll_interval: int = Field(default=5, env="QUEUE_POLL_INTERVAL")  # OPTIMISATION: Augmenté de 2s à 5s
+    analysis_queue_size: int = Field(
+        default=10, env="ANALYSIS_QUEUE_SIZE")  # Analyses réclamables en avance par le pool
 
     # Cache
     cache_enabled: bool = Field(default=True, env="CACHE_ENABLED")
     cache_ttl: int = Field(default=3600, env="CACHE_TTL")  # 1 hour
+    ai_result_cache_enabled: bool = Field(default=True, env="AI_RESULT_CACHE_ENABLED")
+    ai_result_cache_max_entries: int = Field(default=5000, env="AI_RESULT_CACHE_MAX_ENTRIES")
+    ai_result_cache_max_mb: int = Field(default=200, env="AI_RESULT_CACHE_MAX_MB")
+    extraction_cache_enabled: bool = Field(default=True, env="EXTRACTION_CACHE_ENABLED")
+    extraction_cache_max_entries: int = Field(default=20000, env="EXTRACTION_CACHE_MAX_ENTRIES")
+    extraction_cache_max_mb: int = Field(default=500, env="EXTRACTION_CACHE_MAX_MB")  # Texte compressé
+    office_render_cache_dir: str = Field(default="cache/office_html", env="OFFICE_RENDER_CACHE_DIR")
+    office_render_cache_max_mb: int = Field(default=500, env="OFFICE_RENDER_CACHE_MAX_MB")
+    office_render_max_rows: int = Field(
+        default=5000, env="OFFICE_RENDER_MAX_ROWS")  # Lignes rendues par feuille de calcul
+    fingerprint_full_hash_max_mb: int = Field(
+        default=32, env="FINGERPRINT_FULL_HASH_MAX_MB")  # Au-delà, hash partiel immédiat et hash complet en tâche de fond
+    fingerprint_workers: int = Field(
+        default=1, env="FINGERPRINT_WORKERS")  # Threads de calcul des hashes complets (0 = pas de hash complet en fond)
+    fingerprint_max_entries: int = Field(
+        default=100000, env="FINGERPRINT_MAX_ENTRIES")  # Empreintes conservées en base (les plus anciennes supprimées)
 
     # Performance - NOUVEAU: Optimisations de performance
     compression_enabled: bool = Field(default=True, env="COMPRESSION_ENABLED")
@@ -7,7 +7,8 @@ import logging
 from contextlib import contextmanager
 from typing import List, Any, Optional, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
 
 from ..models.file import File
 
@@ -46,6 +47,48 @@ class DatabaseUtils:
             logger.error(f"Bulk operation failed: {e}")
             return False
 
+    @staticmethod
+    def bulk_upsert_files(
+            session: Session,
+            new_files: List[Dict[str, Any]],
+            updated_files: List[Dict[str, Any]],
+            batch_size: int = 500) -> Dict[str, int]:
+        """
+        Insère et met à jour des fichiers en lot, dans une seule transaction
+
+        Args:
+            session: Session de base de données
+            new_files: Colonnes des fichiers à créer (doivent contenir "path")
+            updated_files: Colonnes à modifier, identifiées par "id"
+            batch_size: Nombre de chemins par requête de relecture des IDs
+
+        Returns:
+            Dict: Chemin -> ID pour les fichiers créés (ou déjà présents)
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert_module = sqlite if dialect == "sqlite" else postgresql
+            # Un fichier créé entre-temps (autre scan, autre requête) ne doit pas faire échouer le lot
+            insert_stmt = insert_module.insert(File).on_conflict_do_nothing(index_elements=["path"])
+        else:
+            insert_stmt = insert(File)
+
+        ids: Dict[str, int] = {}
+        with DatabaseUtils.safe_transaction(session):
+            if new_files:
+                # executemany : une seule requête préparée pour tout le lot
+                session.execute(insert_stmt, new_files)
+            if updated_files:
+                # UPDATE en lot par clé primaire
+                session.execute(update(File), updated_files)
+
+            # Relecture des IDs en lot plutôt qu'un refresh par objet
+            paths = [row["path"] for row in new_files]
+            for start in range(0, len(paths), batch_size):
+                batch = paths[start:start + batch_size]
+                ids.update(session.query(File.path, File.id).filter(File.path.in_(batch)))
+        return ids
+
     @staticmethod
     def safe_query(session: Session, query_func, *args, **kwargs):
         """Exécute une requête de manière sécurisée"""
@@ -0,0 +1,81 @@
+"""
+Parcours de répertoires pour DocuSense AI
+Basé sur os.scandir : type et stat viennent du DirEntry, en une seule passe
+"""
+
+import logging
+import os
+import stat as stat_module
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScannedEntry:
+    """Entrée d'un répertoire avec les informations mises en cache par le DirEntry"""
+    name: str
+    path: str
+    is_dir: bool
+    size: int = 0
+    mtime: float = 0.0
+    ctime: float = 0.0
+    atime: float = 0.0
+    inode: int = 0
+
+
+@dataclass
+class ScanResult:
+    """Contenu d'un répertoire : fichiers réguliers et sous-répertoires"""
+    path: str
+    mtime: float
+    started_at: float
+    files: List[ScannedEntry] = field(default_factory=list)
+    subdirectories: List[ScannedEntry] = field(default_factory=list)
+    skipped: int = 0
+
+
+def scan_directory(directory_path: str) -> ScanResult:
+    """
+    Parcourt un répertoire en une passe
+
+    Sous Windows, `DirEntry.stat()` ne fait aucun appel système supplémentaire ;
+    ailleurs, le type vient de `d_type` et `stat()` n'est appelé que pour les fichiers.
+    Lève OSError si le répertoire lui-même est inaccessible.
+    """
+    started_at = time.time()
+    with os.scandir(directory_path) as iterator:
+        # mtime lu avant le parcours : une modification concurrente sera vue au prochain accès
+        dir_mtime = os.stat(directory_path).st_mtime
+        result = ScanResult(path=directory_path, mtime=dir_mtime, started_at=started_at)
+
+        for entry in iterator:
+            try:
+                if entry.is_dir():
+                    result.subdirectories.append(ScannedEntry(name=entry.name, path=entry.path, is_dir=True))
+                    continue
+
+                st = entry.stat()
+                if not stat_module.S_ISREG(st.st_mode):
+                    continue
+                result.files.append(ScannedEntry(
+                    name=entry.name,
+                    path=entry.path,
+                    is_dir=False,
+                    size=st.st_size,
+                    mtime=st.st_mtime,
+                    ctime=st.st_ctime,
+                    atime=st.st_atime,
+                    # 0 sous Windows (DirEntry.stat() ne renseigne pas st_ino)
+                    inode=st.st_ino
+                ))
+            except PermissionError:
+                result.skipped += 1
+            except OSError as e:
+                # Lien cassé, fichier supprimé pendant le parcours...
+                result.skipped += 1
+                logger.debug(f"Élément non accessible: {entry.path} ({str(e)})")
+
+    return result
@@ -329,8 +329,8 @@ class FileValidator:
 
             # Vérifier les permissions de lecture (compatible Windows/Linux)
             try:
-                import os
-                os.listdir(path)  # Essayer de lister le contenu
+                with os.scandir(path):  # Ouvrir le répertoire sans le lister
+                    pass
             except (PermissionError, OSError):
                 errors.append(ValidationError(
                     field="path",
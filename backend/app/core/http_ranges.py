@@ -0,0 +1,280 @@
+"""
+Requêtes partielles (Range) et conditionnelles pour le service de fichiers
+RFC 9110 : 206 Partial Content, 304 Not Modified, 416 Range Not Satisfiable
+"""
+
+import logging
+import mmap
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Dict, Tuple, Mapping, BinaryIO
+
+import anyio
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# En dessous, le passage par le pool de threads à chaque bloc coûte plus que la copie
+MIN_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Plage hors du fichier, ou plusieurs plages demandées"""
+
+
+def file_validators(st: os.stat_result) -> Tuple[str, str]:
+    """ETag fort (taille + mtime en ns) et Last-Modified d'un fichier"""
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return etag, formatdate(st.st_mtime, usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Comparaison faible d'une liste d'ETags (If-None-Match)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in header.split(","))
+
+
+def is_not_modified(headers: Mapping[str, str], st: os.stat_result) -> bool:
+    """
+    Vrai si la requête conditionnelle permet de répondre 304
+
+    If-None-Match prime sur If-Modified-Since quand les deux sont présents.
+    """
+    etag, _ = file_validators(st)
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        # Last-Modified n'a qu'une précision à la seconde
+        return since is not None and int(st.st_mtime) <= since
+    return False
+
+
+def _if_range_matches(if_range: str, st: os.stat_result) -> bool:
+    """If-Range : ETag fort identique ou date égale au Last-Modified courant"""
+    etag, _ = file_validators(st)
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Les ETags faibles ne valident jamais une plage
+        return if_range == etag
+    date = _parse_http_date(if_range)
+    return date is not None and int(st.st_mtime) == int(date)
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Plage [start, end] (bornes incluses) d'un en-tête Range
+
+    Retourne None si l'en-tête est mal formé (il est alors ignoré, réponse
+    complète) ; lève RangeNotSatisfiable pour une plage hors du fichier ou
+    une demande de plusieurs plages.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges.strip():
+        return None
+
+    if "," in ranges:
+        # Pas de multipart/byteranges : un client multimédia ne demande qu'une plage,
+        # des plages multiples (souvent chevauchantes) sont surtout un vecteur d'abus
+        raise RangeNotSatisfiable("Plages multiples non supportées")
+
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # Suffixe : les N derniers octets
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable("Plage vide")
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(f"Début de plage {start} au-delà de la taille {size}")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """
+    Envoie `length` octets d'un fichier à partir de `start`, sans copie quand le serveur le permet
+
+    Par ordre de préférence, selon les extensions ASGI annoncées par le serveur :
+    - http.response.zerocopysend : le serveur fait un os.sendfile() de la plage
+      depuis le descripteur de fichier, les octets ne passent pas en espace utilisateur ;
+    - http.response.pathsend : le serveur envoie le fichier lui-même (fichier complet uniquement) ;
+    - sinon lecture par blocs d'un mmap du fichier, dans le pool de threads.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        start: int,
+        length: int,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        full_file: bool = False
+    ):
+        self.file_path = file_path
+        self.start = start
+        self.length = length
+        self.chunk_size = max(chunk_size, MIN_CHUNK_SIZE)
+        self.full_file = full_file
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        send_body = scope.get("method", "GET") != "HEAD" and self.length > 0
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if not send_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.file_path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and self.full_file:
+            await send({"type": "http.response.pathsend", "path": str(self.file_path)})
+        else:
+            await self._send_mapped(send)
+
+    async def _send_mapped(self, send: Send) -> None:
+        with open(self.file_path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Fichier non mappable (système de fichiers réseau, fichier spécial) : lectures positionnées
+                mapped = None
+
+            try:
+                if mapped is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+                position, end = self.start, self.start + self.length
+                while position < end:
+                    size = min(self.chunk_size, end - position)
+                    # Les défauts de page du mmap peuvent bloquer sur disque : hors de la boucle d'événements
+                    if mapped is not None:
+                        chunk = await anyio.to_thread.run_sync(mapped.__getitem__, slice(position, position + size))
+                    else:
+                        chunk = await anyio.to_thread.run_sync(_read_at, f, position, size)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+                if position < end:
+                    # Fichier tronqué pendant l'envoi : le client détectera le Content-Length incomplet
+                    logger.warning(f"{self.file_path} raccourci pendant l'envoi ({position - self.start}/{self.length} octets)")
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(f.fileno(), size, offset)
+    f.seek(offset)
+    return f.read(size)
+
+
+def build_file_response(
+    file_path: Path,
+    request_headers: Optional[Mapping[str, str]] = None,
+    media_type: str = "application/octet-stream",
+    headers: Optional[Dict[str, str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    st: Optional[os.stat_result] = None
+) -> Response:
+    """
+    Réponse pour un fichier, avec gestion des requêtes conditionnelles et partielles
+
+    - If-None-Match / If-Modified-Since -> 304 sans corps
+    - Range d'une seule plage -> 206 avec Content-Range (If-Range respecté)
+    - Plage hors du fichier ou plages multiples -> 416
+    - sinon 200 avec le fichier complet
+
+    Le corps est envoyé par FileRangeResponse (sendfile quand le serveur ASGI le propose).
+    """
+    request_headers = request_headers or {}
+    st = st or file_path.stat()
+    size = st.st_size
+    etag, last_modified = file_validators(st)
+
+    response_headers = dict(headers or {})
+    response_headers.update({
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+    })
+
+    if is_not_modified(request_headers, st):
+        # Le 304 ne garde que les en-têtes de cache et de validation
+        return Response(status_code=304, headers={
+            key: value for key, value in response_headers.items()
+            if key.lower() in ("etag", "last-modified", "cache-control", "vary")
+        })
+
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    byte_range = None
+    if range_header and (if_range is None or _if_range_matches(if_range, st)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable as e:
+            logger.debug(f"Range refusé pour {file_path}: {e}")
+            return Response(status_code=416, headers={
+                "Content-Range": f"bytes */{size}",
+                "Accept-Ranges": "bytes",
+                "ETag": etag,
+            })
+
+    if byte_range is None:
+        start, length, status_code = 0, size, 200
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        status_code = 206
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response_headers["Content-Length"] = str(length)
+    return FileRangeResponse(
+        file_path,
+        start,
+        length,
+        status_code=status_code,
+        headers=response_headers,
+        media_type=media_type,
+        chunk_size=chunk_size,
+        full_file=byte_range is None
+    )
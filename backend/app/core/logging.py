@@ -10,7 +10,7 @@ import atexit
 import signal
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from .config import settings
 import time
 import threading
@@ -129,12 +129,24 @@ class LogCleanupManager:
 log_cleanup_manager = LogCleanupManager()
 
 class FrontendLogHandler(logging.Handler):
-    """Handler pour envoyer les logs au frontend via SSE"""
+    """
+    Handler pour envoyer les logs au frontend via SSE
+
+    Les entrées sont numérotées (séquence croissante) et gardées dans un
+    anneau de taille fixe ; chaque flux SSE abonné reçoit les nouvelles
+    entrées dans sa propre file asyncio et peut reprendre après un numéro
+    donné (Last-Event-ID) tant que l'anneau le contient encore.
+    """
     
-    def __init__(self):
+    def __init__(self, max_buffer_size: int = 500, subscriber_queue_size: int = 1000):
         super().__init__()
-        self.log_buffer: List[Dict[str, Any]] = []
-        self.max_buffer_size = 500  # OPTIMISATION: Réduit de 1000 à 500
+        self.max_buffer_size = max_buffer_size  # OPTIMISATION: Réduit de 1000 à 500
+        self.subscriber_queue_size = subscriber_queue_size
+        self._ring: List[Optional[Dict[str, Any]]] = [None] * max_buffer_size
+        self._last_seq = 0
+        self._buffer_lock = threading.Lock()
+        # File asyncio de chaque flux SSE -> boucle qui la consomme
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
         self._last_notification = 0
         self._notification_threshold = 0.1  # Notifier au plus toutes les 100ms
     
@@ -146,7 +158,6 @@ class FrontendLogHandler(logging.Handler):
             
             # Formater le log pour le frontend
             log_entry = {
-                "id": f"backend_{datetime.now().timestamp()}_{id(record)}",
                 "timestamp": datetime.now().isoformat(),
                 "level": record.levelname.lower(),
                 "source": record.name,
@@ -171,12 +182,17 @@ class FrontendLogHandler(logging.Handler):
             if hasattr(record, 'extra_data'):
                 log_entry["details"]["extra"] = record.extra_data
             
-            # Ajouter au buffer
-            self.log_buffer.append(log_entry)
+            # Numéroter et écrire dans l'anneau (la plus ancienne entrée est écrasée)
+            with self._buffer_lock:
+                self._last_seq += 1
+                seq = self._last_seq
+                log_entry["seq"] = seq
+                log_entry["id"] = f"backend_{seq}"
+                self._ring[seq % self.max_buffer_size] = log_entry
+                subscribers = list(self._subscribers.items())
             
-            # OPTIMISATION: Limiter la taille du buffer de manière plus efficace
-            if len(self.log_buffer) > self.max_buffer_size:
-                self.log_buffer = self.log_buffer[-self.max_buffer_size:]
+            if subscribers:
+                self._publish(subscribers, log_entry)
             
             # OPTIMISATION: Notifier seulement si nécessaire
             if should_notify:
@@ -187,6 +203,62 @@ class FrontendLogHandler(logging.Handler):
             # Éviter les boucles infinies de logging
             sys.stderr.write(f"Erreur dans FrontendLogHandler: {e}\n")
     
+    def _publish(self, subscribers, log_entry: Dict[str, Any]):
+        """Pousse une entrée dans la file de chaque abonné, depuis la boucle ou depuis un thread"""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        
+        for queue, loop in subscribers:
+            if loop is running_loop:
+                self._deliver(queue, log_entry)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver, queue, log_entry)
+    
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, log_entry: Dict[str, Any]):
+        try:
+            queue.put_nowait(log_entry)
+        except asyncio.QueueFull:
+            # Abonné trop lent : il détectera le trou de séquence et relira l'anneau
+            pass
+    
+    def subscribe(self) -> asyncio.Queue:
+        """File des nouvelles entrées pour un flux SSE (à appeler depuis la boucle du flux)"""
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        with self._buffer_lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._buffer_lock:
+            self._subscribers.pop(queue, None)
+    
+    def get_entries_since(self, seq: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Entrées postérieures au numéro `seq`, dans l'ordre
+        
+        Retourne aussi le nombre d'entrées déjà écrasées dans l'anneau (perdues).
+        """
+        with self._buffer_lock:
+            last_seq = self._last_seq
+            first_available = max(1, last_seq - self.max_buffer_size + 1)
+            start = max(seq + 1, first_available)
+            entries = [self._ring[number % self.max_buffer_size] for number in range(start, last_seq + 1)]
+        return entries, max(0, first_available - (seq + 1))
+    
+    def get_recent_logs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Récupérer les logs récents"""
+        with self._buffer_lock:
+            last_seq = self._last_seq
+        entries, _ = self.get_entries_since(max(0, last_seq - limit))
+        return entries[-limit:] if limit > 0 else []
+    
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+    
     def _notify_frontend(self, log_entry: Dict[str, Any]):
         """Notifier les listeners frontend de manière optimisée"""
         # OPTIMISATION: Copier la liste pour éviter les modifications pendant l'itération
@@ -199,10 +271,17 @@ class FrontendLogHandler(logging.Handler):
                 if callback in _frontend_loggers:
                     _frontend_loggers.remove(callback)
                 sys.stderr.write(f"Erreur callback frontend supprimé: {e}\n")
+
+def get_frontend_handler() -> "FrontendLogHandler":
+    """Handler frontend du logger racine (créé et attaché s'il n'existe pas)"""
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers:
+        if isinstance(handler, FrontendLogHandler):
+            return handler
     
-    def get_recent_logs(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Récupérer les logs récents"""
-        return self.log_buffer[-limit:]
+    handler = FrontendLogHandler()
+    root_logger.addHandler(handler)
+    return handler
 
 def register_frontend_logger(callback: callable):
     """Enregistrer un callback pour recevoir les logs frontend"""
@@ -0,0 +1,235 @@
+"""
+Limitation de débit en mémoire par fenêtre glissante
+Compteurs par IP, par utilisateur et par (route, IP)
+"""
+
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_KEYS = 100000
+
+
+class RateLimitDecision(NamedTuple):
+    """Résultat d'une vérification : limite la plus contraignante parmi les portées appliquées"""
+    allowed: bool
+    scope: Optional[str] = None
+    limit: int = 0
+    remaining: int = 0
+    retry_after: int = 0
+
+
+class SlidingWindowCounter:
+    """
+    Compteur par clé sur une fenêtre glissante approchée
+
+    Deux fenêtres fixes par clé (courante et précédente) : le compte estimé est
+    `courante + précédente * part de la fenêtre précédente encore couverte`.
+    Mémoire constante par clé, contrairement à une liste d'horodatages.
+    Les clés sont rangées de la moins à la plus récemment comptée : les clés
+    inactives et, au-delà de `max_keys`, les plus anciennes sont retirées en
+    tête, en temps constant amorti.
+    """
+
+    def __init__(self, window: float, max_keys: int = _MAX_KEYS):
+        self.window = float(window)
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        # clé -> [début de la fenêtre courante, compte courant, compte précédent]
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _roll(self, entry: List[float], now: float) -> None:
+        periods = int((now - entry[0]) // self.window)
+        if periods >= 1:
+            entry[2] = entry[1] if periods == 1 else 0
+            entry[1] = 0
+            entry[0] += periods * self.window
+
+    def _estimate(self, entry: List[float], now: float) -> float:
+        elapsed = now - entry[0]
+        return entry[1] + entry[2] * max(0.0, 1 - elapsed / self.window)
+
+    def hit(self, key: str, now: Optional[float] = None) -> Tuple[float, float]:
+        """Compte une requête ; retourne (compte estimé, secondes avant la fin de la fenêtre courante)"""
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._prune(now)
+                entry = self._entries[key] = [now, 0, 0]
+            else:
+                self._roll(entry, now)
+                self._entries.move_to_end(key)
+            entry[1] += 1
+            return self._estimate(entry, now), entry[0] + self.window - now
+
+    def count(self, key: str, now: Optional[float] = None) -> float:
+        """Compte estimé d'une clé, sans le modifier"""
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            self._roll(entry, now)
+            return self._estimate(entry, now)
+
+    def top(self, limit: int = 10, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Clés les plus actives"""
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            counts = []
+            for key, entry in self._entries.items():
+                self._roll(entry, now)
+                counts.append((key, self._estimate(entry, now)))
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return [(key, count) for key, count in counts[:limit] if count > 0]
+
+    def _prune(self, now: float) -> None:
+        """Retire en tête les clés inactives depuis deux fenêtres, puis les moins récentes au-delà de max_keys (verrou tenu)"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry[0] < 2 * self.window and len(self._entries) < self.max_keys:
+                break
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RateLimiter:
+    """
+    Limites de débit configurées (settings.rate_limit_*), appliquées par le middleware
+
+    - par IP : rate_limit_requests requêtes par rate_limit_window secondes ;
+    - par utilisateur authentifié : rate_limit_user_requests (0 = même limite que par IP) ;
+    - par route et par IP : rate_limit_routes, préfixe de chemin -> limite.
+    Les requêtes refusées sont comptées : un client qui insiste reste bloqué.
+    """
+
+    SCOPES = ("ip", "user", "route")
+
+    def __init__(self):
+        self.enabled = settings.rate_limit_enabled
+        self.window = settings.rate_limit_window
+        self.ip_limit = settings.rate_limit_requests
+        self.user_limit = settings.rate_limit_user_requests or settings.rate_limit_requests
+        # Préfixe le plus long en premier
+        self.route_limits = sorted(settings.rate_limit_routes.items(), key=lambda item: len(item[0]), reverse=True)
+        self.exempt_paths = tuple(settings.rate_limit_exempt_paths)
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False) for proxy in settings.rate_limit_trusted_proxies
+        ]
+        self.counters = {scope: SlidingWindowCounter(self.window) for scope in self.SCOPES}
+        self.lock = threading.Lock()
+        self.stats = {
+            'allowed': 0,
+            'blocked': 0,
+            'blocked_ip': 0,
+            'blocked_user': 0,
+            'blocked_route': 0
+        }
+
+    def is_exempt(self, path: str) -> bool:
+        return not path.startswith("/api/") or path.startswith(self.exempt_paths)
+
+    def is_trusted_proxy(self, address: str) -> bool:
+        if not self.trusted_proxies:
+            return False
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, peer: Optional[str], forwarded_for: Optional[str], real_ip: Optional[str]) -> str:
+        """
+        Adresse à limiter : celle du pair TCP, sauf si c'est un proxy de confiance
+
+        Derrière un proxy de confiance, X-Forwarded-For est lu de droite à
+        gauche et la première adresse non fiable est retenue : les valeurs
+        ajoutées à gauche par le client sont ignorées.
+        """
+        peer = peer or "unknown"
+        if not self.is_trusted_proxy(peer):
+            return peer
+        if forwarded_for:
+            for address in reversed([part.strip() for part in forwarded_for.split(",") if part.strip()]):
+                if not self.is_trusted_proxy(address):
+                    return address
+        if real_ip:
+            return real_ip.strip()
+        return peer
+
+    def route_limit(self, path: str) -> Optional[Tuple[str, int]]:
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
+
+    def check(self, ip_address: str, user_id: Optional[str], path: str) -> RateLimitDecision:
+        """Compte la requête dans chaque portée applicable et retourne la décision"""
+        checks = [("ip", ip_address, self.ip_limit)]
+        if user_id:
+            checks.append(("user", user_id, self.user_limit))
+        route = self.route_limit(path)
+        if route is not None:
+            prefix, limit = route
+            checks.append(("route", f"{prefix}|{ip_address}", limit))
+
+        now = time.monotonic()
+        decision = None
+        for scope, key, limit in checks:
+            if limit <= 0:
+                continue
+            count, window_left = self.counters[scope].hit(key, now)
+            remaining = max(0, limit - math.ceil(count))
+            if count > limit:
+                candidate = RateLimitDecision(False, scope, limit, 0, max(1, math.ceil(window_left)))
+            else:
+                candidate = RateLimitDecision(True, scope, limit, remaining, 0)
+            # Une portée dépassée l'emporte ; sinon celle qui laisse le moins de marge (en-têtes X-RateLimit)
+            if decision is None or (decision.allowed and (not candidate.allowed or candidate.remaining < decision.remaining)):
+                decision = candidate
+
+        decision = decision or RateLimitDecision(True)
+        with self.lock:
+            if decision.allowed:
+                self.stats['allowed'] += 1
+            else:
+                self.stats['blocked'] += 1
+                self.stats[f'blocked_{decision.scope}'] += 1
+        return decision
+
+    def current_count(self, scope: str, key: str) -> int:
+        """Requêtes d'une clé sur la fenêtre glissante courante"""
+        return math.ceil(self.counters[scope].count(key))
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Compteurs courants (clés les plus actives par portée) et limites configurées"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats['enabled'] = self.enabled
+        stats['window_seconds'] = self.window
+        stats['limits'] = {
+            'ip': self.ip_limit,
+            'user': self.user_limit,
+            'routes': dict(self.route_limits)
+        }
+        stats['tracked_keys'] = {scope: len(counter) for scope, counter in self.counters.items()}
+        stats['top'] = {
+            scope: [{'key': key, 'requests': math.ceil(count)} for key, count in counter.top(top)]
+            for scope, counter in self.counters.items()
+        }
+        return stats
+
+
+# Instance globale
+rate_limiter = RateLimiter()
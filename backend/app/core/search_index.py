@@ -0,0 +1,111 @@
+"""
+Index plein texte SQLite FTS5 pour DocuSense AI
+Indexe le nom, le chemin, le texte extrait et les résultats d'analyse
+"""
+
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+FILES_FTS = "files_fts"
+ANALYSES_FTS = "analyses_fts"
+
+# Tables FTS5 à contenu externe : le texte n'est pas dupliqué, seul l'index est stocké
+_TOKENIZER = "unicode61 remove_diacritics 2"
+
+_FILES_COLUMNS = ["name", "path", "extracted_text", "analysis_result"]
+_ANALYSES_COLUMNS = ["result"]
+
+
+def _table_ddl(fts_table: str, source: str, columns: List[str]) -> List[str]:
+    """Table virtuelle et triggers qui maintiennent l'index à chaque écriture"""
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    delete_old = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', tokenize='{_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source} BEGIN {delete_old} END",
+        # Ne réindexer que si une colonne indexée change (pas sur les mises à jour de statut)
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {source} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+class SearchIndex:
+    """Création, reconstruction et disponibilité de l'index FTS5"""
+
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, engine: Engine) -> bool:
+        """
+        Crée les tables FTS5 et leurs triggers si besoin, puis remplit l'index
+        pour les données existantes. Retourne False si SQLite n'a pas FTS5.
+        """
+        if engine.dialect.name != "sqlite":
+            logger.info("Index plein texte non disponible (base non SQLite), recherche par LIKE")
+            self.available = False
+            return False
+
+        try:
+            with engine.begin() as conn:
+                existing = {
+                    row[0] for row in conn.execute(text(
+                        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (:files, :analyses)"
+                    ), {"files": FILES_FTS, "analyses": ANALYSES_FTS})
+                }
+                for fts_table, source, columns in (
+                    (FILES_FTS, "files", _FILES_COLUMNS),
+                    (ANALYSES_FTS, "analyses", _ANALYSES_COLUMNS),
+                ):
+                    for statement in _table_ddl(fts_table, source, columns):
+                        conn.execute(text(statement))
+                    if fts_table not in existing:
+                        # Première création : indexer le contenu déjà présent
+                        conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+                        logger.info(f"Index plein texte {fts_table} construit")
+            self.available = True
+        except Exception as e:
+            logger.warning(f"Index plein texte FTS5 indisponible, recherche par LIKE: {str(e)}")
+            self.available = False
+        return self.available
+
+    def rebuild(self, engine: Engine) -> None:
+        """Reconstruit entièrement l'index (après une restauration de base par exemple)"""
+        if not self.available:
+            return
+        with engine.begin() as conn:
+            for fts_table in (FILES_FTS, ANALYSES_FTS):
+                conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+                conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')"))
+
+
+def build_match_query(query: str, columns: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Transforme une saisie utilisateur en requête FTS5 sûre
+
+    Chaque mot devient un préfixe entre guillemets ("rapp"*), tous requis :
+    la syntaxe FTS5 (opérateurs, parenthèses...) saisie par l'utilisateur est neutralisée.
+    """
+    terms = re.findall(r"\w+", query or "", re.UNICODE)
+    if not terms:
+        return None
+    match = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({match})"
+    return match
+
+
+# Instance globale
+search_index = SearchIndex()
@@ -4,10 +4,12 @@ Middleware d'authentification centralisé - Système JWT
 
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 from typing import Optional
 import logging
 
-from ..api.auth import get_current_user
+from ..api.auth import get_current_user, authenticate_token
+from ..core.database import get_db
 from ..models.user import User
 
 logger = logging.getLogger(__name__)
@@ -20,51 +22,39 @@ class AuthMiddleware:
     """Middleware d'authentification centralisé - Système JWT"""
     
     @staticmethod
-    def get_current_user_jwt(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> User:
-        """Récupère l'utilisateur actuel via JWT"""
+    def get_current_user_jwt(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer),
+        db: Session = Depends(get_db)
+    ) -> User:
+        """Récupère l'utilisateur actuel via JWT (session de la requête, caches de token et d'utilisateur)"""
         try:
-            # Utiliser le système JWT existant
-            from ..api.auth import get_current_user
-            from ..core.database import get_db
-            from sqlalchemy.orm import Session
-            
-            # Créer une session temporaire pour get_current_user
-            from sqlalchemy import create_engine
-            from sqlalchemy.orm import sessionmaker
-            
-            engine = create_engine('sqlite:///./docusense.db')
-            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-            db = SessionLocal()
-            
-            try:
-                # Simuler la dépendance get_db
-                def get_db_override():
-                    return db
-                
-                # Appeler get_current_user avec les credentials
-                user = get_current_user(credentials, db)
-                return user
-            finally:
-                db.close()
-                
+            return authenticate_token(credentials.credentials, db)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la vérification JWT: {e}")
             raise HTTPException(status_code=401, detail="Token JWT invalide")
     
     @staticmethod
-    def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> Optional[User]:
+    def get_current_user_optional(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+        db: Session = Depends(get_db)
+    ) -> Optional[User]:
         """Récupère l'utilisateur actuel via JWT (optionnel)"""
         try:
             if credentials:
-                return AuthMiddleware.get_current_user_jwt(credentials)
+                return AuthMiddleware.get_current_user_jwt(credentials, db)
             return None
         except Exception:
             return None
     
     @staticmethod
-    def require_admin(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> User:
+    def require_admin(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer),
+        db: Session = Depends(get_db)
+    ) -> User:
         """Vérifie que l'utilisateur est administrateur via JWT"""
-        user = AuthMiddleware.get_current_user_jwt(credentials)
+        user = AuthMiddleware.get_current_user_jwt(credentials, db)
         if user.role.value != 'admin':
             raise HTTPException(status_code=403, detail="Accès administrateur requis")
         return user
@@ -9,11 +9,16 @@ from starlette.types import ASGIApp
 from typing import Callable, Optional
 import time
 import json
+import jwt
 from datetime import datetime
 
 from app.models.system_log import LogLevel
+from app.models.user import UserRole
 from app.services.system_log_service import SystemLogService
-from app.core.database import get_db
+from app.services.system_log_writer import system_log_writer
+from app.core.auth_cache import auth_cache
+from app.core.config import settings
+from app.core.rate_limiter import rate_limiter
 from app.core.logging import get_logger
 
 
@@ -40,27 +45,15 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.excluded_paths:
             return await call_next(request)
         
-        # Get database session
-        db = next(get_db())
-        log_service = SystemLogService(db)
-        
         # Extract request information
         client_ip = self._get_client_ip(request)
         user_agent = request.headers.get("User-Agent", "")
         method = request.method
         path = request.url.path
         
-        # Try to get current user
-        current_user = None
-        user_id = None
-        try:
-            # Import différé pour éviter l'importation circulaire
-            from app.middleware.auth_middleware import get_current_user_from_request
-            current_user = await get_current_user_from_request(request, db)
-            user_id = current_user.id if current_user else None
-        except:
-            # User not authenticated or error getting user
-            pass
+        # Authenticated user, from the bearer token only (no database access)
+        token_payload = self._get_token_payload(request)
+        user_id = self._get_user_id(token_payload)
         
         # Prepare request details
         request_details = {
@@ -83,8 +76,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             self.logger.error(f"Request error: {str(e)}")
             
             # Log the error
-            await self._log_event(
-                log_service=log_service,
+            self._log_event(
                 level=LogLevel.ERROR,
                 action="request_error",
                 details={
@@ -114,13 +106,12 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         
         # Determine log level and action based on response
         log_level, action = self._determine_log_level_and_action(
-            method, path, response.status_code, current_user
+            method, path, response.status_code, token_payload
         )
         
         # Log the request if it's significant
         if self._should_log_request(method, path, response.status_code):
-            await self._log_event(
-                log_service=log_service,
+            self._log_event(
                 level=log_level,
                 action=action,
                 details=response_details,
@@ -130,31 +121,44 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 request=request
             )
         
-        # Close database session
-        db.close()
-        
         return response
     
     def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP from request, handling proxies"""
-        # Check for forwarded headers first
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        # Fallback to client host
-        return request.client.host if request.client else "unknown"
+        """Client IP as counted by the rate limiter (proxy headers only from RATE_LIMIT_TRUSTED_PROXIES)"""
+        return rate_limiter.client_ip(
+            request.client.host if request.client else None,
+            request.headers.get("X-Forwarded-For"),
+            request.headers.get("X-Real-IP")
+        )
     
+    def _get_token_payload(self, request: Request) -> Optional[dict]:
+        """Payload of a valid bearer token, served by the auth cache when already verified"""
+        authorization = request.headers.get("Authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        payload = auth_cache.get_payload(token)
+        if payload is not None:
+            return payload
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except jwt.InvalidTokenError:
+            return None
+        auth_cache.store_payload(token, payload)
+        return payload
+
+    def _get_user_id(self, token_payload: Optional[dict]) -> Optional[int]:
+        try:
+            return int(token_payload["sub"]) if token_payload else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
     def _determine_log_level_and_action(
         self, 
         method: str, 
         path: str, 
         status_code: int,
-        user: Optional[object] = None
+        token_payload: Optional[dict] = None
     ) -> tuple[LogLevel, str]:
         """Determine appropriate log level and action based on request"""
         
@@ -179,7 +183,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 return LogLevel.SECURITY, f"{method.lower()}_auth_failure"
         
         # Admin actions
-        if "/admin/" in path and user and hasattr(user, 'is_admin') and user.is_admin:
+        if "/admin/" in path and token_payload and token_payload.get("role") == UserRole.ADMIN.value:
             return LogLevel.INFO, f"{method.lower()}_admin_action"
         
         # Regular successful requests
@@ -215,9 +219,8 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # (unless they're security-sensitive, which we already covered)
         return False
     
-    async def _log_event(
+    def _log_event(
         self,
-        log_service: SystemLogService,
         level: LogLevel,
         action: str,
         details: dict,
@@ -226,17 +229,16 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         user_agent: str,
         request: Request
     ):
-        """Log an event asynchronously"""
+        """Queue an event for the batched SystemLog writer (no database access on the request path)"""
         try:
-            log_service.log_event(
+            system_log_writer.enqueue(
                 level=level,
                 source="http_middleware",
                 action=action,
-                details=details,
+                details={**details, **SystemLogService.describe_request(request)},
                 user_id=user_id,
                 ip_address=ip_address,
-                user_agent=user_agent,
-                request=request
+                user_agent=user_agent
             )
         except Exception as e:
             # Don't let logging errors break the request
@@ -0,0 +1,75 @@
+"""
+Rate limiting middleware: sliding-window counters per IP, user and route
+"""
+
+from typing import Callable, Optional
+
+import jwt
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.rate_limiter import rate_limiter, RateLimiter
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Count every API request in memory and answer 429 once a configured limit is exceeded"""
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        super().__init__(app)
+        self.logger = get_logger(__name__)
+        self.limiter = limiter or rate_limiter
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        path = request.url.path
+        if self.limiter.is_exempt(path):
+            return await call_next(request)
+
+        # Counters are kept even when enforcement is disabled: they feed suspicious-activity detection
+        client_ip = self._get_client_ip(request)
+        decision = self.limiter.check(client_ip, self._get_user_id(request), path)
+
+        if not decision.allowed and self.limiter.enabled:
+            self.logger.warning(
+                f"Rate limit exceeded ({decision.scope}, {decision.limit}/{self.limiter.window}s) "
+                f"for {client_ip} on {path}"
+            )
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Trop de requêtes, réessayez plus tard"},
+                headers={
+                    "Retry-After": str(decision.retry_after),
+                    "X-RateLimit-Limit": str(decision.limit),
+                    "X-RateLimit-Remaining": "0"
+                }
+            )
+
+        response = await call_next(request)
+        if decision.scope is not None:
+            response.headers["X-RateLimit-Limit"] = str(decision.limit)
+            response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
+
+    def _get_client_ip(self, request: Request) -> str:
+        """Client IP: proxy headers are only honoured from RATE_LIMIT_TRUSTED_PROXIES"""
+        return self.limiter.client_ip(
+            request.client.host if request.client else None,
+            request.headers.get("X-Forwarded-For"),
+            request.headers.get("X-Real-IP")
+        )
+
+    def _get_user_id(self, request: Request) -> Optional[str]:
+        """Subject of a valid bearer token (signature check only, no database access)"""
+        authorization = request.headers.get("Authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except jwt.InvalidTokenError:
+            return None
+        subject = payload.get("sub")
+        return str(subject) if subject is not None else None
@@ -9,7 +9,10 @@ from .file import File, FileStatus, DirectoryStructure
 from .config import Config
 from .analysis import Analysis, AnalysisStatus, AnalysisType
 from .user import User, UserRole
-from .system_log import SystemLog, LogLevel
+from .system_log import SystemLog, SystemLogRollup, LogLevel
+from .ai_cache import AIResultCacheEntry
+from .extraction_cache import ExtractionCacheEntry
+from .file_fingerprint import FileFingerprint
 
 __all__ = [
     "Base",
@@ -26,5 +29,9 @@ __all__ = [
     # "QueuePriority",  # Supprimé - ordre chronologique uniquement
     "Config",
     "SystemLog",
-    "LogLevel"
+    "SystemLogRollup",
+    "LogLevel",
+    "AIResultCacheEntry",
+    "ExtractionCacheEntry",
+    "FileFingerprint"
 ]
@@ -0,0 +1,27 @@
+"""
+AI result cache model for DocuSense AI
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class AIResultCacheEntry(Base):
+    """Cached AI completion, addressed by hash(text, prompt, provider, model)"""
+    __tablename__ = "ai_result_cache"
+    __table_args__ = {'extend_existing': True}
+
+    key = Column(String(64), primary_key=True)  # SHA-256 hex
+    provider = Column(String(50), nullable=False, index=True)
+    model = Column(String(100), nullable=False)
+    result = Column(Text, nullable=False)
+    tokens_used = Column(Integer, default=0)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<AIResultCacheEntry(key='{self.key[:12]}', provider='{self.provider}', model='{self.model}')>"
@@ -0,0 +1,26 @@
+"""
+Extraction cache model for DocuSense AI
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class ExtractionCacheEntry(Base):
+    """Cached extracted text, addressed by hash(file content, extractor)"""
+    __tablename__ = "extraction_cache"
+    __table_args__ = {'extend_existing': True}
+
+    key = Column(String(64), primary_key=True)  # SHA-256 hex
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the file bytes
+    extractor = Column(String(100), nullable=False)
+    text = Column(LargeBinary, nullable=False)  # UTF-8, zlib-compressed
+    size_bytes = Column(Integer, nullable=False, default=0)  # Compressed size
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<ExtractionCacheEntry(key='{self.key[:12]}', extractor='{self.extractor}')>"
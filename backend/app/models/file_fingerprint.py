@@ -0,0 +1,26 @@
+"""
+File fingerprint model for DocuSense AI
+"""
+
+from sqlalchemy import Column, BigInteger, String, DateTime, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class FileFingerprint(Base):
+    """Content hashes of a file, valid while (size, mtime, inode) are unchanged"""
+    __tablename__ = "file_fingerprints"
+    __table_args__ = {'extend_existing': True}
+
+    key = Column(String(64), primary_key=True)  # SHA-256 hex of the resolved path
+    path = Column(Text, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    inode = Column(BigInteger, nullable=False, default=0)
+    partial_hash = Column(String(64), nullable=True)  # SHA-256 of size + head/middle/tail samples
+    full_hash = Column(String(64), nullable=True)  # SHA-256 of the whole content, filled in the background
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<FileFingerprint(path='{self.path}', size={self.size})>"
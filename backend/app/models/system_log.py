@@ -51,6 +51,23 @@ class SystemLog(Base):
         return f"<SystemLog(id={self.id}, level='{self.level}', action='{self.action}', user_id={self.user_id})>"
 
 
+class SystemLogRollup(Base):
+    """Hourly event counts per IP address, maintained on write for the summary endpoints"""
+    __tablename__ = "system_log_rollups"
+    __table_args__ = {'extend_existing': True}
+
+    hour = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+    ip_address = Column(String(45), primary_key=True, default="")  # "" when the event has no IP
+    total_events = Column(Integer, nullable=False, default=0)
+    security_events = Column(Integer, nullable=False, default=0)
+    suspicious_events = Column(Integer, nullable=False, default=0)
+    failed_logins = Column(Integer, nullable=False, default=0)
+    unauthorized_access = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SystemLogRollup(hour='{self.hour}', ip_address='{self.ip_address}', total_events={self.total_events})>"
+
+
 # Pydantic schemas
 
 class SystemLogBase(BaseModel):
@@ -91,3 +108,4 @@ class SecurityEventSummary(BaseModel):
     suspicious_activity: int
     total_events: int
     time_period: str
+    rate_limits: Optional[Dict[str, Any]] = None  # Current in-memory rate limit counters
@@ -9,6 +9,7 @@ from .analysis_service import AnalysisService
 from .config_service import ConfigService
 from .ai_service import AIService
 from .ocr_service import OCRService
+from .search_service import SearchService
 
 __all__ = [
     "FileService",
@@ -16,5 +17,6 @@ __all__ = [
 
     "ConfigService",
     "AIService",
-    "OCRService"
+    "OCRService",
+    "SearchService"
 ]
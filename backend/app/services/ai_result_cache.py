@@ -0,0 +1,202 @@
+"""
+Cache persistant des résultats IA pour DocuSense AI
+Adressé par le contenu : hash(texte extrait, prompt final, provider, modèle)
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy import func
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ai_cache import AIResultCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class AIResultCache:
+    """
+    Cache des complétions IA stocké en base, borné en nombre d'entrées et en taille
+
+    L'éviction supprime les entrées les moins récemment utilisées. Le nombre
+    d'entrées et la taille totale sont suivis en mémoire (lus une fois en base,
+    puis recalés à chaque éviction) : un stockage ne coûte pas de COUNT/SUM.
+    Méthodes synchrones (accès base) : à appeler via asyncio.to_thread.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_size_mb: Optional[int] = None):
+        self.enabled = settings.ai_result_cache_enabled
+        self.max_entries = max_entries or settings.ai_result_cache_max_entries
+        self.max_size_bytes = (max_size_mb or settings.ai_result_cache_max_mb) * 1024 * 1024
+        self.lock = threading.Lock()
+        # (nombre d'entrées, taille totale) ; None tant que non lus en base
+        self._totals: Optional[Tuple[int, int]] = None
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def make_key(text: str, prompt: str, provider: str, model: str) -> str:
+        """Clé SHA-256 du document, du prompt final, du provider et du modèle"""
+        digest = hashlib.sha256()
+        for part in (text, prompt, provider, model):
+            encoded = (part or "").encode("utf-8")
+            # Préfixer la longueur pour éviter les collisions par concaténation
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def record_bypass(self) -> None:
+        with self.lock:
+            self.stats['bypassed'] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Récupère un résultat en cache et met à jour sa date d'accès"""
+        if not self.enabled:
+            return None
+
+        db = SessionLocal()
+        try:
+            entry = db.query(AIResultCacheEntry).filter(AIResultCacheEntry.key == key).first()
+            if entry is None:
+                with self.lock:
+                    self.stats['misses'] += 1
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_accessed = datetime.now()
+            db.commit()
+
+            with self.lock:
+                self.stats['hits'] += 1
+            return {
+                "result": entry.result,
+                "provider": entry.provider,
+                "model": entry.model,
+                "tokens_used": entry.tokens_used or 0
+            }
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Lecture du cache IA impossible: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def set(self, key: str, provider: str, model: str, result: str, tokens_used: int = 0) -> None:
+        """Stocke un résultat puis applique l'éviction LRU si les limites sont dépassées"""
+        if not self.enabled or not result:
+            return
+
+        db = SessionLocal()
+        try:
+            entry = db.query(AIResultCacheEntry).filter(AIResultCacheEntry.key == key).first()
+            added = entry is None
+            previous_size = 0 if added else (entry.size_bytes or 0)
+            if added:
+                entry = AIResultCacheEntry(key=key)
+                db.add(entry)
+
+            entry.provider = provider
+            entry.model = model
+            entry.result = result
+            entry.tokens_used = tokens_used
+            entry.size_bytes = len(result.encode("utf-8"))
+            entry.last_accessed = datetime.now()
+            db.commit()
+
+            with self.lock:
+                self.stats['stores'] += 1
+                totals = self._totals
+                if totals is not None:
+                    totals = (totals[0] + int(added), totals[1] + entry.size_bytes - previous_size)
+                    self._totals = totals
+            if totals is None or totals[0] > self.max_entries or totals[1] > self.max_size_bytes:
+                self._evict(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Écriture dans le cache IA impossible: {str(e)}")
+        finally:
+            db.close()
+
+    def _evict(self, db) -> None:
+        """Supprime les entrées LRU au-delà des limites et recale les totaux sur la base"""
+        count, total_size = db.query(
+            func.count(AIResultCacheEntry.key),
+            func.coalesce(func.sum(AIResultCacheEntry.size_bytes), 0)
+        ).one()
+        if count <= self.max_entries and total_size <= self.max_size_bytes:
+            with self.lock:
+                self._totals = (count, total_size)
+            return
+
+        evicted = 0
+        oldest_first = db.query(
+            AIResultCacheEntry.key, AIResultCacheEntry.size_bytes
+        ).order_by(AIResultCacheEntry.last_accessed).yield_per(500)
+
+        keys = []
+        for key, size_bytes in oldest_first:
+            if count <= self.max_entries and total_size <= self.max_size_bytes:
+                break
+            keys.append(key)
+            count -= 1
+            total_size -= size_bytes or 0
+            evicted += 1
+
+        db.query(AIResultCacheEntry).filter(
+            AIResultCacheEntry.key.in_(keys)
+        ).delete(synchronize_session=False)
+        db.commit()
+        with self.lock:
+            self._totals = (count, total_size)
+            self.stats['evictions'] += evicted
+        logger.debug(f"Cache IA: {evicted} entrée(s) LRU supprimée(s)")
+
+    def clear(self) -> int:
+        """Vide le cache ; retourne le nombre d'entrées supprimées"""
+        db = SessionLocal()
+        try:
+            deleted = db.query(AIResultCacheEntry).delete(synchronize_session=False)
+            db.commit()
+            with self.lock:
+                self._totals = (0, 0)
+            return deleted
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (compteurs en mémoire + occupation en base)"""
+        with self.lock:
+            stats = dict(self.stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate_percent'] = round(stats['hits'] / lookups * 100, 2) if lookups else 0
+        stats['enabled'] = self.enabled
+        stats['max_entries'] = self.max_entries
+        stats['max_size_mb'] = round(self.max_size_bytes / (1024 * 1024), 2)
+
+        db = SessionLocal()
+        try:
+            count, total_size = db.query(
+                func.count(AIResultCacheEntry.key),
+                func.coalesce(func.sum(AIResultCacheEntry.size_bytes), 0)
+            ).one()
+            stats['entries'] = count
+            stats['size_mb'] = round(total_size / (1024 * 1024), 2)
+        except Exception as e:
+            logger.warning(f"Statistiques du cache IA indisponibles: {str(e)}")
+        finally:
+            db.close()
+        return stats
+
+
+# Instance globale
+ai_result_cache = AIResultCache()
@@ -0,0 +1,208 @@
+"""
+Ordonnanceur des appels aux providers IA pour DocuSense AI
+Limite la concurrence et le débit (requêtes et tokens par minute) par provider
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu ; une capacité de 0 signifie illimité"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+
+    def wait_time(self, amount: float) -> float:
+        """Secondes à attendre avant de pouvoir consommer `amount` jetons (0 si disponible)"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        # Une demande plus grosse que le seau ne doit pas bloquer indéfiniment
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        if self.unlimited:
+            return
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        """Vide le seau (après un 429 du provider)"""
+        if not self.unlimited:
+            self._refill()
+            self.tokens = 0.0
+
+
+class ProviderScheduler:
+    """File d'attente d'un provider : nombre de requêtes en vol, RPM et TPM"""
+
+    def __init__(self, name: str, max_concurrent: int = 0, requests_per_minute: int = 0,
+                 tokens_per_minute: int = 0, max_retries: int = 3):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        # Sérialise l'attente sur les seaux pour servir les appelants dans l'ordre
+        self._bucket_lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,
+            'rate_limited': 0,
+            'wait_seconds': 0.0
+        }
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """Attend une place libre et le budget RPM/TPM nécessaire, puis exécute l'appel"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            if self._slots is not None:
+                await self._slots.acquire()
+            try:
+                await self._wait_for_budget(estimated_tokens)
+            except BaseException:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.stats['wait_seconds'] += waited
+        self.stats['requests'] += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _wait_for_budget(self, estimated_tokens: int) -> None:
+        async with self._bucket_lock:
+            throttled = False
+            while True:
+                delay = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens)
+                )
+                if delay <= 0:
+                    break
+                throttled = True
+                await asyncio.sleep(delay)
+
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            if throttled:
+                self.stats['throttled'] += 1
+
+    def backoff(self, retry_after: Optional[float] = None) -> float:
+        """Suspend le provider après un 429 ; retourne la durée de pause appliquée"""
+        delay = retry_after if retry_after and retry_after > 0 else settings.ai_rate_limit_backoff
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self.requests.drain()
+        self.stats['rate_limited'] += 1
+        logger.warning(f"Provider {self.name} limité (429), pause de {delay:.1f}s")
+        return delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'wait_seconds': round(self.stats['wait_seconds'], 2),
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'requests_per_minute': self.requests.capacity,
+            'tokens_per_minute': self.tokens.capacity
+        }
+
+
+class AIScheduler:
+    """Registre des ordonnanceurs par provider, configurés via `settings.ai_rate_limits`"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, int]]] = None):
+        self.limits = limits if limits is not None else settings.ai_rate_limits
+        self.schedulers: Dict[str, ProviderScheduler] = {}
+
+    def get(self, provider: str) -> ProviderScheduler:
+        provider = provider.lower()
+        if provider not in self.schedulers:
+            limits = self.limits.get(provider, self.limits.get("default", {}))
+            self.schedulers[provider] = ProviderScheduler(
+                provider,
+                max_concurrent=limits.get("max_concurrent", 0),
+                requests_per_minute=limits.get("requests_per_minute", 0),
+                tokens_per_minute=limits.get("tokens_per_minute", 0),
+                max_retries=limits.get("max_retries", 3)
+            )
+        return self.schedulers[provider]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: scheduler.get_stats() for name, scheduler in self.schedulers.items()}
+
+
+def _error_chain(error: Optional[BaseException]):
+    """L'erreur puis ses causes (`raise ... from e`) : les SDK enveloppés restent reconnus"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Détecte un 429 quel que soit le SDK (OpenAI, Anthropic, Mistral, httpx...)"""
+    for cause in _error_chain(error):
+        status = getattr(cause, "status_code", None) or getattr(getattr(cause, "response", None), "status_code", None)
+        if status == 429 or type(cause).__name__ in ("RateLimitError", "ResourceExhausted"):
+            return True
+    return False
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Lit l'en-tête Retry-After de la réponse du provider s'il est présent"""
+    for cause in _error_chain(error):
+        headers = getattr(getattr(cause, "response", None), "headers", None)
+        if not headers:
+            continue
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+# Instance globale
+ai_scheduler = AIScheduler()
@@ -9,11 +9,15 @@ from sqlalchemy.orm import Session
 import time
 from threading import Lock
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Awaitable
 
 from ..models.analysis import AnalysisType
 from ..models.config import Config
 from .base_service import BaseService, log_service_operation
+from .ai_scheduler import ai_scheduler, is_rate_limit_error, get_retry_after
+from .ai_result_cache import ai_result_cache
+from .text_chunker import split_text, estimate_tokens
+from ..core.config import settings
 from ..core.types import ServiceResponse, AIProviderConfig, AIAnalysisResult
 
 # Cache global persistant pour éviter les rechargements
@@ -51,6 +55,12 @@ class AIService(BaseService):
             return
             
         self.providers = {}
+        # Clients SDK/HTTP réutilisables (keep-alive), clé: (provider, api_key, base_url)
+        self._clients: dict[tuple, any] = {}
+        self._clients_lock = Lock()
+        # Closing of dropped clients in progress (kept referenced until done)
+        self._closing_tasks: set = set()
+        self._gemini_configured_key = None
         self._config_cache_loaded = False
         self._ai_providers_loaded = False
         self._load_providers()
@@ -620,6 +630,8 @@ class AIService(BaseService):
             
             # Configure the API key
             genai.configure(api_key=config["api_key"])
+            # Global configuration changed: cached Gemini models must be rebuilt
+            self._drop_clients("gemini")
             
             self.logger.info(f"[GEMINI] API key configured successfully")
             
@@ -647,9 +659,16 @@ class AIService(BaseService):
         analysis_type: AnalysisType,
         provider: Optional[str] = None,
         model: Optional[str] = None,
-        custom_prompt: Optional[str] = None
+        custom_prompt: Optional[str] = None,
+        use_cache: bool = True,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> dict[str, any]:
-        """Analyze text using AI provider"""
+        """
+        Analyze text using AI provider
+        
+        use_cache=False bypasses the result cache. When on_token is given the
+        provider's streaming API is used and each text delta is awaited through it.
+        """
         start_time = time.time()
         
         try:
@@ -663,19 +682,45 @@ class AIService(BaseService):
             # Generate prompt
             prompt = self._generate_prompt(text, analysis_type, custom_prompt)
             
+            # Same document, prompt and model: reuse the stored completion
+            cache_key = ai_result_cache.make_key(text, prompt, selected_provider, selected_model)
+            if use_cache:
+                cached = await asyncio.to_thread(ai_result_cache.get, cache_key)
+                if cached:
+                    if on_token:
+                        await on_token(cached["result"])
+                    return {
+                        **cached,
+                        "processing_time": time.time() - start_time,
+                        "estimated_cost": 0.0,
+                        "cache_hit": True,
+                        "timestamp": int(time.time())
+                    }
+            else:
+                ai_result_cache.record_bypass()
+            
             # Call AI provider
-            result = await self._call_ai_provider(selected_provider, prompt, selected_model, config)
+            if on_token:
+                result = await self._stream_ai_provider(selected_provider, prompt, selected_model, config, on_token)
+            else:
+                result = await self._call_ai_provider(selected_provider, prompt, selected_model, config)
             
             # Calculate metrics
             processing_time = time.time() - start_time
+            tokens_used = self._estimate_tokens(prompt, result)
+            
+            await asyncio.to_thread(
+                ai_result_cache.set, cache_key, selected_provider, selected_model, result, tokens_used
+            )
             
             return {
                 "result": result,
                 "provider": selected_provider,
                 "model": selected_model,
                 "processing_time": processing_time,
-                "tokens_used": self._estimate_tokens(prompt, result),
+                "tokens_used": tokens_used,
                 "estimated_cost": self._estimate_cost(selected_provider, selected_model, prompt, result),
+                "cache_hit": False,
                 "timestamp": int(time.time())
             }
             
@@ -683,8 +728,229 @@ class AIService(BaseService):
             self.logger.error(f"Error analyzing text: {str(e)}")
             raise
     
+    async def analyze_document(
+        self,
+        text: str,
+        analysis_type: AnalysisType,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        custom_prompt: Optional[str] = None,
+        use_cache: bool = True,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> dict[str, any]:
+        """
+        Analyze a document of any size
+        
+        Text that fits in settings.ai_chunk_token_budget goes through analyze_text
+        unchanged. Larger text is split on page/paragraph boundaries, the chunks
+        are analysed concurrently (the provider scheduler bounds concurrency) and
+        the partial analyses are merged by a reduce pass. on_progress(done, total)
+        is awaited after each call; on_token streams the output of single-call
+        analyses only.
+        """
+        budget = settings.ai_chunk_token_budget
+        if estimate_tokens(text) <= budget:
+            result = await self.analyze_text(text, analysis_type, provider, model, custom_prompt, use_cache, on_token)
+            if on_progress:
+                await on_progress(1, 1)
+            return {**result, "chunks": 1}
+        
+        start_time = time.time()
+        # Pin provider/model so every chunk and the reduce pass use the same one
+        selected_provider, selected_model = await self.select_best_provider(provider, model)
+        instruction = self._get_instruction(analysis_type, custom_prompt)
+        chunks = split_text(text, budget)
+        
+        # Reduce passes: partial results are merged in groups that fit the budget
+        total_calls = len(chunks) + self._count_reduce_calls(len(chunks), budget)
+        completed = 0
+        totals = {"tokens_used": 0, "estimated_cost": 0.0}
+        
+        async def run(chunk_text: str, chunk_prompt: str) -> str:
+            nonlocal completed, total_calls
+            result = await self.analyze_text(
+                chunk_text, analysis_type, selected_provider, selected_model, chunk_prompt, use_cache
+            )
+            totals["tokens_used"] += result.get("tokens_used", 0)
+            totals["estimated_cost"] += result.get("estimated_cost", 0.0)
+            completed += 1
+            total_calls = max(total_calls, completed)
+            if on_progress:
+                await on_progress(completed, total_calls)
+            return result["result"]
+        
+        self.logger.info(f"Document split into {len(chunks)} chunks for {selected_provider}/{selected_model}")
+        partials = await self._gather_or_cancel([
+            run(chunk, f"{instruction}\n\n(Partie {index}/{len(chunks)} du document. "
+                       f"Analyse uniquement cette partie, une synthèse globale sera faite ensuite.)")
+            for index, chunk in enumerate(chunks, start=1)
+        ])
+        
+        reduce_prompt = (
+            f"{instruction}\n\nLe document a été analysé par parties. "
+            "Fusionne les analyses partielles ci-dessous en une analyse unique et cohérente du document complet, "
+            "sans répéter les informations."
+        )
+        while len(partials) > 1:
+            groups = split_text("\f".join(partials), budget)
+            if len(groups) >= len(partials):
+                # Partials larger than the budget: merge them pairwise to guarantee progress
+                groups = ["\f".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+            # The reduce estimate is rough: re-base the total on the groups actually formed
+            remaining = len(groups) + (self._count_reduce_calls(len(groups), budget) if len(groups) > 1 else 0)
+            total_calls = completed + remaining
+            partials = await self._gather_or_cancel([run(group, reduce_prompt) for group in groups])
+        
+        return {
+            "result": partials[0],
+            "provider": selected_provider,
+            "model": selected_model,
+            "processing_time": time.time() - start_time,
+            "tokens_used": totals["tokens_used"],
+            "estimated_cost": totals["estimated_cost"],
+            "chunks": len(chunks),
+            "timestamp": int(time.time())
+        }
+
+    async def _gather_or_cancel(self, coros: List[Awaitable[str]]) -> List[str]:
+        """Like asyncio.gather, but the first failure cancels the sibling calls before being raised"""
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return [task.result() for task in tasks]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _count_reduce_calls(self, partial_count: int, budget: int) -> int:
+        """Rough number of reduce calls, used only for progress reporting"""
+        max_output = settings.ai_max_output_tokens
+        per_group = max(2, budget // max(1, max_output))
+        calls = 0
+        while partial_count > 1:
+            partial_count = -(-partial_count // per_group)
+            calls += partial_count
+        return max(1, calls)
+
     async def _call_ai_provider(self, provider: str, prompt: str, model: str, 
                               config: dict[str, any]) -> str:
+        """Call AI provider through its scheduler (concurrency, RPM and TPM limits)"""
+        return await self._run_scheduled(
+            provider, prompt, lambda: self._dispatch_provider_call(provider, prompt, model, config)
+        )
+    
+    async def _run_scheduled(self, provider: str, prompt: str,
+                             call: Callable[[], Awaitable[str]],
+                             can_retry: Callable[[], bool] = lambda: True) -> str:
+        """Run a provider call in a scheduler slot, retrying 429s after the provider's backoff"""
+        scheduler = ai_scheduler.get(provider)
+        # Prompt + completion budget (max_tokens) to reserve on the TPM bucket
+        estimated_tokens = self._estimate_tokens(prompt, "") + settings.ai_max_output_tokens
+        
+        attempt = 0
+        while True:
+            async with scheduler.slot(estimated_tokens):
+                try:
+                    return await call()
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= scheduler.max_retries or not can_retry():
+                        raise
+                    scheduler.backoff(get_retry_after(e))
+            attempt += 1
+
+    async def _stream_ai_provider(self, provider: str, prompt: str, model: str,
+                                  config: dict[str, any],
+                                  on_token: Callable[[str], Awaitable[None]]) -> str:
+        """Stream a completion through the provider scheduler; returns the full text"""
+        streams = {
+            "openai": self._stream_openai,
+            "claude": self._stream_claude,
+            "mistral": self._stream_mistral,
+            "ollama": self._stream_ollama,
+            "gemini": self._stream_gemini
+        }
+        if provider not in streams:
+            raise ValueError(f"Unsupported provider: {provider}")
+        
+        parts = []
+        
+        async def stream() -> str:
+            async for delta in streams[provider](prompt, model, config):
+                if delta:
+                    parts.append(delta)
+                    await on_token(delta)
+            if not parts:
+                raise Exception(f"No content received from {provider} API")
+            return "".join(parts)
+        
+        # A 429 is retried only before the first delta: tokens already sent cannot be taken back
+        return await self._run_scheduled(provider, prompt, stream, can_retry=lambda: not parts)
+
+    async def _stream_openai(self, prompt: str, model: str, config: dict[str, any]):
+        client = self._get_client("openai", config)
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=settings.ai_max_output_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content
+
+    async def _stream_claude(self, prompt: str, model: str, config: dict[str, any]):
+        client = self._get_client("claude", config)
+        async with client.messages.stream(
+            model=model,
+            max_tokens=settings.ai_max_output_tokens,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def _stream_mistral(self, prompt: str, model: str, config: dict[str, any]):
+        client = self._get_client("mistral", config)
+        response = await client.chat.stream_async(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=settings.ai_max_output_tokens
+        )
+        async for event in response:
+            if event.data.choices:
+                yield event.data.choices[0].delta.content
+
+    async def _stream_ollama(self, prompt: str, model: str, config: dict[str, any]):
+        client = self._get_client("ollama", config)
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True
+        }
+        async with client.stream("POST", "/api/generate", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"Ollama API error: {response.text}")
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                yield data.get("response")
+                if data.get("done"):
+                    break
+
+    async def _stream_gemini(self, prompt: str, model: str, config: dict[str, any]):
+        model_instance = self._get_gemini_model(model, config)
+        response = await model_instance.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    async def _dispatch_provider_call(self, provider: str, prompt: str, model: str,
+                                      config: dict[str, any]) -> str:
         """Call specific AI provider"""
         if provider == "openai":
             return await self._call_openai(prompt, model, config)
@@ -706,8 +972,12 @@ class AIService(BaseService):
         custom_prompt: Optional[str] = None
     ) -> str:
         """Generate analysis prompt based on type"""
+        return f"{self._get_instruction(analysis_type, custom_prompt)}\n\nDocument:\n{text}"
+
+    def _get_instruction(self, analysis_type: AnalysisType, custom_prompt: Optional[str] = None) -> str:
+        """Instruction placed before the document in the prompt"""
         if custom_prompt:
-            return f"{custom_prompt}\n\nDocument:\n{text}"
+            return custom_prompt
         
         base_prompts = {
             AnalysisType.GENERAL: "Please provide a comprehensive analysis of the following document:",
@@ -721,35 +991,102 @@ class AIService(BaseService):
             AnalysisType.ADMINISTRATIVE: "Please provide an administrative analysis of the following document:"
         }
         
-        base_prompt = base_prompts.get(analysis_type, "Please analyze the following document:")
-        return f"{base_prompt}\n\nDocument:\n{text}"
+        return base_prompts.get(analysis_type, "Please analyze the following document:")
+
+    def _get_client(self, provider: str, config: dict[str, any]):
+        """Get (or create) the long-lived client for a provider configuration"""
+        base_url = config.get("base_url") or self._get_default_base_url(provider)
+        key = (provider, config.get("api_key", ""), base_url)
+        
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._create_client(provider, config.get("api_key", ""), base_url)
+                self._clients[key] = client
+                self.logger.info(f"Client {provider} créé ({len(self._clients)} client(s) en cache)")
+        return client
+
+    def _create_client(self, provider: str, api_key: str, base_url: str):
+        """Build a keep-alive client for a provider"""
+        if provider == "openai":
+            import openai
+            return openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+        elif provider == "claude":
+            import anthropic
+            return anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url)
+        elif provider == "mistral":
+            import mistralai
+            return mistralai.Mistral(api_key=api_key)
+        elif provider == "ollama":
+            import httpx
+            return httpx.AsyncClient(
+                base_url=base_url,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+    def _drop_clients(self, provider: str) -> None:
+        """Forget cached clients of a provider (key or URL changed) and close their connection pools"""
+        with self._clients_lock:
+            clients = [self._clients.pop(key) for key in [k for k in self._clients if k[0] == provider]]
+            if provider == "gemini":
+                self._gemini_configured_key = None
+        if not clients:
+            return
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the event loop (worker thread, script)
+            asyncio.run(self._close_all(clients))
+            return
+        task = loop.create_task(self._close_all(clients))
+        self._closing_tasks.add(task)
+        task.add_done_callback(self._closing_tasks.discard)
+
+    async def close_clients(self) -> None:
+        """Close every cached client (application shutdown)"""
+        with self._clients_lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        await self._close_all(clients)
+    
+    async def _close_all(self, clients: List[Any]) -> None:
+        for client in clients:
+            try:
+                close = getattr(client, "aclose", None) or getattr(client, "close", None)
+                if close:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+            except Exception as e:
+                self.logger.warning(f"Error closing AI client: {str(e)}")
 
     async def _call_openai(self, prompt: str, model: str, config: dict[str, any]) -> str:
         """Call OpenAI API"""
-        import openai
-        
-        client = openai.AsyncOpenAI(
-            api_key=config["api_key"],
-            base_url=config.get("base_url", "https://api.openai.com/v1")
-        )
+        client = self._get_client("openai", config)
         
         response = await client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=2000
+            max_tokens=settings.ai_max_output_tokens
         )
         
         return response.choices[0].message.content
 
     async def _call_claude(self, prompt: str, model: str, config: dict[str, any]) -> str:
         """Call Claude API"""
-        import anthropic
-        
-        client = anthropic.AsyncAnthropic(api_key=config["api_key"])
+        client = self._get_client("claude", config)
         
         response = await client.messages.create(
             model=model,
-            max_tokens=2000,
+            max_tokens=settings.ai_max_output_tokens,
             messages=[{"role": "user", "content": prompt}]
         )
         
@@ -762,50 +1099,35 @@ class AIService(BaseService):
     async def _call_mistral(self, prompt: str, model: str, config: dict[str, any]) -> str:
         """Call Mistral API using official SDK"""
         try:
-            import mistralai
-            
-            client = mistralai.Mistral(
-                api_key=config["api_key"]
-            )
+            client = self._get_client("mistral", config)
             
             response = await client.chat.complete_async(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
-                max_tokens=2000
+                max_tokens=settings.ai_max_output_tokens
             )
             
             return response.choices[0].message.content
             
         except Exception as e:
             self.logger.error(f"Mistral API call failed: {str(e)}")
-            raise Exception(f"Mistral API error: {str(e)}")
+            raise Exception(f"Mistral API error: {str(e)}") from e
 
     async def _call_ollama(self, prompt: str, model: str, config: dict[str, any]) -> str:
-        """Call Ollama API"""
-        import requests
-        import asyncio
+        """Call Ollama API (native async HTTP, keep-alive connection)"""
+        import httpx
         
-        base_url = config.get('base_url', 'http://localhost:11434')
-        
-        def sync_request():
-            payload = {
-                "model": model,
-                "prompt": prompt,
-                "stream": False
-            }
-            try:
-                response = requests.post(f"{base_url}/api/generate", 
-                                       json=payload, timeout=60)
-                return response
-            except Exception as e:
-                self.logger.error(f"Ollama API request failed: {str(e)}")
-                return None
-        
-        # Exécuter de manière asynchrone
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, sync_request)
+        client = self._get_client("ollama", config)
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False
+        }
         
-        if response is None:
+        try:
+            response = await client.post("/api/generate", json=payload)
+        except httpx.HTTPError as e:
+            self.logger.error(f"Ollama API request failed: {str(e)}")
             raise Exception("Failed to connect to Ollama API")
         
         if response.status_code != 200:
@@ -816,13 +1138,7 @@ class AIService(BaseService):
     async def _call_gemini(self, prompt: str, model: str, config: dict[str, any]) -> str:
         """Call Gemini API using Google AI SDK"""
         try:
-            import google.generativeai as genai
-            
-            # Configure the API key
-            genai.configure(api_key=config["api_key"])
-            
-            # Get the model
-            model_instance = genai.GenerativeModel(model)
+            model_instance = self._get_gemini_model(model, config)
             
             # Generate content
             response = await model_instance.generate_content_async(prompt)
@@ -833,9 +1149,30 @@ class AIService(BaseService):
             return response.text
             
         except ImportError as e:
-            raise Exception(f"Missing Google AI SDK dependency: {str(e)}")
+            raise Exception(f"Missing Google AI SDK dependency: {str(e)}") from e
         except Exception as e:
-            raise Exception(f"Gemini API error: {str(e)}")
+            raise Exception(f"Gemini API error: {str(e)}") from e
+
+    def _get_gemini_model(self, model: str, config: dict[str, any]):
+        """Get a cached Gemini model; genai.configure is global so only rerun it when the key changes"""
+        import google.generativeai as genai
+        
+        api_key = config["api_key"]
+        key = ("gemini", api_key, model)
+        
+        with self._clients_lock:
+            if self._gemini_configured_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_configured_key = api_key
+                # Models built with the previous key are no longer valid
+                for stale in [k for k in self._clients if k[0] == "gemini"]:
+                    self._clients.pop(stale, None)
+            
+            model_instance = self._clients.get(key)
+            if model_instance is None:
+                model_instance = genai.GenerativeModel(model)
+                self._clients[key] = model_instance
+        return model_instance
 
     def _estimate_tokens(self, prompt: str, result: str) -> int:
         """Estimate token usage"""
@@ -923,6 +1260,7 @@ class AIService(BaseService):
             if success:
                 # Reload providers
                 self.providers[provider] = config
+                self._drop_clients(provider)
                 self.logger.info(f"Saved configuration for provider {provider}")
             
             return success
@@ -945,6 +1283,7 @@ class AIService(BaseService):
             
             if success:
                 self.providers.pop(provider, None)
+                self._drop_clients(provider)
                 self.logger.info(f"Deleted configuration for provider {provider}")
             
             return success
@@ -5,7 +5,6 @@ Handles analysis creation, management, and processing
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from datetime import datetime
 from sqlalchemy import func, desc
 
 from ..core.database import get_db
@@ -14,6 +13,7 @@ from ..models.file import File, FileStatus
 from .ai_service import get_ai_service
 from .prompt_service import PromptService
 from .pdf_generator_service import PDFGeneratorService
+from .analysis_worker_pool import analysis_worker_pool, QUEUED_STEP
 from .base_service import BaseService, log_service_operation
 from ..core.types import ServiceResponse, AnalysisData
 
@@ -59,8 +59,8 @@ class AnalysisService(BaseService):
                 # Fallback to general prompt if specific one not found
                 prompt = self.prompt_service.get_default_prompt("GENERAL")
 
-        # Set initial status
-        initial_status = AnalysisStatus.PROCESSING if start_processing else AnalysisStatus.PENDING
+        # Always created as PENDING: the worker pool moves it to PROCESSING when claimed
+        initial_status = AnalysisStatus.PENDING
 
         # Create analysis
         analysis = Analysis(
@@ -85,7 +85,7 @@ class AnalysisService(BaseService):
 
         # Start processing if requested
         if start_processing:
-            # Start processing in background
+            # Queue for background processing
             self._start_processing(analysis.id)
 
         self.logger.info(f"Created analysis {analysis.id} for file {file_id}")
@@ -111,128 +111,15 @@ class AnalysisService(BaseService):
             return False
 
     def _start_processing(self, analysis_id: int) -> None:
-        """Start processing an analysis with automatic fallback"""
-        try:
-            # Update status to processing
-            analysis = self.db.query(Analysis).filter(Analysis.id == analysis_id).first()
-            if analysis:
-                analysis.status = AnalysisStatus.PROCESSING
-                
-                # Check if this is a priority mode analysis
-                if analysis.provider == "priority_mode":
-                    # Extract priority string from metadata if available
-                    priority_string = None
-                    if analysis.analysis_metadata and "provider_priority" in analysis.analysis_metadata:
-                        priority_string = analysis.analysis_metadata["provider_priority"]
-                    
-                    # Use priority-based processing with fallback
-                    self._process_with_priority_fallback(analysis, priority_string)
-                else:
-                    # Standard processing
-                    self._process_analysis(analysis)
-        except Exception as e:
-            self.logger.error(f"Error starting processing for analysis {analysis_id}: {str(e)}")
-            # Mark analysis as failed
-            analysis = self.db.query(Analysis).filter(Analysis.id == analysis_id).first()
-            if analysis:
-                analysis.status = AnalysisStatus.FAILED
-                analysis.error_message = str(e)
-                self.db.commit()
-
-    def _process_with_priority_fallback(self, analysis: Analysis, priority_string: str = None) -> None:
-        """Process analysis with automatic fallback to next provider in priority list"""
-        try:
-            # Get priority list
-            if priority_string:
-                priority_list = [p.strip().lower() for p in priority_string.split(';') if p.strip()]
-            else:
-                # Build priority string from available providers
-                available_providers = self.ai_service.get_available_providers_async()
-                functional_providers = [p for p in available_providers if p.get("is_functional", False)]
-                sorted_providers = sorted(functional_providers, key=lambda x: x["priority"])
-                priority_list = [p["name"].lower() for p in sorted_providers]
-            
-            if not priority_list:
-                raise ValueError("No providers available for priority fallback")
-            
-            # Try each provider in order
-            for provider_name in priority_list:
-                try:
-                    self.logger.info(f"Trying provider {provider_name} for analysis {analysis.id}")
-                    
-                    # Update analysis with current provider
-                    analysis.provider = provider_name
-                    analysis.status = AnalysisStatus.PROCESSING
-                    self.db.commit()
-                    
-                    # Attempt processing with this provider
-                    success = self._process_analysis(analysis)
-                    if success:
-                        self.logger.info(f"Analysis {analysis.id} completed successfully with provider {provider_name}")
-                        return
-                    else:
-                        self.logger.warning(f"Provider {provider_name} failed for analysis {analysis.id}, trying next...")
-                        continue
-                        
-                except Exception as e:
-                    self.logger.warning(f"Provider {provider_name} failed for analysis {analysis.id}: {str(e)}")
-                    continue
-            
-            # If all providers failed
-            analysis.status = AnalysisStatus.FAILED
-            analysis.error_message = f"All providers in priority list failed: {priority_list}"
-            self.db.commit()
-            self.logger.error(f"All providers failed for analysis {analysis.id}")
-            
-        except Exception as e:
-            self.logger.error(f"Error in priority fallback for analysis {analysis.id}: {str(e)}")
-            analysis.status = AnalysisStatus.FAILED
-            analysis.error_message = str(e)
-            self.db.commit()
-
-    def _process_analysis(self, analysis: Analysis) -> bool:
-        """Process analysis with single provider - returns True if successful"""
-        try:
-            # Standard processing logic here
-            # This would contain the actual AI processing code
-            # For now, we'll just simulate success
-            analysis.status = AnalysisStatus.COMPLETED
-            analysis.progress = 100.0
-            analysis.started_at = datetime.now()
-            self.db.commit()
-            return True
-        except Exception as e:
-            self.logger.error(f"Error processing analysis {analysis.id}: {str(e)}")
-            return False
-
-    def _process_analysis_async(self, analysis_id: int) -> None:
-        """Process analysis asynchronously"""
-        # This would be implemented with a proper task queue (Celery, RQ, etc.)
-        # For now, we'll just simulate processing
-        import threading
-        import time
-        
-        def process():
-            try:
-                time.sleep(2)  # Simulate processing time
-                analysis = self.db.query(Analysis).filter(Analysis.id == analysis_id).first()
-                if analysis:
-                    analysis.status = AnalysisStatus.COMPLETED
-                    analysis.progress = 1.0
-                    analysis.completed_at = datetime.now()
-                    analysis.result = f"Analysis completed for file {analysis.file_id}"
-                    self.db.commit()
-            except Exception as e:
-                self.logger.error(f"Error processing analysis {analysis_id}: {str(e)}")
-                analysis = self.db.query(Analysis).filter(Analysis.id == analysis_id).first()
-                if analysis:
-                    analysis.status = AnalysisStatus.FAILED
-                    analysis.error_message = str(e)
-                    self.db.commit()
-        
-        thread = threading.Thread(target=process)
-        thread.daemon = True
-        thread.start()
+        """Submit an analysis to the worker pool (the row stays PENDING until a worker claims it)"""
+        # Persist the submission so a restart or another process can resume it
+        self.db.query(Analysis).filter(
+            Analysis.id == analysis_id,
+            Analysis.status == AnalysisStatus.PENDING
+        ).update({Analysis.current_step: QUEUED_STEP}, synchronize_session=False)
+        self.db.commit()
+        analysis_worker_pool.submit(analysis_id)
+        self.logger.info(f"Analysis {analysis_id} submitted to worker pool")
 
     @log_service_operation("get_analysis")
     def get_analysis(self, analysis_id: int) -> Optional[Analysis]:
@@ -494,14 +381,15 @@ class AnalysisService(BaseService):
         analysis_type: AnalysisType,
         provider: Optional[str] = None,
         model: Optional[str] = None,
-        custom_prompt: Optional[str] = None
+        custom_prompt: Optional[str] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Analyze text using AI service
         """
-        return await self.safe_execute("analyze_text", self._analyze_text_logic, text, analysis_type, provider, model, custom_prompt)
+        return await self.safe_execute("analyze_text", self._analyze_text_logic, text, analysis_type, provider, model, custom_prompt, use_cache)
 
-    async def _analyze_text_logic(self, text: str, analysis_type: AnalysisType, provider: Optional[str], model: Optional[str], custom_prompt: Optional[str]) -> Dict[str, Any]:
+    async def _analyze_text_logic(self, text: str, analysis_type: AnalysisType, provider: Optional[str], model: Optional[str], custom_prompt: Optional[str], use_cache: bool = True) -> Dict[str, Any]:
         """Logic for analyzing text"""
         # Use AI service to analyze text
         result = await self.ai_service.analyze_text(
@@ -509,7 +397,8 @@ class AnalysisService(BaseService):
             analysis_type=analysis_type,
             provider=provider,
             model=model,
-            custom_prompt=custom_prompt
+            custom_prompt=custom_prompt,
+            use_cache=use_cache
         )
 
         return result
@@ -0,0 +1,91 @@
+"""
+Diffusion en temps réel de la progression des analyses pour DocuSense AI
+Les workers publient tokens et étapes ; les clients SSE s'abonnent par analyse
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Set, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisStreamBroker:
+    """Pub/sub en mémoire : une file asyncio par abonné et par analyse"""
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        # Texte partiel courant, pour les abonnés arrivés en cours de génération
+        self._partials: Dict[int, List[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, analysis_id: int) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(analysis_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, analysis_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            queues = self._subscribers.get(analysis_id)
+            if queues:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[analysis_id]
+
+    def get_partial(self, analysis_id: int) -> Optional[str]:
+        parts = self._partials.get(analysis_id)
+        return "".join(parts) if parts else None
+
+    def publish_token(self, analysis_id: int, delta: str) -> None:
+        self._partials.setdefault(analysis_id, []).append(delta)
+        self.publish(analysis_id, {"type": "token", "delta": delta})
+
+    def reset(self, analysis_id: int) -> None:
+        """Efface la sortie partielle (nouvelle tentative avec un autre provider)"""
+        self._partials.pop(analysis_id, None)
+        self.publish(analysis_id, {"type": "reset"})
+
+    def publish(self, analysis_id: int, event: Dict[str, Any]) -> None:
+        """Publie un événement ; utilisable depuis la boucle ou depuis un thread"""
+        if event.get("type") in ("completed", "failed"):
+            self._partials.pop(analysis_id, None)
+
+        with self._lock:
+            queues = list(self._subscribers.get(analysis_id, ()))
+        if not queues:
+            return
+
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+
+        if in_loop:
+            self._deliver(queues, event)
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, queues, event)
+
+    def _deliver(self, queues, event: Dict[str, Any]) -> None:
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client trop lent : les tokens sont perdus mais l'état final reste en base
+                logger.debug("File SSE pleine, événement ignoré")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "streams": len(self._subscribers),
+                "subscribers": sum(len(q) for q in self._subscribers.values()),
+                "partials": len(self._partials)
+            }
+
+
+# Instance globale
+analysis_stream_broker = AnalysisStreamBroker()
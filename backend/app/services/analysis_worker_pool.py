@@ -0,0 +1,459 @@
+"""
+Pool de workers d'analyse pour DocuSense AI
+Traite les analyses en attente avec une concurrence bornée
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.analysis import Analysis, AnalysisStatus
+from ..models.file import File, FileStatus
+from .analysis_stream_broker import analysis_stream_broker
+
+logger = logging.getLogger(__name__)
+
+# current_step des analyses PENDING soumises au pool : les distingue de celles
+# créées sans démarrage (start_processing=False) et permet de les reprendre depuis la base
+QUEUED_STEP = "En file d'attente"
+
+
+class AnalysisWorkerPool:
+    """
+    Pool de N workers asyncio qui réclament les analyses PENDING de manière atomique.
+
+    Les analyses soumises sont d'abord placées dans une file d'attente en mémoire
+    (simples identifiants), puis transférées vers une file bornée consommée par
+    les workers : quand tous les workers sont occupés, le dispatcher attend
+    (backpressure) au lieu de lancer de nouveaux traitements. Quand la file en
+    mémoire est vide, le dispatcher relit en base les analyses PENDING marquées
+    QUEUED_STEP (soumises par un autre processus, ou perdues à un redémarrage).
+    """
+
+    def __init__(self, worker_count: Optional[int] = None, queue_size: Optional[int] = None):
+        self.worker_count = max(1, worker_count or settings.max_concurrent_analyses)
+        self.queue_size = max(1, queue_size or settings.analysis_queue_size)
+        self.poll_interval = settings.queue_poll_interval
+
+        self._submitted: deque = deque()
+        self._submitted_ids: set = set()
+        self._submit_lock = threading.Lock()
+        # Identifiants dans la file bornée, pas encore pris par un worker
+        self._queued_ids: set = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+        self._active: Dict[int, int] = {}
+        self.stats = {
+            'submitted': 0,
+            'claimed': 0,
+            'completed': 0,
+            'failed': 0,
+            'skipped': 0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    async def start(self) -> None:
+        """Démarre le dispatcher et les workers sur la boucle courante"""
+        if self._running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._wakeup = asyncio.Event()
+        self._running = True
+
+        self._requeue_interrupted()
+
+        self._tasks = [asyncio.create_task(self._dispatcher(), name="analysis-dispatcher")]
+        for index in range(self.worker_count):
+            self._tasks.append(asyncio.create_task(self._worker(index), name=f"analysis-worker-{index}"))
+
+        # Des analyses ont pu être soumises avant le démarrage
+        self._wakeup.set()
+        logger.info(f"[STARTUP] Pool d'analyse démarré ({self.worker_count} workers, file bornée à {self.queue_size})")
+
+    async def stop(self) -> None:
+        """
+        Arrête les workers
+
+        Les analyses en cours restent PROCESSING et les analyses en attente restent
+        PENDING (marquées QUEUED_STEP) : toutes sont reprises au redémarrage.
+        """
+        if not self._running:
+            return
+
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[SHUTDOWN] Pool d'analyse arrêté")
+
+    def submit(self, analysis_id: int) -> None:
+        """
+        Soumet une analyse au pool
+
+        Utilisable depuis la boucle d'événements comme depuis un thread
+        (endpoints synchrones) : seul l'identifiant est mémorisé, l'analyse reste
+        PENDING en base jusqu'à ce qu'un worker la réclame.
+        """
+        with self._submit_lock:
+            if analysis_id in self._submitted_ids:
+                return
+            self._submitted_ids.add(analysis_id)
+            self._submitted.append(analysis_id)
+            self.stats['submitted'] += 1
+
+        if self._loop is not None and self._running:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Récupère les statistiques du pool"""
+        with self._submit_lock:
+            waiting = len(self._submitted)
+
+        return {
+            **self.stats,
+            'running': self._running,
+            'workers': self.worker_count,
+            'busy_workers': len(self._active),
+            'queued': self._queue.qsize() if self._queue else 0,
+            'waiting': waiting,
+            'active_analyses': list(self._active.values())
+        }
+
+    def _next_submitted(self) -> Optional[int]:
+        with self._submit_lock:
+            if not self._submitted:
+                return None
+            analysis_id = self._submitted.popleft()
+            self._submitted_ids.discard(analysis_id)
+            return analysis_id
+
+    async def _dispatcher(self) -> None:
+        """Transfère les soumissions vers la file bornée des workers"""
+        while self._running:
+            analysis_id = self._next_submitted()
+            if analysis_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+                # Rien de soumis en mémoire : analyses en attente connues de la base seulement
+                for pending_id in await asyncio.to_thread(self._poll_pending, self._busy_ids()):
+                    self.submit(pending_id)
+                continue
+
+            if analysis_id in self._queued_ids:
+                continue
+            # Bloque tant que la file est pleine
+            self._queued_ids.add(analysis_id)
+            await self._queue.put(analysis_id)
+
+    def _busy_ids(self) -> set:
+        return set(self._queued_ids) | set(self._active.values())
+
+    def _poll_pending(self, exclude: set) -> List[int]:
+        """Analyses PENDING soumises au pool (QUEUED_STEP), les plus anciennes d'abord"""
+        db = SessionLocal()
+        try:
+            rows = db.query(Analysis.id).filter(
+                Analysis.status == AnalysisStatus.PENDING,
+                Analysis.current_step == QUEUED_STEP
+            ).order_by(Analysis.created_at).limit(self.queue_size + len(exclude)).all()
+            return [row.id for row in rows if row.id not in exclude][:self.queue_size]
+        except Exception as e:
+            logger.warning(f"Lecture des analyses en attente impossible: {str(e)}")
+            return []
+        finally:
+            db.close()
+
+    async def _worker(self, index: int) -> None:
+        """Boucle d'un worker : réclame puis traite une analyse à la fois"""
+        while self._running:
+            analysis_id = await self._queue.get()
+            self._queued_ids.discard(analysis_id)
+            try:
+                if not await asyncio.to_thread(self._claim, analysis_id):
+                    self.stats['skipped'] += 1
+                    continue
+
+                self.stats['claimed'] += 1
+                self._active[index] = analysis_id
+                success = await self._process(analysis_id)
+                self.stats['completed' if success else 'failed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Worker {index}: erreur inattendue sur l'analyse {analysis_id}: {str(e)}")
+                await asyncio.to_thread(self._mark_failed, analysis_id, str(e))
+            finally:
+                self._active.pop(index, None)
+                self._queue.task_done()
+
+    def _claim(self, analysis_id: int) -> bool:
+        """Passe l'analyse de PENDING à PROCESSING ; échoue si un autre worker l'a déjà prise"""
+        db = SessionLocal()
+        try:
+            claimed = db.query(Analysis).filter(
+                Analysis.id == analysis_id,
+                Analysis.status == AnalysisStatus.PENDING
+            ).update({
+                Analysis.status: AnalysisStatus.PROCESSING,
+                Analysis.started_at: datetime.now(),
+                Analysis.progress: 0.0,
+                Analysis.current_step: "En file de traitement",
+                Analysis.error_message: None
+            }, synchronize_session=False)
+            db.commit()
+            return claimed == 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Impossible de réclamer l'analyse {analysis_id}: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _requeue_interrupted(self) -> None:
+        """
+        Reprend après un arrêt du serveur les analyses restées PROCESSING et
+        celles qui attendaient dans la file (PENDING marquées QUEUED_STEP)
+        """
+        db = SessionLocal()
+        try:
+            interrupted = db.query(Analysis).filter(
+                Analysis.status == AnalysisStatus.PROCESSING
+            ).update(
+                {Analysis.status: AnalysisStatus.PENDING, Analysis.current_step: QUEUED_STEP},
+                synchronize_session=False
+            )
+            db.commit()
+
+            queued = db.query(Analysis.id).filter(
+                Analysis.status == AnalysisStatus.PENDING,
+                Analysis.current_step == QUEUED_STEP
+            ).order_by(Analysis.created_at).all()
+            for row in queued:
+                self.submit(row.id)
+            if queued:
+                logger.info(f"{len(queued)} analyse(s) remise(s) en file, dont {interrupted} interrompue(s)")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Reprise des analyses interrompues impossible: {str(e)}")
+        finally:
+            db.close()
+
+    async def _process(self, analysis_id: int) -> bool:
+        """
+        Extraction du texte, appel IA puis écriture du résultat, avec une session dédiée
+
+        Les requêtes et commits de cette session passent par asyncio.to_thread,
+        un à la fois (db_lock) : les parties d'un document progressent en parallèle.
+        """
+        from .ocr_service import OCRService
+        from .ai_service import get_ai_service
+
+        db = SessionLocal()
+        db_lock = asyncio.Lock()
+        try:
+            analysis = await asyncio.to_thread(
+                lambda: db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            )
+            if not analysis:
+                return False
+
+            await self._update_progress(db, db_lock, analysis, 0.1, "Extraction du texte")
+            text = await OCRService(db).extract_text_from_file(analysis.file_id)
+            if not text:
+                raise ValueError("Aucun texte n'a pu être extrait du fichier")
+
+            await self._update_progress(db, db_lock, analysis, 0.3, "Analyse IA")
+            ai_service = get_ai_service()
+            use_cache = not (analysis.analysis_metadata or {}).get("bypass_cache", False)
+            ai_result = None
+            last_error = None
+
+            async def on_progress(done: int, total: int) -> None:
+                # La phase IA couvre 30% → 80% de la progression
+                step = "Analyse IA" if total == 1 else f"Analyse IA ({done}/{total} parties)"
+                await self._update_progress(db, db_lock, analysis, 0.3 + 0.5 * done / total, step)
+
+            partial = []
+            last_flush = time.monotonic()
+
+            async def on_token(delta: str) -> None:
+                # Diffusion immédiate aux clients SSE, écriture en base périodique
+                nonlocal last_flush
+                partial.append(delta)
+                analysis_stream_broker.publish_token(analysis_id, delta)
+                if time.monotonic() - last_flush >= settings.ai_stream_flush_interval:
+                    last_flush = time.monotonic()
+                    async with db_lock:
+                        analysis.result = "".join(partial)
+                        await asyncio.to_thread(self._commit, db, analysis)
+
+            for provider in self._candidate_providers(analysis):
+                if partial:
+                    # Repli sur un autre provider : repartir d'une sortie vide
+                    partial.clear()
+                    analysis_stream_broker.reset(analysis_id)
+                try:
+                    ai_result = await ai_service.analyze_document(
+                        text=text,
+                        analysis_type=analysis.analysis_type,
+                        provider=provider,
+                        model=(analysis.model or None) if provider == analysis.provider else None,
+                        custom_prompt=analysis.prompt,
+                        use_cache=use_cache,
+                        on_progress=on_progress,
+                        on_token=on_token if settings.ai_streaming_enabled else None
+                    )
+                    break
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"Provider {provider} en échec pour l'analyse {analysis_id}: {str(e)}")
+
+            if ai_result is None:
+                raise last_error or ValueError("Aucun provider disponible")
+
+            await self._update_progress(db, db_lock, analysis, 0.8, "Génération du PDF")
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de l'analyse {analysis_id}: {str(e)}")
+            async with db_lock:
+                await asyncio.to_thread(db.rollback)
+            await asyncio.to_thread(self._mark_failed, analysis_id, str(e))
+            return False
+        finally:
+            db.close()
+
+        # La génération du PDF est synchrone : la sortir de la boucle d'événements
+        return await asyncio.to_thread(self._finalize, analysis_id, ai_result)
+
+    def _candidate_providers(self, analysis: Analysis) -> List[Optional[str]]:
+        """Liste ordonnée des providers à essayer (mode priorité avec repli)"""
+        if analysis.provider != "priority_mode":
+            return [analysis.provider or None]
+
+        metadata = analysis.analysis_metadata or {}
+        priority_string = metadata.get("provider_priority")
+        if isinstance(priority_string, list):
+            priority_string = ";".join(priority_string)
+        if not priority_string:
+            # Sélection standard par priorité dans AIService
+            return [None]
+        return [p.strip().lower() for p in priority_string.split(';') if p.strip()]
+
+    async def _update_progress(
+        self, db, db_lock: asyncio.Lock, analysis: Analysis, progress: float, step: str
+    ) -> None:
+        async with db_lock:
+            analysis.progress = progress
+            analysis.current_step = step
+            analysis_id = analysis.id
+            await asyncio.to_thread(self._commit, db, analysis)
+        analysis_stream_broker.publish(analysis_id, {"type": "progress", "progress": progress, "step": step})
+
+    @staticmethod
+    def _commit(db, analysis: Analysis) -> None:
+        # Recharger dans le thread : un attribut expiré par le commit serait relu sur la boucle
+        db.commit()
+        db.refresh(analysis)
+
+    def _finalize(self, analysis_id: int, ai_result: Dict[str, Any]) -> bool:
+        """
+        Écrit le résultat IA puis génère le PDF
+        Une analyse n'est terminée que si l'IA ET le PDF ont réussi
+        """
+        from .pdf_generator_service import PDFGeneratorService
+
+        db = SessionLocal()
+        try:
+            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            if not analysis:
+                return False
+
+            metadata = dict(analysis.analysis_metadata or {})
+            metadata.update({
+                "processing_time": ai_result.get("processing_time"),
+                "tokens_used": ai_result.get("tokens_used"),
+                "estimated_cost": ai_result.get("estimated_cost"),
+                "cache_hit": ai_result.get("cache_hit", False),
+                "chunks": ai_result.get("chunks", 1)
+            })
+
+            analysis.result = ai_result.get("result")
+            analysis.provider = ai_result.get("provider", analysis.provider)
+            analysis.model = ai_result.get("model", analysis.model)
+            analysis.analysis_metadata = metadata
+            # Le générateur PDF exige une analyse terminée
+            analysis.status = AnalysisStatus.COMPLETED
+            db.commit()
+
+            pdf_path = PDFGeneratorService(db).generate_analysis_pdf(analysis_id)
+            if not pdf_path:
+                raise ValueError("Échec de la génération du PDF")
+
+            analysis.pdf_path = pdf_path
+            analysis.progress = 1.0
+            analysis.current_step = None
+            analysis.completed_at = datetime.now()
+
+            file = db.query(File).filter(File.id == analysis.file_id).first()
+            if file:
+                file.status = FileStatus.COMPLETED
+            db.commit()
+
+            analysis_stream_broker.publish(analysis_id, {"type": "completed", "result": analysis.result})
+            logger.info(f"Analyse {analysis_id} terminée: IA + PDF générés")
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Analyse {analysis_id} en échec lors de la finalisation: {str(e)}")
+            self._mark_failed(analysis_id, f"Erreur génération PDF: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _mark_failed(self, analysis_id: int, error_message: str) -> None:
+        db = SessionLocal()
+        try:
+            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            if not analysis:
+                return
+            analysis.status = AnalysisStatus.FAILED
+            analysis.error_message = error_message
+            analysis.current_step = None
+            analysis.completed_at = datetime.now()
+
+            file = db.query(File).filter(File.id == analysis.file_id).first()
+            if file:
+                file.status = FileStatus.FAILED
+                file.error_message = error_message
+            db.commit()
+            analysis_stream_broker.publish(analysis_id, {"type": "failed", "error": error_message})
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Impossible de marquer l'analyse {analysis_id} en échec: {str(e)}")
+        finally:
+            db.close()
+
+
+# Instance globale
+analysis_worker_pool = AnalysisWorkerPool()
@@ -8,6 +8,7 @@ import secrets
 import uuid
 
 from ..models.user import User, UserRole
+from ..core.auth_cache import auth_cache
 from ..core.config import settings
 from ..core.logging import logger
 
@@ -40,12 +41,14 @@ class AuthService:
         return encoded_jwt
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Vérifier et décoder un token JWT"""
+        """Vérifier et décoder un token JWT (payload en cache jusqu'à l'expiration du token)"""
+        payload = auth_cache.get_payload(token)
+        if payload is not None:
+            return payload
+        
         try:
-            logger.info(f"🔐 Tentative de décodage du token: {token[:20]}...")
-            logger.info(f"🔐 Secret key utilisé: {self.secret_key[:10]}...")
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            logger.info(f"[SUCCESS] Token décodé avec succès: {payload}")
+            auth_cache.store_payload(token, payload)
             return payload
         except jwt.ExpiredSignatureError:
             logger.error("❌ Token expiré")
@@ -119,6 +122,18 @@ class AuthService:
         """Récupérer un utilisateur par ID"""
         return self.db.query(User).filter(User.id == user_id).first()
     
+    def get_authenticated_user(self, user_id: int) -> Optional[User]:
+        """Récupérer l'utilisateur actif d'un token vérifié (cache à courte durée de vie)"""
+        user = auth_cache.get_user(self.db, user_id)
+        if user is None:
+            user = self.get_user_by_id(user_id)
+            if user is not None:
+                auth_cache.store_user(user)
+        
+        if user is None or not user.is_active:
+            return None
+        return user
+    
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Récupérer un utilisateur par nom d'utilisateur"""
         return self.db.query(User).filter(User.username == username).first()
@@ -136,5 +151,7 @@ class AuthService:
         ).delete()
         
         self.db.commit()
+        # Suppression en masse : pas d'événement ORM par utilisateur
+        auth_cache.clear_users()
         logger.info(f"Supprimé {deleted_count} utilisateurs invités anciens")
         return deleted_count
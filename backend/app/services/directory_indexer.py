@@ -0,0 +1,476 @@
+"""
+Index des répertoires pour DocuSense AI
+Garde un instantané par répertoire et ne re-scanne que ceux dont le mtime a changé
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.database_utils import DatabaseUtils
+from ..core.directory_scanner import ScanResult, scan_directory
+from ..core.file_validation import FileValidator
+from ..models.file import File, FileStatus
+
+logger = logging.getLogger(__name__)
+
+# Extensions acceptées quand mimetypes ne connaît pas le type
+_FALLBACK_SUPPORTED_EXTENSIONS = {
+    'pdf', 'docx', 'doc', 'txt', 'html', 'jpg', 'jpeg', 'png', 'gif', 'mp4', 'avi', 'mp3', 'wav'
+}
+
+# Résolution grossière des mtimes (FAT, certains partages réseau) : un instantané
+# pris dans cette fenêtre après la dernière modification n'est pas considéré fiable
+_MTIME_RESOLUTION = 2.0
+
+
+@dataclass
+class IndexedFile:
+    """Fichier tel que vu lors du dernier scan"""
+    name: str
+    path: str
+    size: int
+    mtime: float
+    ctime: float
+    atime: float
+    inode: int
+    mime_type: str
+    is_supported: bool
+
+    @property
+    def signature(self) -> Tuple[int, int, float]:
+        return (self.inode, self.size, self.mtime)
+
+
+@dataclass
+class IndexedDirectory:
+    """Sous-répertoire tel que vu lors du dernier scan"""
+    name: str
+    path: str
+    has_permission: bool = True
+
+
+# Clés de tri des listings ; le nom départage les égalités pour un ordre total et stable
+SORT_KEYS = {
+    "name": lambda f: (f.name.casefold(), f.name),
+    "size": lambda f: (f.size, f.name.casefold(), f.name),
+    "mtime": lambda f: (f.mtime, f.name.casefold(), f.name),
+}
+
+
+@dataclass
+class DirectorySnapshot:
+    """Instantané du contenu d'un répertoire"""
+    path: str
+    mtime: float
+    scan_started: float
+    scanned_at: float
+    files: Dict[str, IndexedFile] = field(default_factory=dict)
+    subdirectories: Dict[str, IndexedDirectory] = field(default_factory=dict)
+    last_access: float = field(default_factory=time.monotonic)
+    # Fichiers nouveaux ou modifiés pas encore reportés en base (instantané pré-scanné)
+    pending_sync: List[IndexedFile] = field(default_factory=list, repr=False)
+    _orders: Dict[str, Tuple[List[tuple], List[IndexedFile]]] = field(default_factory=dict, repr=False)
+
+    def sorted_files(self, sort_by: str) -> Tuple[List[tuple], List[IndexedFile]]:
+        """Clés de tri et fichiers par ordre croissant, calculés une fois par instantané"""
+        order = self._orders.get(sort_by)
+        if order is None:
+            key_func = SORT_KEYS[sort_by]
+            entries = sorted(self.files.values(), key=key_func)
+            order = ([key_func(entry) for entry in entries], entries)
+            self._orders[sort_by] = order
+        return order
+
+    def sorted_subdirectories(self) -> List[IndexedDirectory]:
+        return sorted(self.subdirectories.values(), key=lambda d: (d.name.casefold(), d.name))
+
+    def is_current(self, mtime: float, max_age: float) -> bool:
+        """Vrai si le répertoire n'a pas changé depuis le scan"""
+        if mtime != self.mtime:
+            return False
+        # Une modification dans la même tranche de mtime que le scan passerait inaperçue
+        if self.mtime >= self.scan_started - _MTIME_RESOLUTION:
+            return False
+        # Les modifications sur place ne changent pas le mtime du répertoire
+        return time.time() - self.scanned_at < max_age
+
+
+class DirectoryIndexer:
+    """
+    Index en mémoire des répertoires parcourus
+
+    Les listings sont servis depuis l'instantané tant que le mtime du répertoire
+    n'a pas bougé. Un rafraîchissement en tâche de fond re-scanne les répertoires
+    modifiés et synchronise la base uniquement pour les fichiers nouveaux ou changés.
+    Les sous-répertoires d'un dossier consulté sont pré-scannés en parallèle.
+    """
+
+    def __init__(self):
+        self.max_directories = settings.directory_index_max_directories
+        self.max_age = settings.directory_index_max_age
+        self.refresh_interval = settings.directory_index_refresh_interval
+        self.idle_ttl = settings.directory_index_idle_ttl
+        self.scan_workers = settings.directory_scan_workers
+        self.prefetch_limit = settings.directory_index_prefetch_limit
+
+        self._snapshots: "OrderedDict[str, DirectorySnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Un verrou par répertoire pour ne pas lancer deux scans concurrents du même dossier
+        self._scan_locks: Dict[str, threading.Lock] = {}
+        self._mime_cache: Dict[str, Tuple[str, bool]] = {}
+        self._supported_formats = [
+            fmt for formats in FileValidator.get_all_supported_formats().values() for fmt in formats
+        ]
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            'hits': 0,
+            'scans': 0,
+            'prefetched': 0,
+            'files_scanned': 0,
+            'files_synced': 0,
+            'sync_errors': 0,
+            'evictions': 0
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+            logger.info("Index des répertoires démarré")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> Optional[ThreadPoolExecutor]:
+        if self.scan_workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.scan_workers, thread_name_prefix="directory-scan"
+                )
+            return self._executor
+
+    def get_snapshot(self, directory_path: str) -> DirectorySnapshot:
+        """Retourne l'instantané du répertoire, re-scanné seulement s'il a changé"""
+        key = os.path.normpath(directory_path)
+        dir_mtime = os.stat(key).st_mtime
+
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.is_current(dir_mtime, self.max_age) and not snapshot.pending_sync:
+                snapshot.last_access = time.monotonic()
+                self._snapshots.move_to_end(key)
+                self.stats['hits'] += 1
+                return snapshot
+            scan_lock = self._scan_locks.setdefault(key, threading.Lock())
+
+        with scan_lock:
+            # Un autre appelant a pu terminer le scan pendant l'attente du verrou
+            with self._lock:
+                current = self._snapshots.get(key)
+            if current is not None and current.is_current(dir_mtime, self.max_age):
+                # Instantané pré-scanné : la base n'est synchronisée qu'à la première consultation
+                # En cas d'échec, les changements restent en attente : nouvel essai au prochain accès
+                if current.pending_sync and self._sync_database(key, current.pending_sync) is not None:
+                    current.pending_sync = []
+                current.last_access = time.monotonic()
+                return current
+            snapshot = self._rescan(key, current)
+            snapshot.last_access = time.monotonic()
+
+        self._prefetch(snapshot)
+        return snapshot
+
+    def invalidate(self, directory_path: str) -> None:
+        """Force un nouveau scan au prochain accès"""
+        with self._lock:
+            self._snapshots.pop(os.path.normpath(directory_path), None)
+
+    def _rescan(self, key: str, previous: Optional[DirectorySnapshot], sync: bool = True) -> DirectorySnapshot:
+        snapshot = self._build_snapshot(scan_directory(key))
+        changed = self._changed_files(snapshot, previous)
+        # Non synchronisés (pré-scan ou échec d'écriture) : repris au prochain accès
+        snapshot.pending_sync = changed
+        if changed and sync and self._sync_database(key, changed) is not None:
+            snapshot.pending_sync = []
+
+        with self._lock:
+            if previous is not None:
+                snapshot.last_access = previous.last_access
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_directories:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._scan_locks.pop(evicted, None)
+                self.stats['evictions'] += 1
+        return snapshot
+
+    def _build_snapshot(self, scan: ScanResult) -> DirectorySnapshot:
+        files: Dict[str, IndexedFile] = {}
+        for entry in scan.files:
+            mime_type, is_supported = self._classify(os.path.splitext(entry.name)[1])
+            files[entry.name] = IndexedFile(
+                name=entry.name,
+                path=entry.path,
+                size=entry.size,
+                mtime=entry.mtime,
+                ctime=entry.ctime,
+                atime=entry.atime,
+                inode=entry.inode,
+                mime_type=mime_type,
+                is_supported=is_supported
+            )
+        subdirectories = {
+            entry.name: IndexedDirectory(name=entry.name, path=entry.path)
+            for entry in scan.subdirectories
+        }
+
+        self.stats['scans'] += 1
+        self.stats['files_scanned'] += len(files)
+        logger.debug(f"Scan de {scan.path}: {len(files)} fichiers, {len(subdirectories)} dossiers")
+        return DirectorySnapshot(
+            path=scan.path,
+            mtime=scan.mtime,
+            scan_started=scan.started_at,
+            scanned_at=time.time(),
+            files=files,
+            subdirectories=subdirectories
+        )
+
+    def _prefetch(self, snapshot: DirectorySnapshot) -> None:
+        """Pré-scanne en tâche de fond les sous-répertoires pas encore indexés"""
+        executor = self._get_executor()
+        if executor is None or self.prefetch_limit <= 0:
+            return
+        with self._lock:
+            targets = [
+                os.path.normpath(sub.path) for sub in snapshot.subdirectories.values()
+                if os.path.normpath(sub.path) not in self._snapshots
+            ][:self.prefetch_limit]
+        for target in targets:
+            try:
+                executor.submit(self._prefetch_one, target)
+            except RuntimeError:
+                # Executor arrêté (extinction en cours)
+                return
+
+    def _prefetch_one(self, key: str) -> None:
+        with self._lock:
+            if key in self._snapshots:
+                return
+            scan_lock = self._scan_locks.setdefault(key, threading.Lock())
+        if not scan_lock.acquire(blocking=False):
+            return
+        try:
+            self._rescan(key, None, sync=False)
+            self.stats['prefetched'] += 1
+        except OSError as e:
+            logger.debug(f"Pré-scan impossible pour {key}: {str(e)}")
+        finally:
+            scan_lock.release()
+
+    def _classify(self, suffix: str) -> Tuple[str, bool]:
+        """Type MIME et support d'une extension (mimetypes ne regarde que l'extension)"""
+        extension = suffix.lower()
+        cached = self._mime_cache.get(extension)
+        if cached is not None:
+            return cached
+
+        mime_type, _ = mimetypes.guess_type(f"file{extension}")
+        if mime_type:
+            is_supported = bool(self._supported_formats) and any(
+                fmt in mime_type for fmt in self._supported_formats
+            )
+        else:
+            is_supported = extension.lstrip('.') in _FALLBACK_SUPPORTED_EXTENSIONS
+            mime_type = 'application/octet-stream'
+
+        self._mime_cache[extension] = (mime_type, is_supported)
+        return mime_type, is_supported
+
+    @staticmethod
+    def _changed_files(snapshot: DirectorySnapshot, previous: Optional[DirectorySnapshot]) -> List[IndexedFile]:
+        if previous is None:
+            return list(snapshot.files.values())
+        # Les changements pas encore synchronisés d'un pré-scan restent à traiter
+        pending = {indexed.name for indexed in previous.pending_sync}
+        changed = []
+        for name, indexed in snapshot.files.items():
+            before = previous.files.get(name)
+            if before is None or before.signature != indexed.signature or name in pending:
+                changed.append(indexed)
+        return changed
+
+    def _sync_database(self, directory_path: str, changed: List[IndexedFile]) -> Optional[Dict[str, int]]:
+        """
+        Crée les fichiers inconnus et invalide les analyses obsolètes
+
+        Les écritures sont regroupées : un INSERT et un UPDATE en lot par scan,
+        une seule transaction. Retourne chemin -> ID des fichiers créés, ou
+        None si la synchronisation a échoué (base verrouillée...).
+        """
+        db = SessionLocal()
+        try:
+            # Relire uniquement les colonnes utiles à la comparaison (pas le texte extrait)
+            existing: Dict[str, Tuple[int, int, Optional[datetime]]] = {}
+            paths = [indexed.path for indexed in changed]
+            for start in range(0, len(paths), 500):
+                rows = db.query(File.path, File.id, File.size, File.file_modified_at).filter(
+                    File.path.in_(paths[start:start + 500])
+                )
+                for path, file_id, size, modified_at in rows:
+                    existing[path] = (file_id, size, modified_at)
+
+            new_files: List[Dict[str, Any]] = []
+            updated_files: List[Dict[str, Any]] = []
+            for indexed in changed:
+                status = FileStatus.NONE if indexed.is_supported else FileStatus.UNSUPPORTED
+                known = existing.get(indexed.path)
+
+                if known is None:
+                    new_files.append({
+                        "name": indexed.name,
+                        "path": indexed.path,
+                        "size": indexed.size,
+                        "mime_type": indexed.mime_type,
+                        "status": status,
+                        "is_selected": False,
+                        "parent_directory": directory_path,
+                        "file_created_at": datetime.fromtimestamp(indexed.ctime),
+                        "file_modified_at": datetime.fromtimestamp(indexed.mtime),
+                        "file_accessed_at": datetime.fromtimestamp(indexed.atime)
+                    })
+                elif not self._is_analysis_still_valid(known[1], known[2], indexed):
+                    updated_files.append({
+                        "id": known[0],
+                        "status": status,
+                        "size": indexed.size,
+                        "file_modified_at": datetime.fromtimestamp(indexed.mtime),
+                        "file_accessed_at": datetime.fromtimestamp(indexed.atime),
+                        "extracted_text": None,
+                        "analysis_result": None,
+                        "analysis_metadata": None,
+                        "error_message": None
+                    })
+
+            if not new_files and not updated_files:
+                return {}
+
+            ids = DatabaseUtils.bulk_upsert_files(db, new_files, updated_files)
+            synced = len(new_files) + len(updated_files)
+            self.stats['files_synced'] += synced
+            logger.info(
+                f"Index: {len(new_files)} fichier(s) créé(s), {len(updated_files)} invalidé(s) dans {directory_path}"
+            )
+            return ids
+        except Exception as e:
+            self.stats['sync_errors'] += 1
+            logger.error(f"Erreur de synchronisation de l'index pour {directory_path}: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _is_analysis_still_valid(db_size: int, db_modified_at: Optional[datetime], indexed: IndexedFile) -> bool:
+        db_mtime = db_modified_at.timestamp() if db_modified_at else 0
+        return indexed.mtime <= db_mtime and indexed.size == db_size
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Erreur lors du rafraîchissement de l'index: {str(e)}")
+
+    def refresh(self) -> int:
+        """Re-scanne les répertoires indexés qui ont changé ; retourne leur nombre"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, snap in self._snapshots.items() if now - snap.last_access > self.idle_ttl]
+            for key in idle:
+                del self._snapshots[key]
+                self._scan_locks.pop(key, None)
+            candidates = list(self._snapshots.items())
+
+        # Sur un partage réseau chaque stat est un aller-retour : les vérifier en parallèle
+        executor = self._get_executor()
+        keys = [key for key, _ in candidates]
+        mtimes = list(executor.map(self._safe_mtime, keys)) if executor and len(keys) > 1 else [
+            self._safe_mtime(key) for key in keys
+        ]
+
+        stale = []
+        for (key, snapshot), dir_mtime in zip(candidates, mtimes):
+            if dir_mtime is None:
+                self.invalidate(key)
+            elif not snapshot.is_current(dir_mtime, self.max_age):
+                stale.append(key)
+
+        if executor and len(stale) > 1:
+            return sum(executor.map(self._refresh_one, stale))
+        return sum(self._refresh_one(key) for key in stale)
+
+    @staticmethod
+    def _safe_mtime(key: str) -> Optional[float]:
+        try:
+            return os.stat(key).st_mtime
+        except OSError:
+            return None
+
+    def _refresh_one(self, key: str) -> int:
+        with self._lock:
+            scan_lock = self._scan_locks.setdefault(key, threading.Lock())
+        # Ne pas concurrencer un scan déclenché par une requête
+        if not scan_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                current = self._snapshots.get(key)
+            if current is None:
+                return 0
+            # Un répertoire jamais consulté (pré-scan) ne déclenche pas d'écriture en base
+            self._rescan(key, current, sync=not current.pending_sync)
+            return 1
+        except OSError as e:
+            logger.warning(f"Répertoire {key} inaccessible: {str(e)}")
+            self.invalidate(key)
+            return 0
+        finally:
+            scan_lock.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'directories': len(self._snapshots),
+                'indexed_files': sum(len(s.files) for s in self._snapshots.values()),
+                'max_directories': self.max_directories
+            }
+
+
+# Instance globale
+directory_indexer = DirectoryIndexer()
@@ -3,19 +3,20 @@ Service de téléchargement de fichiers et dossiers
 """
 
 import os
-import zipfile
-import tempfile
-import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
+from urllib.parse import quote
 import mimetypes
 from fastapi import HTTPException
 from fastapi.responses import FileResponse, StreamingResponse
-import io
 
 from .base_service import BaseService, log_service_operation
+from ..core.config import settings
 from ..core.types import ServiceResponse, FileData
+from ..utils.zip_stream import ZipEntry, ZipStream, zip_entry
 
 
 class DownloadService(BaseService):
@@ -29,6 +30,8 @@ class DownloadService(BaseService):
         self.temp_dir.mkdir(exist_ok=True)
         self.max_file_size = 1024 * 1024 * 1024  # 1 GB
         self.max_zip_size = 1024 * 1024 * 1024 * 5  # 5 GB
+        self._compression_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         
         # OPTIMISATION: Nettoyage automatique au démarrage
         self.cleanup_temp_files()
@@ -111,168 +114,144 @@ class DownloadService(BaseService):
             media_type=mime_type
         )
     
-    @log_service_operation("create_zip_from_directory")
-    def create_zip_from_directory(self, directory_path: Path, zip_name: Optional[str] = None) -> Path:
+    @log_service_operation("download_directory")
+    def download_directory(self, directory_path: Path, zip_name: Optional[str] = None) -> StreamingResponse:
         """
-        Crée un fichier ZIP à partir d'un répertoire
+        Télécharge un répertoire sous forme de ZIP
+        
+        L'archive est générée à la volée pendant l'envoi : le client reçoit les
+        premiers octets immédiatement et rien n'est écrit dans le répertoire temporaire.
         
         Args:
             directory_path: Chemin vers le répertoire
             zip_name: Nom du fichier ZIP (optionnel)
             
         Returns:
-            Path: Chemin vers le fichier ZIP créé
+            StreamingResponse: Archive ZIP en streaming
         """
-        return self.safe_execute("create_zip_from_directory", self._create_zip_from_directory_logic, directory_path, zip_name)
+        return self.safe_execute("download_directory", self._download_directory_logic, directory_path, zip_name)
 
-    def _create_zip_from_directory_logic(self, directory_path: Path, zip_name: Optional[str] = None) -> Path:
-        """Logic for creating ZIP from directory"""
-        if not directory_path.exists():
-            raise HTTPException(status_code=404, detail="Répertoire non trouvé")
-        
-        if not directory_path.is_dir():
-            raise HTTPException(status_code=400, detail="Le chemin ne correspond pas à un répertoire")
+    def _download_directory_logic(self, directory_path: Path, zip_name: Optional[str] = None) -> StreamingResponse:
+        """Logic for downloading directory"""
+        entries = self._collect_directory_entries(directory_path)
         
-        # Nom du fichier ZIP
         if not zip_name:
             zip_name = f"{directory_path.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        # Chemin du fichier ZIP temporaire
-        zip_path = self.temp_dir / zip_name
-        
-        # Créer le fichier ZIP
-        total_size = 0
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(directory_path):
-                for file in files:
-                    file_path = Path(root) / file
-                    try:
-                        # Vérifier la taille du fichier
-                        file_size = file_path.stat().st_size
-                        total_size += file_size
-                        
-                        if total_size > self.max_zip_size:
-                            raise HTTPException(
-                                status_code=413,
-                                detail=f"Taille totale trop importante ({total_size / (1024*1024*1024):.1f} GB). Maximum: {self.max_zip_size / (1024*1024*1024)} GB"
-                            )
-                        
-                        # Chemin relatif dans le ZIP
-                        relative_path = file_path.relative_to(directory_path)
-                        zipf.write(file_path, relative_path)
-                        
-                    except Exception as e:
-                        self.logger.warning(f"Impossible d'ajouter le fichier {file_path} au ZIP: {e}")
-                        continue
-        
-        self.logger.info(f"ZIP créé: {zip_path} ({zip_path.stat().st_size / (1024*1024):.1f} MB)")
-        return zip_path
+        return self._zip_response(entries, zip_name)
     
-    @log_service_operation("create_zip_from_files")
-    def create_zip_from_files(self, file_paths: List[Path], zip_name: Optional[str] = None) -> Path:
+    @log_service_operation("download_multiple_files")
+    def download_multiple_files(self, file_paths: List[Path], zip_name: Optional[str] = None) -> StreamingResponse:
         """
-        Crée un fichier ZIP à partir d'une liste de fichiers
+        Télécharge plusieurs fichiers sous forme de ZIP
         
         Args:
             file_paths: Liste des chemins de fichiers
             zip_name: Nom du fichier ZIP (optionnel)
             
         Returns:
-            Path: Chemin vers le fichier ZIP créé
+            StreamingResponse: Archive ZIP en streaming
         """
-        return self.safe_execute("create_zip_from_files", self._create_zip_from_files_logic, file_paths, zip_name)
+        return self.safe_execute("download_multiple_files", self._download_multiple_files_logic, file_paths, zip_name)
 
-    def _create_zip_from_files_logic(self, file_paths: List[Path], zip_name: Optional[str] = None) -> Path:
-        """Logic for creating ZIP from files"""
-        if not file_paths:
-            raise HTTPException(status_code=400, detail="Aucun fichier spécifié")
+    def _download_multiple_files_logic(self, file_paths: List[Path], zip_name: Optional[str] = None) -> StreamingResponse:
+        """Logic for downloading multiple files"""
+        entries = self._collect_file_entries(file_paths)
         
-        # Nom du fichier ZIP
         if not zip_name:
             zip_name = f"files_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        # Chemin du fichier ZIP temporaire
-        zip_path = self.temp_dir / zip_name
+        return self._zip_response(entries, zip_name)
+    
+    def _collect_directory_entries(self, directory_path: Path) -> List[ZipEntry]:
+        """Fichiers d'un répertoire à archiver (métadonnées seulement, la taille totale est vérifiée avant l'envoi)"""
+        if not directory_path.exists():
+            raise HTTPException(status_code=404, detail="Répertoire non trouvé")
+        
+        if not directory_path.is_dir():
+            raise HTTPException(status_code=400, detail="Le chemin ne correspond pas à un répertoire")
         
-        # Créer le fichier ZIP
+        entries = []
         total_size = 0
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in file_paths:
+        for root, dirs, files in os.walk(directory_path):
+            for file in files:
+                file_path = Path(root) / file
                 try:
-                    if not file_path.exists():
-                        self.logger.warning(f"Fichier non trouvé: {file_path}")
-                        continue
-                    
-                    if not file_path.is_file():
-                        self.logger.warning(f"Le chemin ne correspond pas à un fichier: {file_path}")
-                        continue
-                    
-                    # Vérifier la taille du fichier
-                    file_size = file_path.stat().st_size
-                    total_size += file_size
-                    
-                    if total_size > self.max_zip_size:
-                        raise HTTPException(
-                            status_code=413,
-                            detail=f"Taille totale trop importante ({total_size / (1024*1024*1024):.1f} GB). Maximum: {self.max_zip_size / (1024*1024*1024)} GB"
-                        )
-                    
-                    # Ajouter le fichier au ZIP
-                    zipf.write(file_path, file_path.name)
-                    
-                except Exception as e:
+                    entry = zip_entry(file_path, str(file_path.relative_to(directory_path)))
+                except OSError as e:
                     self.logger.warning(f"Impossible d'ajouter le fichier {file_path} au ZIP: {e}")
                     continue
+                
+                total_size += entry.size
+                self._check_zip_size(total_size)
+                entries.append(entry)
         
-        self.logger.info(f"ZIP créé: {zip_path} ({zip_path.stat().st_size / (1024*1024):.1f} MB)")
-        return zip_path
+        return entries
     
-    @log_service_operation("download_directory")
-    def download_directory(self, directory_path: Path, zip_name: Optional[str] = None) -> FileResponse:
-        """
-        Télécharge un répertoire sous forme de ZIP
+    def _collect_file_entries(self, file_paths: List[Path]) -> List[ZipEntry]:
+        """Fichiers d'une sélection à archiver, les chemins invalides sont ignorés"""
+        if not file_paths:
+            raise HTTPException(status_code=400, detail="Aucun fichier spécifié")
         
-        Args:
-            directory_path: Chemin vers le répertoire
-            zip_name: Nom du fichier ZIP (optionnel)
+        entries = []
+        total_size = 0
+        for file_path in file_paths:
+            if not file_path.exists():
+                self.logger.warning(f"Fichier non trouvé: {file_path}")
+                continue
             
-        Returns:
-            FileResponse: Réponse de téléchargement
-        """
-        return self.safe_execute("download_directory", self._download_directory_logic, directory_path, zip_name)
-
-    def _download_directory_logic(self, directory_path: Path, zip_name: Optional[str] = None) -> FileResponse:
-        """Logic for downloading directory"""
-        zip_path = self.create_zip_from_directory(directory_path, zip_name)
+            if not file_path.is_file():
+                self.logger.warning(f"Le chemin ne correspond pas à un fichier: {file_path}")
+                continue
+            
+            try:
+                entry = zip_entry(file_path, file_path.name)
+            except OSError as e:
+                self.logger.warning(f"Impossible d'ajouter le fichier {file_path} au ZIP: {e}")
+                continue
+            
+            total_size += entry.size
+            self._check_zip_size(total_size)
+            entries.append(entry)
         
-        return FileResponse(
-            path=str(zip_path),
-            filename=zip_path.name,
-            media_type='application/zip'
-        )
+        return entries
     
-    @log_service_operation("download_multiple_files")
-    def download_multiple_files(self, file_paths: List[Path], zip_name: Optional[str] = None) -> FileResponse:
-        """
-        Télécharge plusieurs fichiers sous forme de ZIP
-        
-        Args:
-            file_paths: Liste des chemins de fichiers
-            zip_name: Nom du fichier ZIP (optionnel)
-            
-        Returns:
-            FileResponse: Réponse de téléchargement
-        """
-        return self.safe_execute("download_multiple_files", self._download_multiple_files_logic, file_paths, zip_name)
-
-    def _download_multiple_files_logic(self, file_paths: List[Path], zip_name: Optional[str] = None) -> FileResponse:
-        """Logic for downloading multiple files"""
-        zip_path = self.create_zip_from_files(file_paths, zip_name)
+    def _check_zip_size(self, total_size: int):
+        if total_size > self.max_zip_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Taille totale trop importante ({total_size / (1024*1024*1024):.1f} GB). Maximum: {self.max_zip_size / (1024*1024*1024)} GB"
+            )
+    
+    def _get_compression_executor(self) -> Optional[ThreadPoolExecutor]:
+        """Pool partagé de compression des blocs deflate (zlib libère le GIL)"""
+        if settings.zip_compression_workers <= 0:
+            return None
+        with self._executor_lock:
+            if self._compression_executor is None:
+                self._compression_executor = ThreadPoolExecutor(
+                    max_workers=settings.zip_compression_workers,
+                    thread_name_prefix="zip-deflate"
+                )
+            return self._compression_executor
+    
+    def _zip_response(self, entries: List[ZipEntry], zip_name: str) -> StreamingResponse:
+        """Réponse ZIP générée pendant l'envoi (sans Content-Length : transfert par morceaux)"""
+        total_size = sum(entry.size for entry in entries)
+        self.logger.info(f"ZIP en streaming: {zip_name} ({len(entries)} fichiers, {total_size / (1024*1024):.1f} MB avant compression)")
+        
+        executor = self._get_compression_executor()
+        stream = ZipStream(
+            entries,
+            executor=executor,
+            compress_level=settings.zip_compression_level,
+            max_pending_blocks=2 * settings.zip_compression_workers
+        )
         
-        return FileResponse(
-            path=str(zip_path),
-            filename=zip_path.name,
-            media_type='application/zip'
+        return StreamingResponse(
+            stream,
+            media_type='application/zip',
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(zip_name)}"}
         )
     
     @log_service_operation("cleanup_temp_files")
@@ -363,7 +342,8 @@ class DownloadService(BaseService):
             'temp_files_count': total_files,
             'temp_files_size_mb': round(total_size / (1024 * 1024), 2),
             'max_file_size_gb': self.max_file_size / (1024 * 1024 * 1024),
-            'max_zip_size_gb': self.max_zip_size / (1024 * 1024 * 1024)
+            'max_zip_size_gb': self.max_zip_size / (1024 * 1024 * 1024),
+            'zip_compression_workers': settings.zip_compression_workers
         }
 
 
@@ -0,0 +1,250 @@
+"""
+Cache persistant du texte extrait pour DocuSense AI
+Adressé par le contenu : hash(octets du fichier, extracteur)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple
+
+from sqlalchemy import func
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.extraction_cache import ExtractionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand les extracteurs changent de sortie : les anciennes entrées ne sont plus lues
+CACHE_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_DIGEST_MEMO_SIZE = 10000
+
+class ExtractionCache:
+    """
+    Cache du texte extrait (OCR, parsing) stocké en base, borné en nombre d'entrées et en taille
+
+    La clé ne dépend que du contenu du fichier : un fichier touché, renommé ou
+    copié dans un autre dossier n'est pas ré-extrait. L'éviction supprime les
+    entrées les moins récemment utilisées ; le nombre d'entrées et la taille
+    totale sont suivis en mémoire et recalés sur la base à chaque éviction.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_size_mb: Optional[int] = None):
+        self.enabled = settings.extraction_cache_enabled
+        self.max_entries = max_entries or settings.extraction_cache_max_entries
+        self.max_size_bytes = (max_size_mb or settings.extraction_cache_max_mb) * 1024 * 1024
+        self.lock = threading.Lock()
+        # (chemin, taille, mtime, inode) -> hash : évite de relire un fichier inchangé
+        self._digests: "OrderedDict[tuple, str]" = OrderedDict()
+        # (nombre d'entrées, taille totale) ; None tant que non lus en base
+        self._totals: Optional[Tuple[int, int]] = None
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'hashed_bytes': 0
+        }
+
+    def file_digest(self, file_path: str) -> str:
+        """SHA-256 du contenu du fichier, mémorisé tant que taille/mtime/inode ne changent pas"""
+        st = os.stat(file_path)
+        signature = (file_path, st.st_size, st.st_mtime_ns, st.st_ino)
+        with self.lock:
+            digest = self._digests.get(signature)
+            if digest is not None:
+                self._digests.move_to_end(signature)
+                return digest
+
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(_HASH_CHUNK_SIZE):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        with self.lock:
+            self.stats['hashed_bytes'] += st.st_size
+            self._digests[signature] = digest
+            while len(self._digests) > _DIGEST_MEMO_SIZE:
+                self._digests.popitem(last=False)
+        return digest
+
+    @staticmethod
+    def make_key(content_hash: str, extractor: str) -> str:
+        """Clé SHA-256 du contenu, de l'extracteur (et de ses options) et de la version du cache"""
+        return hashlib.sha256(f"{CACHE_VERSION}:{extractor}:{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Récupère un texte en cache et met à jour sa date d'accès"""
+        if not self.enabled:
+            return None
+
+        db = SessionLocal()
+        try:
+            entry = db.query(ExtractionCacheEntry).filter(ExtractionCacheEntry.key == key).first()
+            if entry is None:
+                with self.lock:
+                    self.stats['misses'] += 1
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_accessed = datetime.now()
+            db.commit()
+
+            with self.lock:
+                self.stats['hits'] += 1
+            return zlib.decompress(entry.text).decode("utf-8")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Lecture du cache d'extraction impossible: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def set(self, key: str, content_hash: str, extractor: str, text: str) -> None:
+        """Stocke un texte extrait puis applique l'éviction LRU si les limites sont dépassées"""
+        if not self.enabled or not text:
+            return
+
+        db = SessionLocal()
+        try:
+            entry = db.query(ExtractionCacheEntry).filter(ExtractionCacheEntry.key == key).first()
+            added = entry is None
+            previous_size = 0 if added else (entry.size_bytes or 0)
+            if added:
+                entry = ExtractionCacheEntry(key=key)
+                db.add(entry)
+
+            entry.content_hash = content_hash
+            entry.extractor = extractor
+            entry.text = zlib.compress(text.encode("utf-8"), 6)
+            entry.size_bytes = len(entry.text)
+            entry.last_accessed = datetime.now()
+            db.commit()
+
+            with self.lock:
+                self.stats['stores'] += 1
+                totals = self._totals
+                if totals is not None:
+                    totals = (totals[0] + int(added), totals[1] + entry.size_bytes - previous_size)
+                    self._totals = totals
+            if totals is None or totals[0] > self.max_entries or totals[1] > self.max_size_bytes:
+                self._evict(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Écriture dans le cache d'extraction impossible: {str(e)}")
+        finally:
+            db.close()
+
+    async def get_or_extract(
+        self,
+        file_path: str,
+        extractor: str,
+        extract: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """Retourne le texte en cache pour ce contenu, sinon appelle `extract` et stocke son résultat"""
+        if not self.enabled:
+            return await extract()
+
+        try:
+            content_hash = await asyncio.to_thread(self.file_digest, file_path)
+        except OSError as e:
+            logger.warning(f"Hash de {file_path} impossible, extraction sans cache: {str(e)}")
+            return await extract()
+
+        key = self.make_key(content_hash, extractor)
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            logger.debug(f"Texte de {file_path} servi par le cache d'extraction")
+            return cached
+
+        text = await extract()
+        if text:
+            await asyncio.to_thread(self.set, key, content_hash, extractor, text)
+        return text
+
+    def _evict(self, db) -> None:
+        """Supprime les entrées LRU au-delà des limites et recale les totaux sur la base"""
+        count, total_size = db.query(
+            func.count(ExtractionCacheEntry.key),
+            func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0)
+        ).one()
+        if count <= self.max_entries and total_size <= self.max_size_bytes:
+            with self.lock:
+                self._totals = (count, total_size)
+            return
+
+        evicted = 0
+        oldest_first = db.query(
+            ExtractionCacheEntry.key, ExtractionCacheEntry.size_bytes
+        ).order_by(ExtractionCacheEntry.last_accessed).yield_per(500)
+
+        keys = []
+        for key, size_bytes in oldest_first:
+            if count <= self.max_entries and total_size <= self.max_size_bytes:
+                break
+            keys.append(key)
+            count -= 1
+            total_size -= size_bytes or 0
+            evicted += 1
+
+        db.query(ExtractionCacheEntry).filter(
+            ExtractionCacheEntry.key.in_(keys)
+        ).delete(synchronize_session=False)
+        db.commit()
+        with self.lock:
+            self._totals = (count, total_size)
+            self.stats['evictions'] += evicted
+        logger.debug(f"Cache d'extraction: {evicted} entrée(s) LRU supprimée(s)")
+
+    def clear(self) -> int:
+        """Vide le cache ; retourne le nombre d'entrées supprimées"""
+        with self.lock:
+            self._digests.clear()
+        db = SessionLocal()
+        try:
+            deleted = db.query(ExtractionCacheEntry).delete(synchronize_session=False)
+            db.commit()
+            with self.lock:
+                self._totals = (0, 0)
+            return deleted
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (compteurs en mémoire + occupation en base)"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['memoized_digests'] = len(self._digests)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate_percent'] = round(stats['hits'] / lookups * 100, 2) if lookups else 0
+        stats['enabled'] = self.enabled
+        stats['max_entries'] = self.max_entries
+        stats['max_size_mb'] = round(self.max_size_bytes / (1024 * 1024), 2)
+
+        db = SessionLocal()
+        try:
+            count, total_size = db.query(
+                func.count(ExtractionCacheEntry.key),
+                func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0)
+            ).one()
+            stats['entries'] = count
+            stats['size_mb'] = round(total_size / (1024 * 1024), 2)
+        except Exception as e:
+            logger.warning(f"Statistiques du cache d'extraction indisponibles: {str(e)}")
+        finally:
+            db.close()
+        return stats
+
+
+# Instance globale
+extraction_cache = ExtractionCache()
@@ -0,0 +1,244 @@
+"""
+Moteur d'extraction de texte pour DocuSense AI
+Exécute OCR et parsing de documents dans un pool de processus dédié
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, List
+
+from ..core.config import settings
+from ..utils.text_extractors import run_task, init_worker, TASKS
+
+logger = logging.getLogger(__name__)
+
+# Séparateur des pages dans le texte fusionné d'un PDF
+PAGE_SEPARATOR = '\n\n'
+
+# Tâches lues en flux avec des budgets de lignes et d'octets
+SPREADSHEET_TASKS = ('xlsx', 'xls', 'csv')
+
+
+class ExtractionError(Exception):
+    """Échec d'un job d'extraction (délai dépassé ou worker tombé)"""
+
+
+class ExtractionTimeoutError(ExtractionError):
+    """Le job a dépassé `extraction_timeout`"""
+
+
+class ExtractionEngine:
+    """
+    Pool de processus pour l'extraction de texte
+
+    Le travail CPU (tesseract, pdfplumber, openpyxl...) ne bloque ni la boucle
+    asyncio ni le GIL du serveur. Un job qui dépasse son délai fait redémarrer
+    le pool (un processus ne peut pas être interrompu autrement) ; un worker qui
+    plante (mémoire, segfault d'une librairie C) n'emporte que le pool, recréé
+    au job suivant. Les jobs interrompus par le redémarrage sont relancés une fois.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers if max_workers is not None else settings.extraction_workers
+        self.timeout = timeout if timeout is not None else settings.extraction_timeout
+        self.memory_limit_mb = settings.extraction_memory_limit_mb
+        self.max_tasks_per_child = settings.extraction_max_tasks_per_child
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Incrémentée à chaque recréation : évite qu'un job en retard redémarre un pool neuf
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Un job n'est soumis que lorsqu'un worker est libre : le délai ne compte pas l'attente
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Boucle du serveur : run_sync y soumet ses jobs (même file d'attente, même reprise)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.stats = {
+            'jobs': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'restarts': 0,
+            'pdf_pages': 0,
+            'ocr_pages': 0
+        }
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn : pas de fork d'un serveur multi-thread, comportement identique sous Windows
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(self.memory_limit_mb, settings.tesseract_cmd),
+                    max_tasks_per_child=self.max_tasks_per_child or None
+                )
+            return self._pool, self._generation
+
+    def _reset_pool(self, generation: int, reason: str) -> None:
+        with self._lock:
+            if generation != self._generation or self._pool is None:
+                return
+            pool, self._pool = self._pool, None
+            self._generation += 1
+            self.stats['restarts'] += 1
+
+        logger.warning(f"Redémarrage du pool d'extraction ({reason})")
+        # Attribut privé, faute d'API publique pour tuer un worker bloqué
+        for process in list(getattr(pool, "_processes", {}).values()):
+            try:
+                process.kill()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def start(self) -> None:
+        """Rattache le moteur à la boucle du serveur (les workers ne sont lancés qu'au premier job)"""
+        self._slots = None
+        self._bind_loop()
+
+    def _bind_loop(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, self.max_workers))
+            self._loop = asyncio.get_running_loop()
+
+    @staticmethod
+    def _on_loop_thread(loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    def supports(self, task: str) -> bool:
+        return task in TASKS
+
+    async def run(self, task: str, file_path: str, *args, timeout: Optional[float] = None):
+        """Exécute une tâche d'extraction dans le pool et retourne son résultat"""
+        timeout = timeout or self.timeout
+        if self.max_workers <= 0:
+            # Pool désactivé : exécution dans un thread (pas d'isolation)
+            return await asyncio.wait_for(asyncio.to_thread(run_task, task, file_path, *args), timeout)
+
+        self._bind_loop()
+        self.stats['jobs'] += 1
+        self.in_flight += 1
+        try:
+            async with self._slots:
+                return await self._run_in_pool(task, file_path, args, timeout)
+        finally:
+            self.in_flight -= 1
+
+    async def _run_in_pool(self, task: str, file_path: str, args: tuple, timeout: float):
+        for attempt in (1, 2):
+            pool, generation = self._get_pool()
+            try:
+                future = pool.submit(run_task, task, file_path, *args)
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                self.stats['failed'] += 1
+                self._reset_pool(generation, f"délai de {timeout:.0f}s dépassé pour {file_path}")
+                raise ExtractionTimeoutError(f"Extraction interrompue après {timeout:.0f}s: {file_path}")
+            except (BrokenProcessPool, RuntimeError) as e:
+                # RuntimeError : pool fermé entre _get_pool et submit par un redémarrage concurrent
+                if isinstance(e, BrokenProcessPool):
+                    self.stats['crashes'] += 1
+                self._reset_pool(generation, f"worker arrêté ({type(e).__name__})")
+                if attempt == 2:
+                    self.stats['failed'] += 1
+                    raise ExtractionError(f"Le worker d'extraction s'est arrêté sur {file_path}") from e
+                logger.info(f"Nouvelle tentative d'extraction pour {file_path}")
+
+    def run_sync(self, task: str, file_path: str, *args, timeout: Optional[float] = None):
+        """
+        Variante bloquante pour les appelants hors boucle asyncio (threads)
+
+        Le job passe par `run` sur la boucle du serveur : il attend un worker
+        libre comme les autres et est relancé une fois si le pool redémarre.
+        Sans boucle du serveur (scripts), `run` s'exécute dans une boucle dédiée.
+        """
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            if self._on_loop_thread(loop):
+                raise RuntimeError("run_sync bloquerait la boucle asyncio : utiliser await run()")
+            return asyncio.run_coroutine_threadsafe(
+                self.run(task, file_path, *args, timeout=timeout), loop
+            ).result()
+        return asyncio.run(self.run(task, file_path, *args, timeout=timeout))
+
+    async def extract_pdf_pages(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Extrait un PDF page par page, par lots répartis sur les workers
+
+        Chaque lot lit la couche texte de ses pages et n'envoie à l'OCR que les
+        pages scannées : un PDF mixte (numérique + scans) n'est rastérisé que
+        là où c'est nécessaire. Les pages sont retournées dans l'ordre.
+        """
+        page_count = await self.run("pdf_page_count", file_path)
+        if not page_count:
+            return []
+
+        pages_per_job = max(1, settings.pdf_pages_per_job)
+        options = (settings.ocr_enabled, settings.ocr_dpi, settings.pdf_ocr_min_chars)
+        batches = await asyncio.gather(
+            *(
+                self.run("pdf_pages", file_path, first, min(first + pages_per_job, page_count), *options)
+                for first in range(0, page_count, pages_per_job)
+            ),
+            # Laisser finir les autres lots avant de propager l'erreur (pas de jobs orphelins)
+            return_exceptions=True
+        )
+        for batch in batches:
+            if isinstance(batch, BaseException):
+                raise batch
+
+        pages = [page for batch in batches for page in batch]
+        self.stats['pdf_pages'] += len(pages)
+        self.stats['ocr_pages'] += sum(1 for page in pages if page["ocr"])
+        return pages
+
+    async def extract_pdf(self, file_path: str) -> Optional[str]:
+        """Texte d'un PDF (pages fusionnées dans l'ordre), None si rien n'a été extrait"""
+        pages = await self.extract_pdf_pages(file_path)
+        return PAGE_SEPARATOR.join(page["text"] for page in pages if page["text"]) or None
+
+    @staticmethod
+    def task_options(task: str) -> tuple:
+        """Arguments supplémentaires d'une tâche, issus de la configuration"""
+        if task in SPREADSHEET_TASKS:
+            return (settings.spreadsheet_max_rows, settings.spreadsheet_max_text_mb * 1024 * 1024)
+        return ()
+
+    def extractor_tag(self, task: str) -> str:
+        """Identifiant d'une tâche et de ses options (clé du cache d'extraction)"""
+        return ":".join([task, *(str(option) for option in self.task_options(task))])
+
+    @staticmethod
+    def pdf_extractor_tag() -> str:
+        """Identifiant de l'extraction PDF et de ses options (clé du cache d'extraction)"""
+        return f"pdf:ocr={int(settings.ocr_enabled)}:dpi={settings.ocr_dpi}:min_chars={settings.pdf_ocr_min_chars}"
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'in_flight': self.in_flight,
+            'max_workers': self.max_workers,
+            'timeout': self.timeout,
+            'memory_limit_mb': self.memory_limit_mb,
+            'running': self._pool is not None
+        }
+
+
+# Instance globale
+extraction_engine = ExtractionEngine()
@@ -0,0 +1,295 @@
+"""
+Empreintes SHA-256 des fichiers servis pour DocuSense AI
+Mémorisées par (chemin, taille, mtime, inode), en mémoire et en base
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.file_fingerprint import FileFingerprint
+
+logger = logging.getLogger(__name__)
+
+_READ_BUFFER_SIZE = 4 * 1024 * 1024
+_SAMPLE_SIZE = 1024 * 1024
+_MEMO_SIZE = 10000
+# Nombre d'écritures entre deux contrôles de la taille de la table
+_PRUNE_EVERY = 500
+
+Signature = Tuple[int, int, int]
+
+
+class FileFingerprintStore:
+    """
+    Hashes de fichiers calculés une fois par version du fichier
+
+    Un fichier n'est relu que si sa taille, son mtime ou son inode changent,
+    y compris après un redémarrage. Les petits fichiers sont hashés en entier
+    à la demande ; les gros reçoivent immédiatement un hash partiel (taille +
+    échantillons début/milieu/fin) et leur hash complet est calculé dans un
+    pool de threads, puis servi aux appels suivants. La table est bornée à
+    `fingerprint_max_entries` lignes (les moins récemment mises à jour sont
+    supprimées). Méthodes synchrones : à appeler hors boucle d'événements.
+    """
+
+    def __init__(self, full_hash_max_mb: Optional[int] = None, workers: Optional[int] = None):
+        self.full_hash_max_bytes = (full_hash_max_mb or settings.fingerprint_full_hash_max_mb) * 1024 * 1024
+        self.workers = settings.fingerprint_workers if workers is None else workers
+        self.max_entries = settings.fingerprint_max_entries
+        self._saves_since_prune = 0
+        self.lock = threading.Lock()
+        self._memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'partial_hashes': 0,
+            'full_hashes': 0,
+            'background_hashes': 0,
+            'hashed_bytes': 0,
+            'pruned': 0
+        }
+
+    @staticmethod
+    def make_key(path: str) -> str:
+        """Clé SHA-256 du chemin résolu"""
+        return hashlib.sha256(path.encode("utf-8", "surrogateescape")).hexdigest()
+
+    @staticmethod
+    def _signature(st: os.stat_result) -> Signature:
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get_fingerprint(self, file_path: Path, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        """
+        Empreinte d'un fichier : {"hash", "hash_mode", "hash_pending"}
+
+        `hash_mode` vaut "full" (SHA-256 du contenu) ou "partial" ; `hash_pending`
+        indique qu'un hash complet est en cours de calcul en tâche de fond.
+        """
+        st = st or file_path.stat()
+        path = str(file_path.resolve())
+        key = self.make_key(path)
+        signature = self._signature(st)
+
+        record = self._lookup(key, signature)
+        if record is None:
+            record = {"path": path, "signature": signature, "partial_hash": None, "full_hash": None}
+
+        if not record["full_hash"] and st.st_size <= self.full_hash_max_bytes:
+            record["full_hash"] = self._hash_full(file_path)
+            self._save(key, record)
+
+        if record["full_hash"]:
+            return {"hash": record["full_hash"], "hash_mode": "full", "hash_pending": False}
+
+        if not record["partial_hash"]:
+            record["partial_hash"] = self._hash_partial(file_path, st.st_size)
+            self._save(key, record)
+
+        pending = self._schedule_full_hash(key, file_path, signature)
+        return {"hash": record["partial_hash"], "hash_mode": "partial", "hash_pending": pending}
+
+    def _lookup(self, key: str, signature: Signature) -> Optional[Dict[str, Any]]:
+        """Empreinte mémorisée si le fichier n'a pas changé depuis (mémoire, puis base)"""
+        with self.lock:
+            record = self._memo.get(key)
+            if record is not None and record["signature"] == signature:
+                self._memo.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return dict(record)
+
+        db = SessionLocal()
+        try:
+            row = db.query(FileFingerprint).filter(FileFingerprint.key == key).first()
+            if row is None or (row.size, row.mtime_ns, row.inode) != signature:
+                return None
+            record = {
+                "path": row.path,
+                "signature": signature,
+                "partial_hash": row.partial_hash,
+                "full_hash": row.full_hash
+            }
+        except Exception as e:
+            logger.warning(f"Lecture des empreintes de fichiers impossible: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+        with self.lock:
+            self.stats['db_hits'] += 1
+        self._remember(key, record)
+        return dict(record)
+
+    def _remember(self, key: str, record: Dict[str, Any]) -> None:
+        with self.lock:
+            self._memo[key] = dict(record)
+            self._memo.move_to_end(key)
+            while len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+
+    def _save(self, key: str, record: Dict[str, Any]) -> None:
+        """Mémorise une empreinte et la persiste en base"""
+        self._remember(key, record)
+
+        size, mtime_ns, inode = record["signature"]
+        db = SessionLocal()
+        try:
+            row = db.query(FileFingerprint).filter(FileFingerprint.key == key).first()
+            if row is None:
+                row = FileFingerprint(key=key)
+                db.add(row)
+            row.path = record["path"]
+            row.size = size
+            row.mtime_ns = mtime_ns
+            row.inode = inode
+            row.partial_hash = record["partial_hash"]
+            row.full_hash = record["full_hash"]
+            db.commit()
+
+            with self.lock:
+                self._saves_since_prune += 1
+                due = self._saves_since_prune >= _PRUNE_EVERY
+                if due:
+                    self._saves_since_prune = 0
+            if due:
+                self._prune(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Écriture de l'empreinte de {record['path']} impossible: {str(e)}")
+        finally:
+            db.close()
+
+    def _prune(self, db) -> None:
+        """Supprime les empreintes les plus anciennes au-delà de `max_entries`"""
+        excess = db.query(FileFingerprint).count() - self.max_entries
+        if excess <= 0:
+            return
+
+        oldest = db.query(FileFingerprint.key).order_by(FileFingerprint.updated_at).limit(excess)
+        deleted = db.query(FileFingerprint).filter(
+            FileFingerprint.key.in_(oldest.scalar_subquery())
+        ).delete(synchronize_session=False)
+        db.commit()
+        with self.lock:
+            self.stats['pruned'] += deleted
+        logger.debug(f"Empreintes de fichiers: {deleted} entrée(s) ancienne(s) supprimée(s)")
+
+    def _hash_full(self, file_path: Path) -> str:
+        """SHA-256 du contenu, lu par gros blocs dans un tampon réutilisé"""
+        hasher = hashlib.sha256()
+        buffer = bytearray(_READ_BUFFER_SIZE)
+        view = memoryview(buffer)
+        hashed = 0
+        with open(file_path, "rb", buffering=0) as f:
+            while read := f.readinto(buffer):
+                hasher.update(view[:read])
+                hashed += read
+
+        with self.lock:
+            self.stats['full_hashes'] += 1
+            self.stats['hashed_bytes'] += hashed
+        return hasher.hexdigest()
+
+    def _hash_partial(self, file_path: Path, size: int) -> str:
+        """SHA-256 de la taille et de trois échantillons (début, milieu, fin)"""
+        hasher = hashlib.sha256(f"{size}:".encode("ascii"))
+        offsets = sorted({0, max(0, size // 2 - _SAMPLE_SIZE // 2), max(0, size - _SAMPLE_SIZE)})
+        with open(file_path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                hasher.update(f.read(_SAMPLE_SIZE))
+
+        with self.lock:
+            self.stats['partial_hashes'] += 1
+            self.stats['hashed_bytes'] += min(size, len(offsets) * _SAMPLE_SIZE)
+        return hasher.hexdigest()
+
+    def _schedule_full_hash(self, key: str, file_path: Path, signature: Signature) -> bool:
+        """Planifie le hash complet en tâche de fond ; retourne True s'il est en attente"""
+        if self.workers <= 0:
+            return False
+
+        with self.lock:
+            if key in self._pending:
+                return True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fingerprint")
+            self._pending.add(key)
+            executor = self._executor
+
+        try:
+            executor.submit(self._background_full_hash, key, file_path, signature)
+        except RuntimeError:
+            # Pool arrêté (fermeture de l'application)
+            with self.lock:
+                self._pending.discard(key)
+            return False
+        return True
+
+    def _background_full_hash(self, key: str, file_path: Path, signature: Signature) -> None:
+        try:
+            full_hash = self._hash_full(file_path)
+            # Fichier modifié pendant la lecture : le hash ne correspond à aucune version
+            if self._signature(file_path.stat()) != signature:
+                logger.debug(f"{file_path} modifié pendant le calcul de son empreinte, résultat ignoré")
+                return
+
+            record = self._lookup(key, signature) or {
+                "path": str(file_path.resolve()),
+                "signature": signature,
+                "partial_hash": None,
+                "full_hash": None
+            }
+            record["full_hash"] = full_hash
+            self._save(key, record)
+            with self.lock:
+                self.stats['background_hashes'] += 1
+        except Exception as e:
+            logger.warning(f"Calcul de l'empreinte complète de {file_path} impossible: {str(e)}")
+        finally:
+            with self.lock:
+                self._pending.discard(key)
+
+    def shutdown(self) -> None:
+        """Arrête le pool de calcul (les hashes en attente seront recalculés à la demande)"""
+        with self.lock:
+            executor, self._executor = self._executor, None
+            self._pending.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def clear(self) -> int:
+        """Oublie toutes les empreintes ; retourne le nombre d'entrées supprimées en base"""
+        with self.lock:
+            self._memo.clear()
+        db = SessionLocal()
+        try:
+            deleted = db.query(FileFingerprint).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques des empreintes"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['memoized'] = len(self._memo)
+            stats['pending'] = len(self._pending)
+        stats['workers'] = self.workers
+        stats['max_entries'] = self.max_entries
+        stats['full_hash_max_mb'] = round(self.full_hash_max_bytes / (1024 * 1024), 2)
+        return stats
+
+
+# Instance globale
+file_fingerprints = FileFingerprintStore()
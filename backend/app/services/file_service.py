@@ -3,29 +3,39 @@ File service for DocuSense AI
 Handles file operations, scanning, and status management with new workflow
 """
 
+import base64
+import json
+import math
+import os
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, text, column
 from datetime import datetime
-import mimetypes
 
 from ..models.file import File
 from ..schemas.file import FileCreate, FileListResponse, FileResponse
 from ..core.file_utils import FileInfoExtractor
 from ..core.file_validation import FileValidator
 from ..core.status_manager import FileStatus
-from ..core.database_utils import DatabaseMetrics
-from ..core.cache import cached
+from ..core.database_utils import DatabaseMetrics, DatabaseUtils
 from ..core.performance_monitor import performance_monitor
+from ..core.search_index import search_index, build_match_query
 from ..core.database_migration import run_automatic_migrations, check_database_consistency
 from .base_service import BaseService, log_service_operation
+from .directory_indexer import directory_indexer
 from ..core.types import ServiceResponse, FileData
 
 
 class FileService(BaseService):
     """Service for file operations"""
 
+    # Champs de tri acceptés pour les listings de répertoires
+    LISTING_SORT_FIELDS = ("name", "size", "mtime", "status")
+    # La synchronisation DB ↔ système de fichiers ne tourne qu'une fois par processus
+    _filesystem_synchronized = False
+
     def __init__(self, db: Session):
         super().__init__(db)
         # Utilisation des formats centralisés depuis FileValidator
@@ -120,11 +130,20 @@ class FileService(BaseService):
             query = query.filter(File.is_selected)
 
         if search:
-            search_filter = or_(
-                File.name.ilike(f"%{search}%"),
-                File.path.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+            match = build_match_query(search, ["name", "path"]) if search_index.available else None
+            if match:
+                # Index FTS5 sur le nom et le chemin (préfixes de mots) au lieu d'un LIKE sur toute la table
+                query = query.filter(File.id.in_(
+                    text("SELECT rowid FROM files_fts WHERE files_fts MATCH :match")
+                    .bindparams(match=match)
+                    .columns(column("rowid"))
+                ))
+            else:
+                search_filter = or_(
+                    File.name.ilike(f"%{search}%"),
+                    File.path.ilike(f"%{search}%")
+                )
+                query = query.filter(search_filter)
 
         # Get total count
         total = query.count()
@@ -449,9 +468,10 @@ class FileService(BaseService):
                     "retry_after": None
                 }
             
-            # Essayer de lister le contenu pour vérifier l'accessibilité
+            # Ouvrir le répertoire suffit à vérifier l'accessibilité, sans le lister
             try:
-                test_items = list(directory.iterdir())
+                with os.scandir(directory):
+                    pass
                 return {
                     "accessible": True,
                     "error": None,
@@ -496,17 +516,29 @@ class FileService(BaseService):
 
     # MÉTHODE SUPPRIMÉE: list_directory_content() remplacée par list_directory_content_paginated()
 
-    @cached(ttl=300)  # OPTIMIZATION: Cache de 5 minutes pour la navigation paginée
     def list_directory_content_paginated(
         self, 
         directory_path: str, 
         page: int = 1, 
         page_size: int = 50, 
-        offset: int = 0
+        offset: int = 0,
+        sort_by: str = "name",
+        order: str = "asc",
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        List directory content with pagination - ULTRA-FAST VERSION
+        List directory content with keyset pagination - servi depuis l'index des répertoires
+
+        Sans curseur, la page est déterminée par `page`/`offset` ; avec un curseur
+        (`next_cursor`/`previous_cursor` d'une réponse précédente), la page reprend
+        juste après (ou avant) le dernier élément vu, même si le répertoire a changé.
+        Seuls les éléments de la page demandée sont construits.
         """
+        if sort_by not in self.LISTING_SORT_FIELDS:
+            raise ValueError(f"Tri non supporté: {sort_by}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Ordre non supporté: {order}")
+        anchor = self._decode_listing_cursor(cursor, sort_by, order) if cursor else None
         self.logger.info(f"Starting list_directory_content_paginated for: {directory_path}")
         try:
             # Vérifier l'accessibilité du disque avant de continuer
@@ -534,150 +566,96 @@ class FileService(BaseService):
                 error_messages = [error.message for error in validation_result.errors]
                 raise ValueError("; ".join(error_messages))
             
-            directory = Path(directory_path)
-            files = []
-            subdirectories = []
-            total_files = 0
-            total_subdirectories = 0
-
-            # Utiliser les fonctions réintégrées pour la gestion des formats
-            from ..core.file_validation import FileValidator
-            
-            # Récupérer les formats supportés
-            document_formats = FileValidator.get_supported_formats_for_type('document')
-            image_formats = FileValidator.get_supported_formats_for_type('image')
-            video_formats = FileValidator.get_supported_formats_for_type('video')
-            audio_formats = FileValidator.get_supported_formats_for_type('audio')
-            
-            all_supported_formats = document_formats + image_formats + video_formats + audio_formats
-            
             try:
-                # OPTIMISATION: 1 seule requête DB pour tout le répertoire
-                db_files_in_directory = self.db.query(File).filter(
-                    File.parent_directory == directory_path
-                ).all()
+                # Instantané du répertoire : re-scan uniquement si son mtime a changé
+                snapshot = directory_indexer.get_snapshot(directory_path)
                 
-                # Mapping path → file pour accès O(1)
-                db_files_map = {file.path: file for file in db_files_in_directory}
+                descending = order == "desc"
                 
-                # ULTRA-FAST: Direct filesystem scan
-                all_items = list(directory.iterdir())
+                status_map = None
+                if sort_by == "status":
+                    # Le statut vient de la base : une requête sur tout le répertoire, colonnes utiles seulement
+                    status_map = self._get_directory_status_map(snapshot.path)
+                    decorated = sorted(
+                        (
+                            ((self._listing_status(f, status_map.get(f.path)), f.name.casefold(), f.name), f)
+                            for f in snapshot.files.values()
+                        ),
+                        key=lambda item: item[0]
+                    )
+                    keys = [key for key, _ in decorated]
+                    entries = [f for _, f in decorated]
+                else:
+                    keys, entries = snapshot.sorted_files(sort_by)
                 
-                # Process all items first, then apply pagination to results
-                all_files = []
-                all_subdirectories = []
+                total_files = len(entries)
+                if anchor is None:
+                    begin = (page - 1) * page_size + offset
+                    stop = begin + page_size
+                elif anchor[0] == "after":
+                    begin = total_files - bisect_left(keys, anchor[1]) if descending else bisect_right(keys, anchor[1])
+                    stop = begin + page_size
+                else:
+                    stop = total_files - bisect_right(keys, anchor[1]) if descending else bisect_left(keys, anchor[1])
+                    begin = stop - page_size
+                begin = max(0, min(begin, total_files))
+                stop = max(begin, min(stop, total_files))
                 
-                for item_path in all_items:
-                    try:
-                        # Vérifier l'accessibilité de chaque élément individuellement
-                        if not item_path.exists():
-                            self.logger.warning(f"Élément non accessible: {item_path}")
-                            continue
-                            
-                        if item_path.is_file():
-                            total_files += 1
-                            item_path_str = str(item_path)
-                            
-                            # ULTRA-SIMPLE: Add all files without any error checking
-                            try:
-                                stat = item_path.stat()
-                                size = stat.st_size
-                            except:
-                                size = 0
-                            
-                            # Check if file format is supported
-                            extension = item_path.suffix.lower().lstrip('.')
-                            
-                            # Utiliser les imports déjà disponibles
-                            
-                            # Determine if format is supported
-                            mime_type, _ = mimetypes.guess_type(str(item_path))
-                            if mime_type:
-                                is_supported = self.supported_formats and any(format in mime_type for format in self.supported_formats)
-                            else:
-                                # Fallback pour les extensions sans MIME type
-                                is_supported = extension in ['pdf', 'docx', 'doc', 'txt', 'html', 'jpg', 'jpeg', 'png', 'gif', 'mp4', 'avi', 'mp3', 'wav']
-                            
-                            # Get proper MIME type
-                            if not mime_type:
-                                mime_type = mimetypes.guess_type(str(item_path))[0] or 'application/octet-stream'
-                            
-                            # Set status based on support
-                            status = "none" if is_supported else "unsupported"
-                            
-                            # VALIDATION AUTOMATIQUE: Vérifier cohérence DB ↔ Système de fichiers
-                            existing_file = db_files_map.get(item_path_str)
-                            
-                            if existing_file:
-                                # Fichier existe en DB - vérifier si l'analyse est encore valide
-                                if self._is_analysis_still_valid(existing_file, item_path):
-                                    status = existing_file.status.value
-                                    file_id = existing_file.id
-                                else:
-                                    # Analyse obsolète - remettre à "none" pour réanalyser
-                                    status = "none" if is_supported else "unsupported"
-                                    file_id = existing_file.id
-                                    # Mettre à jour automatiquement en DB
-                                    self._update_file_status_auto(existing_file, status, item_path)
-                            else:
-                                # Nouveau fichier - créer automatiquement en DB
-                                status = "none" if is_supported else "unsupported"
-                                file_id = self._create_file_auto(item_path, status, mime_type, size)
-                            
-                            file_info = {
-                                "name": item_path.name,
-                                "path": item_path_str,
-                                "size": size,
-                                "mime_type": mime_type,
-                                "status": status,
-                                "id": file_id
-                            }
-                            all_files.append(file_info)
-                            self.logger.info(f"FileService: Ajouté le fichier: {item_path.name} (ID: {file_info['id']}, Path: {item_path_str})")
-
-                        elif item_path.is_dir():
-                            total_subdirectories += 1
-                            try:
-                                # OPTIMISATION: Suppression du calcul de file_count pour la navigation
-                                all_subdirectories.append({
-                                    "name": item_path.name,
-                                    "path": str(item_path),
-                                    "file_count": 0,  # Supprimé pour la performance
-                                    "has_permission": True
-                                })
-                            except PermissionError:
-                                all_subdirectories.append({
-                                    "name": item_path.name,
-                                    "path": str(item_path),
-                                    "file_count": 0,
-                                    "has_permission": False
-                                })
-                    except PermissionError:
-                        continue
-                    except Exception as e:
-                        self.logger.warning(f"Error processing {item_path}: {str(e)}")
-                        continue
-
-                # Return all files and subdirectories without pagination for now
-                files = all_files
-                subdirectories = all_subdirectories
+                # Indices dans l'ordre croissant des éléments de la page (ordre d'affichage)
+                positions = [total_files - 1 - i for i in range(begin, stop)] if descending else range(begin, stop)
+                page_entries = [entries[i] for i in positions]
                 
-                # Log des résultats
-                self.logger.info(f"Found {len(all_files)} files and {len(all_subdirectories)} subdirectories in {directory_path}")
+                if status_map is None:
+                    status_map = self._get_directory_status_map(
+                        snapshot.path, [f.path for f in page_entries]
+                    )
                 
-
+                files = []
+                for indexed in page_entries:
+                    db_entry = status_map.get(indexed.path)
+                    files.append({
+                        "name": indexed.name,
+                        "path": indexed.path,
+                        "size": indexed.size,
+                        "mime_type": indexed.mime_type,
+                        "status": self._listing_status(indexed, db_entry),
+                        "id": db_entry[0] if db_entry else None
+                    })
+                
+                has_previous = begin > 0
+                has_next = stop < total_files
+                first_key = keys[positions[0]] if files else None
+                last_key = keys[positions[-1]] if files else None
+                
+                # Les sous-répertoires (triés par nom) accompagnent la première page
+                subdirectories = [
+                    {
+                        "name": subdirectory.name,
+                        "path": subdirectory.path,
+                        "file_count": 0,  # Supprimé pour la performance
+                        "has_permission": subdirectory.has_permission
+                    }
+                    for subdirectory in snapshot.sorted_subdirectories()
+                ] if not has_previous else []
+                
+                # Log des résultats
+                self.logger.info(f"Found {total_files} files and {len(snapshot.subdirectories)} subdirectories in {directory_path}")
 
                 return {
                     "directory": directory_path,
                     "files": files,
                     "subdirectories": subdirectories,
-                    "total_files": len(files),
-                    "total_subdirectories": len(all_subdirectories),
-                    "page": page,
+                    "total_files": total_files,
+                    "total_subdirectories": len(snapshot.subdirectories),
+                    "page": begin // page_size + 1,
                     "page_size": page_size,
-                    "total_pages": 1,
-                    "has_next": False,
-                    "has_previous": False
+                    "total_pages": max(1, math.ceil(total_files / page_size)),
+                    "sort_by": sort_by,
+                    "order": order,
+                    "has_next": has_next,
+                    "has_previous": has_previous,
+                    "next_cursor": self._encode_listing_cursor("after", last_key, sort_by, order) if has_next else None,
+                    "previous_cursor": self._encode_listing_cursor("before", first_key, sort_by, order) if has_previous else None
                 }
 
             except Exception as e:
@@ -700,126 +678,95 @@ class FileService(BaseService):
             self.logger.error(f"Error listing directory {directory_path}: {str(e)}")
             raise
 
-    def _is_analysis_still_valid(self, db_file: File, file_path: Path) -> bool:
-        """
-        Vérifie si l'analyse d'un fichier est encore valide
-        """
-        try:
-            # Vérifier la date de modification
-            file_mtime = file_path.stat().st_mtime
-            db_mtime = db_file.file_modified_at.timestamp() if db_file.file_modified_at else 0
-            
-            # Si le fichier a été modifié après l'analyse
-            if file_mtime > db_mtime:
-                self.logger.info(f"Fichier modifié: {file_path.name} (analyse obsolète)")
-                return False
-                
-            # Vérifier la taille
-            if file_path.stat().st_size != db_file.size:
-                self.logger.info(f"Taille modifiée: {file_path.name} (analyse obsolète)")
-                return False
-                
-            return True
-        except Exception as e:
-            self.logger.warning(f"Erreur validation fichier {file_path}: {str(e)}")
-            return False
-
-    def _update_file_status_auto(self, db_file: File, new_status: str, file_path: Path):
-        """
-        Met à jour automatiquement le statut d'un fichier
-        """
+    def _get_directory_status_map(self, directory_path: str, paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """(id, statut) des fichiers connus en base, pour tout le répertoire ou certains chemins"""
+        query = self.db.query(File.path, File.id, File.status).filter(File.parent_directory == directory_path)
+        if paths is not None:
+            if not paths:
+                return {}
+            query = query.filter(File.path.in_(paths))
+        return {path: (file_id, status) for path, file_id, status in query}
+
+    @staticmethod
+    def _listing_status(indexed, db_entry) -> str:
+        if db_entry:
+            return db_entry[1].value
+        return "none" if indexed.is_supported else "unsupported"
+
+    @staticmethod
+    def _encode_listing_cursor(direction: str, key: tuple, sort_by: str, order: str) -> str:
+        payload = json.dumps({"d": direction, "k": list(key), "s": sort_by, "o": order}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_listing_cursor(cursor: str, sort_by: str, order: str) -> tuple:
+        """Retourne (direction, clé de tri) ; le curseur doit correspondre au tri demandé"""
         try:
-            from ..models.file import FileStatus
-            from datetime import datetime
-            
-            # Mettre à jour le statut
-            db_file.status = FileStatus(new_status)
-            
-            # Mettre à jour les métadonnées du fichier
-            stat = file_path.stat()
-            db_file.size = stat.st_size
-            db_file.file_modified_at = datetime.fromtimestamp(stat.st_mtime)
-            db_file.file_accessed_at = datetime.fromtimestamp(stat.st_atime)
-            
-            # Effacer l'analyse obsolète
-            if new_status in ["none", "unsupported"]:
-                db_file.extracted_text = None
-                db_file.analysis_result = None
-                db_file.analysis_metadata = None
-                db_file.error_message = None
-            
-            self.db.commit()
-            self.logger.info(f"Statut mis à jour automatiquement: {file_path.name} -> {new_status}")
-            
-        except Exception as e:
-            self.logger.error(f"Erreur mise à jour automatique {file_path}: {str(e)}")
-            self.db.rollback()
-
-    def _create_file_auto(self, file_path: Path, status: str, mime_type: str, size: int) -> Optional[int]:
-        """
-        Crée automatiquement un fichier en base de données
-        """
-        try:
-            from ..models.file import FileStatus
-            from ..schemas.file import FileCreate
-            from datetime import datetime
-            
-            # Extraire les métadonnées du fichier
-            stat = file_path.stat()
-            
-            file_info = {
-                "name": file_path.name,
-                "path": str(file_path),
-                "size": size,
-                "mime_type": mime_type,
-                "status": FileStatus(status),
-                "parent_directory": str(file_path.parent),
-                "file_created_at": datetime.fromtimestamp(stat.st_ctime),
-                "file_modified_at": datetime.fromtimestamp(stat.st_mtime),
-                "file_accessed_at": datetime.fromtimestamp(stat.st_atime)
-            }
-            
-            file_create = FileCreate(**file_info)
-            db_file = self._create_file(file_create)
-            
-            self.logger.info(f"Fichier créé automatiquement: {file_path.name} (ID: {db_file.id})")
-            return db_file.id
-            
-        except Exception as e:
-            self.logger.error(f"Erreur création automatique {file_path}: {str(e)}")
-            return None
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            direction, key = payload["d"], tuple(payload["k"])
+            cursor_sort, cursor_order = payload["s"], payload["o"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Curseur de pagination invalide")
+        if direction not in ("after", "before") or (cursor_sort, cursor_order) != (sort_by, order):
+            raise ValueError("Curseur de pagination incompatible avec le tri demandé")
+        return direction, key
 
     def _synchronize_database_with_filesystem(self):
         """
         Synchronise automatiquement la base de données avec le système de fichiers
         au démarrage de l'application
+        
+        Les mises à jour sont écrites en un UPDATE en lot et les suppressions dans
+        la même transaction.
         """
+        if FileService._filesystem_synchronized:
+            return
+        FileService._filesystem_synchronized = True
+        
         try:
             self.logger.info("🔄 Synchronisation automatique DB ↔ Système de fichiers")
             
-            # Récupérer tous les fichiers en base
-            all_db_files = self.db.query(File).all()
+            # Récupérer tous les fichiers en base (colonnes utiles seulement, pas le texte extrait)
+            all_db_files = self.db.query(File.id, File.path, File.size, File.file_modified_at).all()
             
-            updated_count = 0
-            deleted_count = 0
+            updated_files = []
+            deleted_ids = []
             
-            for db_file in all_db_files:
-                file_path = Path(db_file.path)
-                
-                if file_path.exists():
-                    # Fichier existe - vérifier s'il a été modifié
-                    if not self._is_analysis_still_valid(db_file, file_path):
-                        # Mettre à jour automatiquement
-                        self._update_file_status_auto(db_file, "none", file_path)
-                        updated_count += 1
-                else:
+            for file_id, path, size, modified_at in all_db_files:
+                # Un seul appel système par fichier : le stat sert aussi à la validation
+                try:
+                    file_stat = os.stat(path)
+                except (FileNotFoundError, NotADirectoryError):
                     # Fichier n'existe plus - le supprimer
-                    self.db.delete(db_file)
-                    deleted_count += 1
+                    deleted_ids.append(file_id)
+                    continue
+                except OSError as e:
+                    self.logger.warning(f"Fichier inaccessible, ignoré: {path} ({str(e)})")
+                    continue
+                
+                # Fichier existe - vérifier s'il a été modifié
+                db_mtime = modified_at.timestamp() if modified_at else 0
+                if file_stat.st_mtime > db_mtime or file_stat.st_size != size:
+                    updated_files.append({
+                        "id": file_id,
+                        "status": FileStatus.NONE,
+                        "size": file_stat.st_size,
+                        "file_modified_at": datetime.fromtimestamp(file_stat.st_mtime),
+                        "file_accessed_at": datetime.fromtimestamp(file_stat.st_atime),
+                        "extracted_text": None,
+                        "analysis_result": None,
+                        "analysis_metadata": None,
+                        "error_message": None
+                    })
             
-            if updated_count > 0 or deleted_count > 0:
-                self.db.commit()
-                self.logger.info(f"✅ Synchronisation terminée: {updated_count} mis à jour, {deleted_count} supprimés")
+            if updated_files or deleted_ids:
+                # Suppressions via l'ORM pour conserver la cascade sur les analyses
+                for start in range(0, len(deleted_ids), 500):
+                    for db_file in self.db.query(File).filter(File.id.in_(deleted_ids[start:start + 500])):
+                        self.db.delete(db_file)
+                DatabaseUtils.bulk_upsert_files(self.db, [], updated_files)
+                self.logger.info(f"✅ Synchronisation terminée: {len(updated_files)} mis à jour, {len(deleted_ids)} supprimés")
             else:
                 self.logger.info("✅ Base de données déjà synchronisée")
                 
@@ -10,6 +10,8 @@ import asyncio
 
 from ..models.file import File, FileStatus
 from .document_extractor_service import DocumentExtractorService
+from .extraction_cache import extraction_cache
+from .extraction_engine import extraction_engine
 from .base_service import BaseService, log_service_operation
 from ..core.types import ServiceResponse, FileData
 
@@ -54,7 +56,8 @@ class OCRService(BaseService):
             text = await self._extract_text_from_text_file(file.path)
         elif self.document_extractor.is_format_supported(extension):
             # Utiliser le service d'extraction de documents Office
-            text = await self.document_extractor.extract_text(file.path)
+            response = await self.document_extractor.extract_text(file.path)
+            text = response.get("data", {}).get("text") if response.get("success") else None
         else:
             # For other files, try direct extraction
             text = await self._extract_text_from_text_file(file.path)
@@ -75,25 +78,12 @@ class OCRService(BaseService):
 
     async def _extract_text_from_image(self, image_path: str) -> Optional[str]:
         """
-        Extract text from image using OCR
+        Extract text from image using OCR (extraction process pool, cached by content)
         """
         try:
-            import pytesseract
-            from PIL import Image
-            
-            # Open the image
-            image = Image.open(image_path)
-            
-            # Extract text using OCR
-            text = pytesseract.image_to_string(image, lang='fra+eng')
-            
-            # Clean up the extracted text
-            if text:
-                # Remove extra whitespace and normalize
-                text = ' '.join(text.split())
-                return text if text.strip() else None
-            
-            return None
+            return await extraction_cache.get_or_extract(
+                image_path, "image_ocr", lambda: extraction_engine.run("image_ocr", image_path)
+            )
 
         except ImportError:
             self.logger.warning("pytesseract not available, falling back to mock OCR")
@@ -106,47 +96,13 @@ class OCRService(BaseService):
 
     async def _extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
         """
-        Extract text from PDF
+        Extract text from PDF, page batches spread over the extraction pool
+        (text layer for digital pages, OCR for scanned ones)
         """
         try:
-            import PyPDF2
-            import pdfplumber
-            
-            text_content = []
-            
-            # Try pdfplumber first (better for complex PDFs)
-            try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(page_text.strip())
-                
-                if text_content:
-                    return '\n\n'.join(text_content)
-                    
-            except Exception as e:
-                self.logger.warning(f"pdfplumber failed, trying PyPDF2: {e}")
-            
-            # Fallback to PyPDF2
-            try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(page_text.strip())
-                
-                if text_content:
-                    return '\n\n'.join(text_content)
-                    
-            except Exception as e:
-                self.logger.warning(f"PyPDF2 failed: {e}")
-            
-            # If both methods fail, return None
-            self.logger.warning(f"Could not extract text from PDF: {pdf_path}")
-            return None
+            return await extraction_cache.get_or_extract(
+                pdf_path, extraction_engine.pdf_extractor_tag(), lambda: extraction_engine.extract_pdf(pdf_path)
+            )
 
         except ImportError:
             self.logger.warning("PDF libraries not available, falling back to mock extraction")
@@ -168,9 +124,8 @@ class OCRService(BaseService):
             if extension in ["html", "htm"]:
                 return await self._extract_text_from_html(file_path)
 
-            # For other text files, read directly
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
+            # For other text files, read directly (off the event loop)
+            text = await asyncio.to_thread(Path(file_path).read_text, encoding='utf-8', errors='ignore')
 
             return text if text.strip() else None
 
@@ -185,8 +140,7 @@ class OCRService(BaseService):
         try:
             import re
 
-            with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                html_content = f.read()
+            html_content = await asyncio.to_thread(Path(html_path).read_text, encoding='utf-8', errors='ignore')
 
             # Remove HTML tags
             text = re.sub(r'<[^>]+>', ' ', html_content)
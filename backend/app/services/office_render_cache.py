@@ -0,0 +1,223 @@
+"""
+Cache disque des rendus HTML des documents Office pour DocuSense AI
+Un rendu est identifié par (chemin, mtime, taille) et découpé en sections
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand les convertisseurs changent de sortie : les anciens rendus ne sont plus lus
+RENDER_VERSION = 1
+
+_INDEX_FILE = "index.json"
+
+
+class OfficeRenderCache:
+    """
+    Rendus HTML stockés sur disque, un répertoire par (chemin, mtime, taille)
+
+    Chaque section (feuille, diapositive, page de texte) est un fichier : une
+    page du visualiseur ne relit que ses sections. L'éviction supprime les
+    rendus les moins récemment consultés au-delà de la taille maximale.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or settings.office_render_cache_dir)
+        self.max_size_bytes = (max_size_mb or settings.office_render_cache_max_mb) * 1024 * 1024
+        self.lock = threading.Lock()
+        # Un seul rendu en cours par clé, les requêtes concurrentes l'attendent :
+        # clé -> [verrou, nombre de requêtes qui le détiennent ou l'attendent]
+        self._render_locks: Dict[str, list] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def make_key(file_path: Path, st: os.stat_result) -> str:
+        """Clé SHA-256 du chemin, du mtime et de la taille (plus la version des convertisseurs)"""
+        identity = f"{RENDER_VERSION}|{file_path.resolve()}|{st.st_mtime_ns}|{st.st_size}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def load_index(self, key: str) -> Optional[Dict[str, Any]]:
+        """Index d'un rendu (conteneur, libellés des sections, taille) ; None s'il n'est pas en cache"""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(entry_dir / _INDEX_FILE, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            # La date de modification du répertoire sert d'horodatage LRU
+            os.utime(entry_dir)
+            return index
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Rendu Office en cache illisible ({key[:12]}): {str(e)}")
+            return None
+
+    def load_sections(self, key: str, start: int, end: int) -> Optional[List[str]]:
+        """
+        Sections [start, end) d'un rendu
+
+        Retourne None si le rendu a été évincé depuis la lecture de son index ;
+        un rendu partiellement supprimé est retiré pour être re-rendu.
+        """
+        entry_dir = self._entry_dir(key)
+        sections = []
+        try:
+            for number in range(start, end):
+                with open(entry_dir / f"{number:05d}.html", "r", encoding="utf-8") as f:
+                    sections.append(f.read())
+        except FileNotFoundError:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        return sections
+
+    def store(self, key: str, container: str, sections: List[str], labels: List[str]) -> Dict[str, Any]:
+        """Écrit un rendu puis applique l'éviction ; retourne son index"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = self.cache_dir / f".{key}.{uuid.uuid4().hex}"
+        temp_dir.mkdir()
+        try:
+            size = 0
+            for number, section in enumerate(sections):
+                data = section.encode("utf-8")
+                (temp_dir / f"{number:05d}.html").write_bytes(data)
+                size += len(data)
+
+            index = {"container": container, "labels": labels, "count": len(sections), "size": size}
+            with open(temp_dir / _INDEX_FILE, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+
+            # Renommage atomique : un lecteur voit le rendu complet ou rien
+            try:
+                os.replace(temp_dir, self._entry_dir(key))
+            except OSError:
+                # Déjà écrit par un autre processus
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        with self.lock:
+            self.stats['stores'] += 1
+        self._evict()
+        return index
+
+    async def get_or_render(
+        self,
+        key: str,
+        render: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Index du rendu en cache, sinon appelle `render` et stocke son résultat
+
+        `render` retourne {"container", "sections", "labels"}.
+        """
+        index = await asyncio.to_thread(self.load_index, key)
+        if index is not None:
+            with self.lock:
+                self.stats['hits'] += 1
+            return index
+
+        waiters = self._render_locks.get(key)
+        if waiters is None:
+            waiters = self._render_locks[key] = [asyncio.Lock(), 0]
+        waiters[1] += 1
+        try:
+            async with waiters[0]:
+                # Rendu terminé par une requête concurrente pendant l'attente
+                index = await asyncio.to_thread(self.load_index, key)
+                if index is not None:
+                    with self.lock:
+                        self.stats['hits'] += 1
+                    return index
+
+                with self.lock:
+                    self.stats['misses'] += 1
+                rendered = await render()
+                return await asyncio.to_thread(
+                    self.store, key, rendered["container"], rendered["sections"], rendered["labels"]
+                )
+        finally:
+            waiters[1] -= 1
+            if waiters[1] == 0:
+                self._render_locks.pop(key, None)
+
+    def _scan_entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        try:
+            iterator = os.scandir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        with iterator:
+            for entry in iterator:
+                if entry.name.startswith(".") or not entry.is_dir():
+                    continue
+                try:
+                    with open(os.path.join(entry.path, _INDEX_FILE), "r", encoding="utf-8") as f:
+                        size = json.load(f).get("size", 0)
+                    entries.append({"path": entry.path, "size": size, "mtime": entry.stat().st_mtime})
+                except (OSError, ValueError):
+                    continue
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._scan_entries()
+        total_size = sum(entry["size"] for entry in entries)
+        if total_size <= self.max_size_bytes:
+            return
+
+        evicted = 0
+        for entry in sorted(entries, key=lambda item: item["mtime"]):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry["path"], ignore_errors=True)
+            total_size -= entry["size"]
+            evicted += 1
+
+        with self.lock:
+            self.stats['evictions'] += evicted
+        logger.debug(f"Cache des rendus Office: {evicted} rendu(s) LRU supprimé(s)")
+
+    def clear(self) -> int:
+        """Vide le cache ; retourne le nombre de rendus supprimés"""
+        entries = self._scan_entries()
+        for entry in entries:
+            shutil.rmtree(entry["path"], ignore_errors=True)
+        return len(entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (compteurs en mémoire + occupation disque)"""
+        with self.lock:
+            stats = dict(self.stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate_percent'] = round(stats['hits'] / lookups * 100, 2) if lookups else 0
+        stats['cache_dir'] = str(self.cache_dir)
+        stats['max_size_mb'] = round(self.max_size_bytes / (1024 * 1024), 2)
+
+        entries = self._scan_entries()
+        stats['entries'] = len(entries)
+        stats['size_mb'] = round(sum(entry["size"] for entry in entries) / (1024 * 1024), 2)
+        return stats
+
+
+# Instance globale
+office_render_cache = OfficeRenderCache()
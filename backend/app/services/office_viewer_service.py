@@ -4,21 +4,129 @@ Converts Office documents to HTML for direct browser viewing
 """
 
 from pathlib import Path
-import tempfile
-import shutil
-from typing import Optional, Dict, Any
+import html
+import math
+from typing import Optional, Dict, Any, List, Callable, Tuple
 from sqlalchemy.orm import Session
 import asyncio
-import logging
 
 from .base_service import BaseService, log_service_operation
+from .extraction_engine import extraction_engine
+from .office_render_cache import office_render_cache
+from ..core.config import settings
 from ..core.types import ServiceResponse
 from ..core.media_formats import get_supported_formats_keys, is_format_supported_in_dict
 
+# Découpage des rendus en sections (unité de pagination du visualiseur)
+_SHEET_ROWS_PER_SECTION = 100
+_SHEET_MAX_COLUMNS = 19
+_BLOCKS_PER_SECTION = 50
+_TEXT_LINES_PER_SECTION = 200
+
+_VIEWER_STYLES = """
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+        margin: 0;
+        padding: 20px;
+        background-color: #1e293b;
+        color: #e2e8f0;
+        line-height: 1.6;
+    }
+    .office-document, .office-spreadsheet, .office-presentation {
+        max-width: 1200px;
+        margin: 0 auto;
+        background-color: #334155;
+        padding: 30px;
+        border-radius: 8px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    .document-title {
+        color: #3b82f6;
+        border-bottom: 2px solid #3b82f6;
+        padding-bottom: 10px;
+        margin-bottom: 30px;
+    }
+    .paragraph {
+        margin-bottom: 15px;
+        text-align: justify;
+    }
+    .document-table, .spreadsheet-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 20px 0;
+        background-color: #475569;
+    }
+    .document-table td, .spreadsheet-table td {
+        border: 1px solid #64748b;
+        padding: 8px 12px;
+        text-align: left;
+    }
+    .document-table tr:nth-child(even), .spreadsheet-table tr:nth-child(even) {
+        background-color: #526480;
+    }
+    .sheet-title, .slide-title {
+        color: #10b981;
+        margin: 25px 0 15px 0;
+        font-size: 1.2em;
+    }
+    .slide {
+        margin: 20px 0;
+        padding: 20px;
+        background-color: #475569;
+        border-radius: 6px;
+        border-left: 4px solid #10b981;
+    }
+    .slide-text {
+        margin: 10px 0;
+    }
+    .spreadsheet-content, .presentation-content {
+        background-color: #475569;
+        padding: 20px;
+        border-radius: 6px;
+        margin: 15px 0;
+    }
+    .spreadsheet-text, .presentation-text {
+        white-space: pre-wrap;
+        font-family: 'Courier New', monospace;
+        font-size: 0.9em;
+        line-height: 1.4;
+    }
+    .fallback {
+        text-align: center;
+        padding: 40px;
+    }
+    .fallback-message {
+        background-color: #dc2626;
+        color: #fecaca;
+        padding: 20px;
+        border-radius: 6px;
+        margin: 20px 0;
+    }
+    .fallback-message p {
+        margin: 10px 0;
+    }
+    .viewer-pagination {
+        max-width: 1200px;
+        margin: 20px auto;
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        color: #94a3b8;
+    }
+    .viewer-pagination a {
+        color: #3b82f6;
+        text-decoration: none;
+    }
+"""
+
 
 class OfficeViewerService(BaseService):
     """
     Service de conversion des documents Office pour visualisation web
+
+    Les convertisseurs découpent le document en sections (feuille par tranches
+    de lignes, diapositive, groupe de paragraphes) ; le rendu est mis en cache
+    sur disque et servi page par page.
     """
 
     def __init__(self, db: Session):
@@ -28,29 +136,26 @@ class OfficeViewerService(BaseService):
             'docx': self._convert_docx_to_html,
             'doc': self._convert_doc_to_html,
             'odt': self._convert_odt_to_html,
-            
+
             # Tableurs Excel
             'xlsx': self._convert_xlsx_to_html,
             'xls': self._convert_xls_to_html,
             'ods': self._convert_ods_to_html,
-            
+
             # Présentations PowerPoint
             'pptx': self._convert_pptx_to_html,
             'ppt': self._convert_ppt_to_html,
             'odp': self._convert_odp_to_html,
         }
-        
-        # Cache temporaire pour les conversions
-        self._conversion_cache = {}
 
     @log_service_operation("convert_to_html")
     async def convert_to_html(self, file_path: str) -> ServiceResponse:
         """
-        Convertit un fichier Office en HTML pour visualisation
-        
+        Convertit un fichier Office en HTML pour visualisation (document complet)
+
         Args:
             file_path: Chemin vers le fichier Office
-            
+
         Returns:
             ServiceResponse: HTML généré ou erreur
         """
@@ -63,297 +168,361 @@ class OfficeViewerService(BaseService):
     async def _convert_to_html_logic(self, file_path: str) -> str:
         """Logic for converting file to HTML"""
         file_path = Path(file_path)
+        _, index, sections = await self._get_sections(file_path, lambda index: (0, index["count"]))
+        return self._wrap_sections(file_path, index["container"], sections)
+
+    @log_service_operation("render_page")
+    async def render_page(self, file_path: str, page: int = 1, page_size: int = 5) -> ServiceResponse:
+        """
+        Page HTML complète d'un document Office, avec navigation entre les pages
+
+        Args:
+            file_path: Chemin vers le fichier Office
+            page: Numéro de page (à partir de 1)
+            page_size: Sections (feuilles, diapositives, pages de texte) par page
+
+        Returns:
+            ServiceResponse: HTML de la page, ETag et informations de pagination
+        """
+        try:
+            data = await self.safe_execute_async("render_page_logic", self._render_page_logic, file_path, page, page_size)
+            return {"success": True, "data": data}
+        except Exception as e:
+            return {"success": False, "error": f"Erreur lors de la conversion: {str(e)}"}
+
+    async def _render_page_logic(self, file_path: str, page: int, page_size: int) -> Dict[str, Any]:
+        file_path = Path(file_path)
+
+        def page_bounds(index: Dict[str, Any]) -> Tuple[int, int]:
+            start = (min(page, self._total_pages(index, page_size)) - 1) * page_size
+            return start, min(start + page_size, index["count"])
+
+        key, index, sections = await self._get_sections(file_path, page_bounds)
+        start, end = page_bounds(index)
+        total_pages = self._total_pages(index, page_size)
+        page = min(page, total_pages)
+
+        body = self._wrap_sections(file_path, index["container"], sections)
+        navigation = self._pagination(page, total_pages, page_size, index["labels"][start:end])
+        return {
+            "html": self._wrap_page(file_path, navigation + body + navigation),
+            "etag": self.make_etag(key, page, page_size),
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "sections": index["labels"][start:end],
+            "file_path": str(file_path)
+        }
+
+    def get_page_etag(self, file_path: str, page: int, page_size: int) -> str:
+        """ETag d'une page, calculé sans conversion (chemin, mtime, taille)"""
+        file_path = Path(file_path)
+        return self.make_etag(office_render_cache.make_key(file_path, file_path.stat()), page, page_size)
+
+    @staticmethod
+    def make_etag(key: str, page: int, page_size: int) -> str:
+        return f'"{key[:32]}-{page}-{page_size}"'
+
+    @staticmethod
+    def _total_pages(index: Dict[str, Any], page_size: int) -> int:
+        return max(1, math.ceil(index["count"] / page_size))
+
+    async def _get_sections(
+        self,
+        file_path: Path,
+        bounds: Callable[[Dict[str, Any]], Tuple[int, int]]
+    ) -> Tuple[str, Dict[str, Any], List[str]]:
+        """Clé, index et sections [start, end) du rendu ; re-rendu si l'éviction l'a supprimé entre-temps"""
+        for _ in range(3):
+            key, index = await self._get_rendering(file_path)
+            start, end = bounds(index)
+            sections = await asyncio.to_thread(office_render_cache.load_sections, key, start, end)
+            if sections is not None:
+                return key, index, sections
+        raise RuntimeError(f"Rendu de {file_path.name} évincé du cache pendant sa lecture")
+
+    async def _get_rendering(self, file_path: Path):
+        """Clé et index du rendu en cache, conversion si nécessaire"""
         if not file_path.exists():
             raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
 
         extension = file_path.suffix.lower().lstrip('.')
-        
+
         if extension not in self.supported_formats:
             raise ValueError(f"Format non supporté pour la visualisation: {extension}")
 
-        # Vérifier le cache
-        cache_key = f"{file_path}_{file_path.stat().st_mtime}"
-        if cache_key in self._conversion_cache:
-            return self._conversion_cache[cache_key]
-
-        # Convertir le fichier
+        key = office_render_cache.make_key(file_path, file_path.stat())
         converter_func = self.supported_formats[extension]
-        html_content = await asyncio.to_thread(converter_func, file_path)
-        
-        # Mettre en cache
-        self._conversion_cache[cache_key] = html_content
-        
-        return html_content
-
-    def _convert_docx_to_html(self, file_path: Path) -> str:
+
+        async def render() -> Dict[str, Any]:
+            # Convertir le fichier hors de la boucle asyncio
+            return await asyncio.to_thread(converter_func, file_path)
+
+        return key, await office_render_cache.get_or_render(key, render)
+
+    @staticmethod
+    def _wrap_sections(file_path: Path, container: str, sections: List[str]) -> str:
+        html_parts = [f'<div class="{container}">']
+        html_parts.append(f'<h1 class="document-title">{html.escape(file_path.stem)}</h1>')
+        html_parts.extend(sections)
+        html_parts.append('</div>')
+        return '\n'.join(html_parts)
+
+    @staticmethod
+    def _pagination(page: int, total_pages: int, page_size: int, labels: List[str]) -> str:
+        if total_pages <= 1:
+            return ''
+        previous_link = (
+            f'<a href="?html=true&page={page - 1}&page_size={page_size}">← Précédent</a>' if page > 1 else '<span></span>'
+        )
+        next_link = (
+            f'<a href="?html=true&page={page + 1}&page_size={page_size}">Suivant →</a>' if page < total_pages else '<span></span>'
+        )
+        position = f'Page {page} / {total_pages}'
+        if labels:
+            position += f' — {html.escape(labels[0])}' + (f' … {html.escape(labels[-1])}' if len(labels) > 1 else '')
+        return f'<nav class="viewer-pagination">{previous_link}<span>{position}</span>{next_link}</nav>'
+
+    @staticmethod
+    def _wrap_page(file_path: Path, body: str) -> str:
+        """Page HTML complète avec les styles du visualiseur"""
+        return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(file_path.name)}</title>
+    <style>{_VIEWER_STYLES}</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+    @staticmethod
+    def _rendering(container: str, sections: List[str], labels: List[str]) -> Dict[str, Any]:
+        return {"container": container, "sections": sections, "labels": labels}
+
+    def _group_blocks(self, container: str, blocks: List[str]) -> Dict[str, Any]:
+        """Regroupe des blocs (paragraphes, tableaux) en sections de taille fixe"""
+        sections = [
+            '\n'.join(blocks[start:start + _BLOCKS_PER_SECTION])
+            for start in range(0, len(blocks), _BLOCKS_PER_SECTION)
+        ] or ['']
+        labels = [f"Section {number}" for number in range(1, len(sections) + 1)]
+        return self._rendering(container, sections, labels)
+
+    def _convert_docx_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier DOCX en HTML"""
         try:
             from docx import Document
-            
+
             doc = Document(file_path)
-            html_parts = ['<div class="office-document">']
-            
-            # Titre du document
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            
+            blocks = []
+
             # Paragraphes
             for paragraph in doc.paragraphs:
                 if paragraph.text.strip():
                     style = paragraph.style.name if paragraph.style else 'Normal'
-                    html_parts.append(f'<p class="paragraph {style.lower()}">{paragraph.text}</p>')
-            
+                    blocks.append(f'<p class="paragraph {html.escape(style.lower())}">{html.escape(paragraph.text)}</p>')
+
             # Tableaux
             for table in doc.tables:
-                html_parts.append('<table class="document-table">')
+                table_parts = ['<table class="document-table">']
                 for row in table.rows:
-                    html_parts.append('<tr>')
+                    table_parts.append('<tr>')
                     for cell in row.cells:
-                        html_parts.append(f'<td>{cell.text}</td>')
-                    html_parts.append('</tr>')
-                html_parts.append('</table>')
-            
-            html_parts.append('</div>')
-            return '\n'.join(html_parts)
-            
+                        table_parts.append(f'<td>{html.escape(cell.text)}</td>')
+                    table_parts.append('</tr>')
+                table_parts.append('</table>')
+                blocks.append('\n'.join(table_parts))
+
+            return self._group_blocks("office-document", blocks)
+
         except ImportError:
             return self._fallback_conversion(file_path, "DOCX")
         except Exception as e:
             self.logger.error(f"Erreur conversion DOCX: {e}")
             return self._fallback_conversion(file_path, "DOCX")
 
-    def _convert_xlsx_to_html(self, file_path: Path) -> str:
-        """Convertit un fichier XLSX en HTML"""
+    def _convert_xlsx_to_html(self, file_path: Path) -> Dict[str, Any]:
+        """Convertit un fichier XLSX en HTML, une section par tranche de lignes de chaque feuille"""
         try:
             import openpyxl
-            
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            html_parts = ['<div class="office-spreadsheet">']
-            
-            # Titre du document
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            
-            # Parcourir toutes les feuilles
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                html_parts.append(f'<h2 class="sheet-title">{sheet_name}</h2>')
-                html_parts.append('<table class="spreadsheet-table">')
-                
-                # Trouver les limites des données
-                max_row = sheet.max_row
-                max_col = sheet.max_column
-                
-                for row in range(1, min(max_row + 1, 100)):  # Limiter à 100 lignes
-                    html_parts.append('<tr>')
-                    for col in range(1, min(max_col + 1, 20)):  # Limiter à 20 colonnes
-                        cell = sheet.cell(row=row, column=col)
-                        value = cell.value if cell.value is not None else ''
-                        html_parts.append(f'<td>{value}</td>')
-                    html_parts.append('</tr>')
-                
-                html_parts.append('</table>')
-            
-            html_parts.append('</div>')
-            return '\n'.join(html_parts)
-            
+
+            # Lecture seule : lignes lues en flux
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            sections = []
+            labels = []
+
+            def add_section(sheet_title: str, first_row: int, rows: List[str]) -> None:
+                last_row = first_row + len(rows) - 1
+                sections.append('\n'.join([
+                    f'<h2 class="sheet-title">{html.escape(sheet_title)} (lignes {first_row}–{last_row})</h2>',
+                    '<table class="spreadsheet-table">',
+                    *rows,
+                    '</table>'
+                ]))
+                labels.append(f"{sheet_title} {first_row}-{last_row}")
+
+            try:
+                # Parcourir toutes les feuilles
+                for sheet in workbook.worksheets:
+                    rows = []
+                    first_row = 1
+                    for row in sheet.iter_rows(
+                        max_row=settings.office_render_max_rows, max_col=_SHEET_MAX_COLUMNS, values_only=True
+                    ):
+                        cells = ''.join(
+                            f'<td>{html.escape(str(value)) if value is not None else ""}</td>' for value in row
+                        )
+                        rows.append(f'<tr>{cells}</tr>')
+                        if len(rows) == _SHEET_ROWS_PER_SECTION:
+                            add_section(sheet.title, first_row, rows)
+                            first_row += len(rows)
+                            rows = []
+                    if rows or first_row == 1:
+                        add_section(sheet.title, first_row, rows)
+            finally:
+                workbook.close()
+
+            return self._rendering("office-spreadsheet", sections, labels)
+
         except ImportError:
             return self._fallback_conversion(file_path, "XLSX")
         except Exception as e:
             self.logger.error(f"Erreur conversion XLSX: {e}")
             return self._fallback_conversion(file_path, "XLSX")
 
-    def _convert_pptx_to_html(self, file_path: Path) -> str:
-        """Convertit un fichier PPTX en HTML"""
+    def _convert_pptx_to_html(self, file_path: Path) -> Dict[str, Any]:
+        """Convertit un fichier PPTX en HTML, une section par diapositive"""
         try:
             from pptx import Presentation
-            
+
             prs = Presentation(file_path)
-            html_parts = ['<div class="office-presentation">']
-            
-            # Titre du document
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            
+            sections = []
+
             # Parcourir toutes les diapositives
             for i, slide in enumerate(prs.slides, 1):
-                html_parts.append(f'<div class="slide" id="slide-{i}">')
-                html_parts.append(f'<h2 class="slide-title">Diapositive {i}</h2>')
-                
+                slide_parts = [f'<div class="slide" id="slide-{i}">']
+                slide_parts.append(f'<h2 class="slide-title">Diapositive {i}</h2>')
+
                 for shape in slide.shapes:
                     if hasattr(shape, "text") and shape.text.strip():
-                        html_parts.append(f'<p class="slide-text">{shape.text}</p>')
-                
-                html_parts.append('</div>')
-            
-            html_parts.append('</div>')
-            return '\n'.join(html_parts)
-            
+                        slide_parts.append(f'<p class="slide-text">{html.escape(shape.text)}</p>')
+
+                slide_parts.append('</div>')
+                sections.append('\n'.join(slide_parts))
+
+            labels = [f"Diapositive {i}" for i in range(1, len(sections) + 1)]
+            return self._rendering("office-presentation", sections or [''], labels or ["Diapositive 1"])
+
         except ImportError:
             return self._fallback_conversion(file_path, "PPTX")
         except Exception as e:
             self.logger.error(f"Erreur conversion PPTX: {e}")
             return self._fallback_conversion(file_path, "PPTX")
 
-    def _convert_doc_to_html(self, file_path: Path) -> str:
+    def _paragraphs_to_html(self, text: str) -> Dict[str, Any]:
+        """Texte extrait -> paragraphes HTML regroupés en sections"""
+        blocks = [
+            f'<p class="paragraph">{html.escape(para.strip())}</p>'
+            for para in text.split('\n\n') if para.strip()
+        ]
+        return self._group_blocks("office-document", blocks)
+
+    def _preformatted_to_html(self, text: str, container: str, kind: str) -> Dict[str, Any]:
+        """Texte extrait -> blocs préformatés, une section par tranche de lignes"""
+        lines = text.split('\n')
+        sections = []
+        for start in range(0, len(lines), _TEXT_LINES_PER_SECTION):
+            chunk = html.escape('\n'.join(lines[start:start + _TEXT_LINES_PER_SECTION]))
+            sections.append(
+                f'<div class="{kind}-content">\n<pre class="{kind}-text">{chunk}</pre>\n</div>'
+            )
+        labels = [
+            f"Lignes {start + 1}-{min(start + _TEXT_LINES_PER_SECTION, len(lines))}"
+            for start in range(0, len(lines), _TEXT_LINES_PER_SECTION)
+        ]
+        return self._rendering(container, sections, labels)
+
+    def _convert_doc_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier DOC en HTML (via extraction de texte)"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_doc(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-document">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            
-            # Diviser le texte en paragraphes
-            paragraphs = text.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    html_parts.append(f'<p class="paragraph">{para.strip()}</p>')
-            
-            html_parts.append('</div>')
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("doc", str(file_path))
+            return self._paragraphs_to_html(text)
+
         except Exception as e:
             self.logger.error(f"Erreur conversion DOC: {e}")
             return self._fallback_conversion(file_path, "DOC")
 
-    def _convert_xls_to_html(self, file_path: Path) -> str:
+    def _convert_xls_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier XLS en HTML (via extraction de texte)"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_xls(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-spreadsheet">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            html_parts.append('<div class="spreadsheet-content">')
-            html_parts.append(f'<pre class="spreadsheet-text">{text}</pre>')
-            html_parts.append('</div>')
-            html_parts.append('</div>')
-            
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("xls", str(file_path), *extraction_engine.task_options("xls"))
+            return self._preformatted_to_html(text, "office-spreadsheet", "spreadsheet")
+
         except Exception as e:
             self.logger.error(f"Erreur conversion XLS: {e}")
             return self._fallback_conversion(file_path, "XLS")
 
-    def _convert_ppt_to_html(self, file_path: Path) -> str:
+    def _convert_ppt_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier PPT en HTML (via extraction de texte)"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_ppt(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-presentation">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            html_parts.append('<div class="presentation-content">')
-            html_parts.append(f'<pre class="presentation-text">{text}</pre>')
-            html_parts.append('</div>')
-            html_parts.append('</div>')
-            
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("ppt", str(file_path))
+            return self._preformatted_to_html(text, "office-presentation", "presentation")
+
         except Exception as e:
             self.logger.error(f"Erreur conversion PPT: {e}")
             return self._fallback_conversion(file_path, "PPT")
 
-    def _convert_odt_to_html(self, file_path: Path) -> str:
+    def _convert_odt_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier ODT en HTML"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_odt(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-document">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            
-            # Diviser le texte en paragraphes
-            paragraphs = text.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    html_parts.append(f'<p class="paragraph">{para.strip()}</p>')
-            
-            html_parts.append('</div>')
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("odt", str(file_path))
+            return self._paragraphs_to_html(text)
+
         except Exception as e:
             self.logger.error(f"Erreur conversion ODT: {e}")
             return self._fallback_conversion(file_path, "ODT")
 
-    def _convert_ods_to_html(self, file_path: Path) -> str:
+    def _convert_ods_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier ODS en HTML"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_ods(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-spreadsheet">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            html_parts.append('<div class="spreadsheet-content">')
-            html_parts.append(f'<pre class="spreadsheet-text">{text}</pre>')
-            html_parts.append('</div>')
-            html_parts.append('</div>')
-            
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("ods", str(file_path))
+            return self._preformatted_to_html(text, "office-spreadsheet", "spreadsheet")
+
         except Exception as e:
             self.logger.error(f"Erreur conversion ODS: {e}")
             return self._fallback_conversion(file_path, "ODS")
 
-    def _convert_odp_to_html(self, file_path: Path) -> str:
+    def _convert_odp_to_html(self, file_path: Path) -> Dict[str, Any]:
         """Convertit un fichier ODP en HTML"""
         try:
-            # Utiliser le service d'extraction existant
-            from .document_extractor_service import DocumentExtractorService
-            extractor = DocumentExtractorService(self.db)
-            
-            # Extraire le texte
-            text = extractor._extract_from_odp(file_path)
-            
-            # Convertir en HTML simple
-            html_parts = ['<div class="office-presentation">']
-            html_parts.append(f'<h1 class="document-title">{file_path.stem}</h1>')
-            html_parts.append('<div class="presentation-content">')
-            html_parts.append(f'<pre class="presentation-text">{text}</pre>')
-            html_parts.append('</div>')
-            html_parts.append('</div>')
-            
-            return '\n'.join(html_parts)
-            
+            # Extraire le texte via le moteur d'extraction (processus isolé)
+            text = extraction_engine.run_sync("odp", str(file_path))
+            return self._preformatted_to_html(text, "office-presentation", "presentation")
+
         except Exception as e:
             self.logger.error(f"Erreur conversion ODP: {e}")
             return self._fallback_conversion(file_path, "ODP")
 
-    def _fallback_conversion(self, file_path: Path, format_type: str) -> str:
+    def _fallback_conversion(self, file_path: Path, format_type: str) -> Dict[str, Any]:
         """Conversion de fallback quand les bibliothèques ne sont pas disponibles"""
-        return f"""
-        <div class="office-document fallback">
-            <h1 class="document-title">{file_path.stem}</h1>
+        message = f"""
             <div class="fallback-message">
                 <p>⚠️ Visualisation limitée pour les fichiers {format_type}</p>
-                <p>Le fichier <strong>{file_path.name}</strong> ne peut pas être affiché directement.</p>
+                <p>Le fichier <strong>{html.escape(file_path.name)}</strong> ne peut pas être affiché directement.</p>
                 <p>Veuillez télécharger le fichier pour le consulter avec une application compatible.</p>
             </div>
-        </div>
         """
+        return self._rendering("office-document fallback", [message], ["Aperçu indisponible"])
 
     def get_supported_formats(self) -> list[str]:
         """Retourne la liste des formats supportés"""
@@ -0,0 +1,194 @@
+"""
+Search service for DocuSense AI
+Recherche plein texte classée dans les fichiers et les résultats d'analyse
+"""
+
+import html
+import math
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from ..core.search_index import search_index, build_match_query
+from ..models.analysis import Analysis
+from ..models.file import File
+from .base_service import BaseService, log_service_operation
+
+# Marqueurs de surlignage internes, remplacés après échappement HTML du snippet
+_MARK_OPEN = "\x02"
+_MARK_CLOSE = "\x03"
+_SNIPPET_TOKENS = 24
+
+# Poids bm25 des colonnes de files_fts : nom, chemin, texte extrait, résultat d'analyse
+_FILES_WEIGHTS = "10.0, 5.0, 1.0, 2.0"
+
+_FILES_SELECT = f"""
+    SELECT 'file' AS kind, f.id AS file_id, NULL AS analysis_id, f.name AS name, f.path AS path,
+           bm25(files_fts, {_FILES_WEIGHTS}) AS score,
+           snippet(files_fts, -1, :mark_open, :mark_close, '…', {_SNIPPET_TOKENS}) AS snippet
+    FROM files_fts JOIN files f ON f.id = files_fts.rowid
+    WHERE files_fts MATCH :match
+"""
+
+_ANALYSES_SELECT = f"""
+    SELECT 'analysis' AS kind, a.file_id AS file_id, a.id AS analysis_id, f.name AS name, f.path AS path,
+           bm25(analyses_fts) AS score,
+           snippet(analyses_fts, 0, :mark_open, :mark_close, '…', {_SNIPPET_TOKENS}) AS snippet
+    FROM analyses_fts
+    JOIN analyses a ON a.id = analyses_fts.rowid
+    JOIN files f ON f.id = a.file_id
+    WHERE analyses_fts MATCH :match
+"""
+
+
+class SearchService(BaseService):
+    """Service de recherche dans le contenu des documents"""
+
+    SCOPES = ("all", "files", "analyses")
+
+    def __init__(self, db: Session):
+        super().__init__(db)
+
+    @log_service_operation("search")
+    def search(self, query: str, scope: str = "all", page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """
+        Recherche classée (bm25) avec extraits surlignés par <mark>
+
+        Args:
+            query: Texte saisi ; chaque mot est cherché comme préfixe, tous sont requis
+            scope: "files" (nom, chemin, texte extrait, résultat), "analyses" ou "all"
+            page: Numéro de page (à partir de 1)
+            page_size: Résultats par page
+        """
+        if scope not in self.SCOPES:
+            raise ValueError(f"Portée de recherche non supportée: {scope}")
+        return self.safe_execute("search", self._search_logic, query, scope, page, page_size)
+
+    def _search_logic(self, query: str, scope: str, page: int, page_size: int) -> Dict[str, Any]:
+        match = build_match_query(query)
+        if match is None:
+            results, total = [], 0
+        elif search_index.available:
+            results, total = self._search_fts(match, scope, page_size, (page - 1) * page_size)
+        else:
+            results, total = self._search_like(query.strip(), scope, page_size, (page - 1) * page_size)
+
+        return {
+            "query": query,
+            "scope": scope,
+            "results": results,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": math.ceil(total / page_size) if total else 0,
+            "has_next": page * page_size < total,
+            "has_previous": page > 1,
+            "ranked": search_index.available
+        }
+
+    def _search_fts(self, match: str, scope: str, limit: int, offset: int):
+        selects = []
+        counts = []
+        if scope in ("all", "files"):
+            selects.append(_FILES_SELECT)
+            counts.append("SELECT count(*) FROM files_fts WHERE files_fts MATCH :match")
+        if scope in ("all", "analyses"):
+            selects.append(_ANALYSES_SELECT)
+            counts.append(
+                "SELECT count(*) FROM analyses_fts JOIN analyses a ON a.id = analyses_fts.rowid "
+                "JOIN files f ON f.id = a.file_id WHERE analyses_fts MATCH :match"
+            )
+
+        params = {
+            "match": match,
+            "mark_open": _MARK_OPEN,
+            "mark_close": _MARK_CLOSE,
+            "limit": limit,
+            "offset": offset
+        }
+        # bm25 : plus le score est petit, plus le résultat est pertinent
+        rows = self.db.execute(
+            text(" UNION ALL ".join(selects) + " ORDER BY score LIMIT :limit OFFSET :offset"),
+            params
+        ).mappings().all()
+        total = sum(self.db.execute(text(count), {"match": match}).scalar() or 0 for count in counts)
+
+        return [
+            {
+                "type": row["kind"],
+                "file_id": row["file_id"],
+                "analysis_id": row["analysis_id"],
+                "name": row["name"],
+                "path": row["path"],
+                "score": round(-row["score"], 4),
+                "snippet": self._highlight(row["snippet"])
+            }
+            for row in rows
+        ], total
+
+    def _search_like(self, query: str, scope: str, limit: int, offset: int):
+        """Repli sans FTS5 : correspondance de sous-chaîne, sans classement"""
+        pattern = f"%{query}%"
+        results: List[Dict[str, Any]] = []
+        total = 0
+
+        if scope in ("all", "files"):
+            files_query = self.db.query(File.id, File.name, File.path, File.extracted_text, File.analysis_result).filter(
+                or_(
+                    File.name.ilike(pattern),
+                    File.path.ilike(pattern),
+                    File.extracted_text.ilike(pattern),
+                    File.analysis_result.ilike(pattern)
+                )
+            )
+            total += files_query.count()
+            for file_id, name, path, extracted_text, analysis_result in files_query.order_by(File.id).offset(offset).limit(limit):
+                source = next(
+                    (value for value in (extracted_text, analysis_result, name, path) if value and query.lower() in value.lower()),
+                    name
+                )
+                results.append({
+                    "type": "file", "file_id": file_id, "analysis_id": None, "name": name, "path": path,
+                    "score": None, "snippet": self._make_snippet(source, query)
+                })
+
+        if scope in ("all", "analyses"):
+            analyses_query = self.db.query(Analysis.id, Analysis.file_id, File.name, File.path, Analysis.result).join(
+                File, File.id == Analysis.file_id
+            ).filter(Analysis.result.ilike(pattern))
+            analyses_total = analyses_query.count()
+            # Les analyses suivent les fichiers dans la pagination combinée
+            skip = max(0, offset - total)
+            remaining = limit - len(results)
+            total += analyses_total
+            if remaining > 0:
+                for analysis_id, file_id, name, path, result in analyses_query.order_by(Analysis.id).offset(skip).limit(remaining):
+                    results.append({
+                        "type": "analysis", "file_id": file_id, "analysis_id": analysis_id, "name": name, "path": path,
+                        "score": None, "snippet": self._make_snippet(result, query)
+                    })
+
+        return results, total
+
+    @staticmethod
+    def _highlight(snippet: Optional[str]) -> str:
+        """Échappe le HTML du document puis pose les balises <mark>"""
+        if not snippet:
+            return ""
+        return html.escape(snippet).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+    @classmethod
+    def _make_snippet(cls, source: str, query: str, width: int = 160) -> str:
+        position = source.lower().find(query.lower())
+        if position < 0:
+            return html.escape(source[:width])
+        start = max(0, position - width // 2)
+        end = min(len(source), position + len(query) + width // 2)
+        marked = (
+            source[start:position] + _MARK_OPEN + source[position:position + len(query)] + _MARK_CLOSE
+            + source[position + len(query):end]
+        )
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(source) else ""
+        return prefix + cls._highlight(marked) + suffix
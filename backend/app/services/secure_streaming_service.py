@@ -8,14 +8,16 @@ import mimetypes
 import hashlib
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional, Union, Generator
+from typing import Dict, Any, Optional, Mapping
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import Response
 import tempfile
 import shutil
 
 from .base_service import BaseService, log_service_operation
+from .file_fingerprints import file_fingerprints
+from ..core.http_ranges import build_file_response, DEFAULT_CHUNK_SIZE
 from ..core.types import ServiceResponse, FileData
 from ..middleware.auth_middleware import AuthMiddleware
 
@@ -30,7 +32,7 @@ class SecureStreamingService(BaseService):
         super().__init__(db)
         self.max_file_size = 1024 * 1024 * 1024 * 2  # 2 GB
         self.max_stream_size = 1024 * 1024 * 1024  # 1 GB pour le streaming
-        self.chunk_size = 8192  # 8KB chunks
+        self.chunk_size = DEFAULT_CHUNK_SIZE  # Blocs utilisés seulement quand le serveur ne propose pas sendfile
         self.allowed_extensions = {
             # Images
             '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg',
@@ -127,8 +129,9 @@ class SecureStreamingService(BaseService):
         stat = file_path.stat()
         mime_type, _ = mimetypes.guess_type(str(file_path))
         
-        # Calculer le hash du fichier pour l'intégrité
-        file_hash = self._calculate_file_hash(file_path)
+        # Empreinte mémorisée : complète pour les petits fichiers, partielle pour
+        # les gros tant que le hash complet est calculé en tâche de fond
+        fingerprint = file_fingerprints.get_fingerprint(file_path, stat)
         
         return {
             'name': file_path.name,
@@ -138,25 +141,33 @@ class SecureStreamingService(BaseService):
             'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
             'mime_type': mime_type or 'application/octet-stream',
             'extension': file_path.suffix.lower(),
-            'hash': file_hash,
+            'hash': fingerprint['hash'],
+            'hash_mode': fingerprint['hash_mode'],
+            'hash_pending': fingerprint['hash_pending'],
             'is_streamable': self._is_streamable(file_path),
             'is_downloadable': self._is_downloadable(file_path)
         }
     
     @log_service_operation("stream_file_secure")
     def stream_file_secure(self, file_path: Path, session_token: Optional[str] = None, 
-                          mode: str = 'view', chunk_size: int = None) -> Union[FileResponse, StreamingResponse]:
+                          mode: str = 'view', chunk_size: int = None,
+                          request_headers: Optional[Mapping[str, str]] = None) -> Response:
         """
         Stream un fichier de manière sécurisée
         
+        Les requêtes partielles (Range, If-Range) et conditionnelles
+        (If-None-Match, If-Modified-Since) sont honorées dans les deux modes :
+        un lecteur vidéo peut se positionner sans re-télécharger le début du fichier.
+        
         Args:
             file_path: Chemin vers le fichier
             session_token: Token de session (optionnel)
             mode: 'view' pour visualisation, 'download' pour téléchargement
             chunk_size: Taille des chunks (optionnel)
+            request_headers: En-têtes de la requête HTTP (Range, If-None-Match...)
             
         Returns:
-            FileResponse ou StreamingResponse
+            Response 200, 206, 304 ou 416
         """
         self.validate_file_access(file_path, session_token)
         
@@ -173,40 +184,24 @@ class SecureStreamingService(BaseService):
             raise HTTPException(status_code=400, detail="Type de fichier non supporté pour le streaming")
         
         # Vérifier la taille pour le streaming
-        file_size = file_path.stat().st_size
-        if file_size > self.max_stream_size:
+        stat = file_path.stat()
+        if stat.st_size > self.max_stream_size:
             raise HTTPException(
                 status_code=413, 
-                detail=f"Fichier trop volumineux pour le streaming ({file_size / (1024*1024*1024):.1f} GB). Maximum: {self.max_stream_size / (1024*1024*1024)} GB"
+                detail=f"Fichier trop volumineux pour le streaming ({stat.st_size / (1024*1024*1024):.1f} GB). Maximum: {self.max_stream_size / (1024*1024*1024)} GB"
             )
         
         # Générer les headers de sécurité
         headers = self._generate_security_headers(file_path, mode)
         
-        if mode == 'download':
-            # Téléchargement direct
-            return FileResponse(
-                path=str(file_path),
-                filename=file_path.name,
-                media_type=mime_type,
-                headers=headers
-            )
-        else:
-            # Streaming pour visualisation
-            def generate_chunks():
-                try:
-                    with open(file_path, 'rb') as f:
-                        while chunk := f.read(chunk_size):
-                            yield chunk
-                except Exception as e:
-                    logger.error(f"Erreur lors du streaming: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Erreur lors du streaming")
-            
-            return StreamingResponse(
-                generate_chunks(),
-                media_type=mime_type,
-                headers=headers
-            )
+        return build_file_response(
+            file_path,
+            request_headers=request_headers,
+            media_type=mime_type,
+            headers=headers,
+            chunk_size=chunk_size,
+            st=stat
+        )
     
     @log_service_operation("create_temp_access_token")
     def create_temp_access_token(self, file_path: Path, session_token: str, 
@@ -280,18 +275,6 @@ class SecureStreamingService(BaseService):
         
         return file_path
     
-    def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calcule le hash SHA-256 d'un fichier"""
-        hash_sha256 = hashlib.sha256()
-        try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
-        except Exception as e:
-            logger.error(f"Erreur lors du calcul du hash: {str(e)}")
-            return ""
-    
     def _is_streamable(self, file_path: Path) -> bool:
         """Vérifie si un fichier peut être streamé"""
         extension = file_path.suffix.lower()
@@ -5,7 +5,7 @@ System logging service for security monitoring and audit trail
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, desc
 from fastapi import Request
 import json
 import re
@@ -15,14 +15,17 @@ from app.core.database import get_db
 from app.models.system_log import SystemLog, LogLevel, SystemLogCreate, SecurityEventSummary
 from app.models.user import User
 from app.core.logging import get_logger
+from app.core.rate_limiter import rate_limiter
 from app.services.base_service import BaseService
+from app.services.system_log_storage import system_log_storage
 
 
 class SystemLogService(BaseService):
     """Service for managing system logs and security monitoring"""
     
     def __init__(self, db: Session):
-        super().__init__(db, SystemLog, get_logger(__name__))
+        super().__init__(db)
+        self.logger = get_logger(__name__)
         self.suspicious_patterns = self._init_suspicious_patterns()
     
     def _init_suspicious_patterns(self) -> Dict[str, Any]:
@@ -63,63 +66,79 @@ class SystemLogService(BaseService):
                 # Add request details to details dict
                 if details is None:
                     details = {}
-                details.update({
-                    'method': request.method,
-                    'url': str(request.url),
-                    'headers': dict(request.headers)
-                })
+                details.update(self.describe_request(request))
             
-            # Detect if this is a security event
-            is_security_event = self._is_security_event(action, details, level)
-            is_suspicious = self._is_suspicious_activity(
-                action, ip_address, user_agent, details
+            log_data = self.build_log_data(
+                level, source, action, details, user_id, ip_address, user_agent
             )
-            
-            # Create log entry
-            log_data = SystemLogCreate(
-                level=level,
-                source=source,
-                action=action,
-                details=details,
-                user_id=user_id,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                is_security_event=is_security_event,
-                is_suspicious=is_suspicious
-            )
-            
-            log_entry = SystemLog(**log_data.dict())
-            self.db.add(log_entry)
+            log_data['timestamp'] = datetime.utcnow()
+            log_id = system_log_storage.insert_row(self.db, log_data)
             self.db.commit()
-            self.db.refresh(log_entry)
-            
-            # Log to file for immediate visibility
-            self.logger.info(f"System log: {level.value} - {source} - {action}")
             
-            # If it's a security event, also log with higher priority
-            if is_security_event or is_suspicious:
-                self.logger.warning(f"SECURITY EVENT: {action} from {ip_address} - Details: {details}")
-            
-            return log_entry
+            # Detached instance: the row lives in a daily partition, not in the mapped table
+            return SystemLog(id=log_id, **log_data)
             
         except Exception as e:
             self.logger.error(f"Failed to log system event: {str(e)}")
+            self.db.rollback()
             # Don't raise exception to avoid breaking the main flow
             return None
     
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP from request, handling proxies"""
-        # Check for forwarded headers first
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
+    def build_log_data(
+        self,
+        level: LogLevel,
+        source: str,
+        action: str,
+        details: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Classify an event and return the column values of its SystemLog row"""
+        # Detect if this is a security event
+        is_security_event = self._is_security_event(action, details, level)
+        is_suspicious = self._is_suspicious_activity(
+            action, ip_address, user_agent, details
+        )
+        
+        # Create log entry
+        log_data = SystemLogCreate(
+            level=level,
+            source=source,
+            action=action,
+            details=details,
+            user_id=user_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            is_security_event=is_security_event,
+            is_suspicious=is_suspicious
+        )
         
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
+        # Log to file for immediate visibility
+        self.logger.info(f"System log: {level.value} - {source} - {action}")
         
-        # Fallback to client host
-        return request.client.host if request.client else "unknown"
+        # If it's a security event, also log with higher priority
+        if is_security_event or is_suspicious:
+            self.logger.warning(f"SECURITY EVENT: {action} from {ip_address} - Details: {details}")
+        
+        return log_data.dict()
+    
+    @staticmethod
+    def describe_request(request: Request) -> Dict[str, Any]:
+        """Request details stored with an event"""
+        return {
+            'method': request.method,
+            'url': str(request.url),
+            'headers': dict(request.headers)
+        }
+    
+    def _get_client_ip(self, request: Request) -> str:
+        """Client IP as counted by the rate limiter (proxy headers only from RATE_LIMIT_TRUSTED_PROXIES)"""
+        return rate_limiter.client_ip(
+            request.client.host if request.client else None,
+            request.headers.get("X-Forwarded-For"),
+            request.headers.get("X-Real-IP")
+        )
     
     def _is_security_event(
         self, 
@@ -170,23 +189,8 @@ class SystemLogService(BaseService):
         return False
     
     def _check_rate_limit_exceeded(self, ip_address: str) -> bool:
-        """Check if IP has exceeded rate limit (simplified)"""
-        try:
-            # Count requests from this IP in the last minute
-            one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-            
-            count = self.db.query(func.count(SystemLog.id)).filter(
-                and_(
-                    SystemLog.ip_address == ip_address,
-                    SystemLog.timestamp >= one_minute_ago
-                )
-            ).scalar()
-            
-            return count > self.suspicious_patterns['request_rate_threshold']
-            
-        except Exception as e:
-            self.logger.error(f"Error checking rate limit: {str(e)}")
-            return False
+        """Check if IP has exceeded the request rate threshold (in-memory sliding window, no query)"""
+        return rate_limiter.current_count("ip", ip_address) > self.suspicious_patterns['request_rate_threshold']
     
     def get_security_events(
         self, 
@@ -196,13 +200,14 @@ class SystemLogService(BaseService):
     ) -> List[SystemLog]:
         """Get recent security events"""
         since = datetime.utcnow() - timedelta(hours=hours)
+        Log = system_log_storage.log_entity(self.db, since)
         
-        return self.db.query(SystemLog).filter(
+        return self.db.query(Log).filter(
             and_(
-                SystemLog.is_security_event == True,
-                SystemLog.timestamp >= since
+                Log.is_security_event == True,
+                Log.timestamp >= since
             )
-        ).order_by(desc(SystemLog.timestamp)).limit(limit).offset(offset).all()
+        ).order_by(desc(Log.timestamp)).limit(limit).offset(offset).all()
     
     def get_suspicious_activities(
         self,
@@ -212,13 +217,14 @@ class SystemLogService(BaseService):
     ) -> List[SystemLog]:
         """Get recent suspicious activities"""
         since = datetime.utcnow() - timedelta(hours=hours)
+        Log = system_log_storage.log_entity(self.db, since)
         
-        return self.db.query(SystemLog).filter(
+        return self.db.query(Log).filter(
             and_(
-                SystemLog.is_suspicious == True,
-                SystemLog.timestamp >= since
+                Log.is_suspicious == True,
+                Log.timestamp >= since
             )
-        ).order_by(desc(SystemLog.timestamp)).limit(limit).offset(offset).all()
+        ).order_by(desc(Log.timestamp)).limit(limit).offset(offset).all()
     
     def get_failed_login_attempts(
         self,
@@ -227,87 +233,45 @@ class SystemLogService(BaseService):
     ) -> List[SystemLog]:
         """Get failed login attempts"""
         since = datetime.utcnow() - timedelta(hours=hours)
+        Log = system_log_storage.log_entity(self.db, since)
         
-        query = self.db.query(SystemLog).filter(
+        query = self.db.query(Log).filter(
             and_(
-                SystemLog.action.like('%failed_login%'),
-                SystemLog.timestamp >= since
+                Log.action.like('%failed_login%'),
+                Log.timestamp >= since
             )
         )
         
         if ip_address:
-            query = query.filter(SystemLog.ip_address == ip_address)
+            query = query.filter(Log.ip_address == ip_address)
         
-        return query.order_by(desc(SystemLog.timestamp)).all()
+        return query.order_by(desc(Log.timestamp)).all()
     
     def get_security_summary(self, hours: int = 24) -> SecurityEventSummary:
-        """Get summary of security events"""
+        """Get summary of security events (hourly rollups, no scan of the raw events)"""
         since = datetime.utcnow() - timedelta(hours=hours)
+        activity = system_log_storage.activity_since(self.db, since).values()
         
         # Count different types of security events
-        failed_logins = self.db.query(func.count(SystemLog.id)).filter(
-            and_(
-                SystemLog.action.like('%failed_login%'),
-                SystemLog.timestamp >= since
-            )
-        ).scalar()
-        
-        unauthorized_access = self.db.query(func.count(SystemLog.id)).filter(
-            and_(
-                SystemLog.action.like('%unauthorized%'),
-                SystemLog.timestamp >= since
-            )
-        ).scalar()
-        
-        suspicious_activity = self.db.query(func.count(SystemLog.id)).filter(
-            and_(
-                SystemLog.is_suspicious == True,
-                SystemLog.timestamp >= since
-            )
-        ).scalar()
-        
-        total_events = self.db.query(func.count(SystemLog.id)).filter(
-            and_(
-                SystemLog.is_security_event == True,
-                SystemLog.timestamp >= since
-            )
-        ).scalar()
+        failed_logins = sum(counts['failed_logins'] for counts in activity)
+        unauthorized_access = sum(counts['unauthorized_access'] for counts in activity)
+        suspicious_activity = sum(counts['suspicious_events'] for counts in activity)
+        total_events = sum(counts['security_events'] for counts in activity)
         
         return SecurityEventSummary(
             failed_logins=failed_logins or 0,
             unauthorized_access=unauthorized_access or 0,
             suspicious_activity=suspicious_activity or 0,
             total_events=total_events or 0,
-            time_period=f"{hours}h"
+            time_period=f"{hours}h",
+            rate_limits=rate_limiter.get_stats()
         )
     
     def cleanup_old_logs(self, days: int = 30) -> int:
-        """Clean up logs older than specified days"""
+        """Clean up logs older than specified days (whole daily partitions are dropped)"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
             # Keep security events longer (90 days)
-            security_cutoff = datetime.utcnow() - timedelta(days=90)
-            
-            # Delete non-security logs older than cutoff
-            deleted_regular = self.db.query(SystemLog).filter(
-                and_(
-                    SystemLog.timestamp < cutoff_date,
-                    SystemLog.is_security_event == False
-                )
-            ).delete()
-            
-            # Delete old security events
-            deleted_security = self.db.query(SystemLog).filter(
-                and_(
-                    SystemLog.timestamp < security_cutoff,
-                    SystemLog.is_security_event == True
-                )
-            ).delete()
-            
-            self.db.commit()
-            
-            total_deleted = deleted_regular + deleted_security
+            total_deleted = system_log_storage.drop_expired(self.db, days=days, security_days=90)
             self.logger.info(f"Cleaned up {total_deleted} old log entries")
             
             return total_deleted
@@ -322,33 +286,24 @@ class SystemLogService(BaseService):
         since = datetime.utcnow() - timedelta(hours=hours)
         
         # Get top IPs by request count
-        ip_counts = self.db.query(
-            SystemLog.ip_address,
-            func.count(SystemLog.id).label('request_count'),
-            func.count(
-                func.nullif(SystemLog.is_security_event, False)
-            ).label('security_events'),
-            func.count(
-                func.nullif(SystemLog.is_suspicious, False)
-            ).label('suspicious_activities')
-        ).filter(
-            and_(
-                SystemLog.timestamp >= since,
-                SystemLog.ip_address.isnot(None)
-            )
-        ).group_by(SystemLog.ip_address).order_by(
-            desc('request_count')
-        ).limit(20).all()
+        activity = system_log_storage.activity_since(self.db, since)
+        ip_counts = sorted(
+            ((ip, counts) for ip, counts in activity.items() if ip),
+            key=lambda item: item[1]['total_events'],
+            reverse=True
+        )[:20]
         
         return {
             'time_period': f"{hours}h",
             'ip_activity': [
                 {
                     'ip_address': ip,
-                    'request_count': count,
-                    'security_events': sec_events or 0,
-                    'suspicious_activities': sus_activities or 0
+                    'request_count': counts['total_events'],
+                    'security_events': counts['security_events'],
+                    'suspicious_activities': counts['suspicious_events'],
+                    'current_window_requests': rate_limiter.current_count("ip", ip)
                 }
-                for ip, count, sec_events, sus_activities in ip_counts
-            ]
+                for ip, counts in ip_counts
+            ],
+            'rate_limits': rate_limiter.get_stats()
         }
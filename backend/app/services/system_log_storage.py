@@ -0,0 +1,335 @@
+"""
+Time-partitioned storage for SystemLog events
+
+Events are written to one table per UTC day (system_logs_YYYYMMDD) carrying
+only the indexes the readers need. Retention drops whole partitions instead
+of running range deletes; security events still inside their own retention
+window are first archived into the original system_logs table, which also
+keeps the rows written before partitioning. Hourly per-IP counts are
+upserted into system_log_rollups in the same transaction as the events, so
+the summary endpoints read rollup rows instead of grouping raw events.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Mapping, Tuple
+
+from sqlalchemy import (
+    MetaData, Table, Column, Index, Integer, String, DateTime, Text, JSON, Boolean, Enum as SQLEnum,
+    select, insert, update, delete, func, case, literal, inspect, union_all, and_, or_
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.schema import CreateTable, CreateIndex, DropTable
+
+from app.core.logging import get_logger
+from app.models.system_log import SystemLog, SystemLogRollup, LogLevel
+
+logger = get_logger(__name__)
+
+PARTITION_PREFIX = "system_logs_"
+_PARTITION_NAME = re.compile(r"^system_logs_(\d{8})$")
+
+# Public id of a partitioned row: day ordinal * stride + row id, unique across partitions and the archive
+_ID_STRIDE = 10 ** 9
+
+_COLUMNS = [column.name for column in SystemLog.__table__.columns]
+_DATA_COLUMNS = [name for name in _COLUMNS if name != "id"]
+_COUNTERS = ("total_events", "security_events", "suspicious_events", "failed_logins", "unauthorized_access")
+
+RollupCounts = Dict[Tuple[datetime, str], List[int]]
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def _classify(row: Mapping[str, Any]) -> Tuple[int, ...]:
+    """Rollup counters of one event (same criteria as the summary queries on raw events)"""
+    action = (row.get("action") or "").lower()
+    return (
+        1,
+        int(bool(row.get("is_security_event"))),
+        int(bool(row.get("is_suspicious"))),
+        int("failed_login" in action),
+        int("unauthorized" in action)
+    )
+
+
+class SystemLogStorage:
+    """Daily partitions, hourly rollups and partition-drop retention for SystemLog events"""
+
+    def __init__(self):
+        self.metadata = MetaData()
+        self._tables: Dict[date, Table] = {}
+        self._created: set = set()
+        self._lock = threading.Lock()
+
+    # Partitions
+
+    def partition_table(self, day: date) -> Table:
+        """Table of one day of events; only timestamp and (ip_address, timestamp) are indexed"""
+        with self._lock:
+            table = self._tables.get(day)
+            if table is None:
+                name = partition_name(day)
+                table = Table(
+                    name, self.metadata,
+                    Column("id", Integer, primary_key=True),
+                    Column("timestamp", DateTime(timezone=True), nullable=False),
+                    Column("level", SQLEnum(LogLevel), nullable=False),
+                    Column("source", String(100), nullable=False),
+                    Column("user_id", Integer, nullable=True),
+                    Column("ip_address", String(45), nullable=True),
+                    Column("user_agent", Text, nullable=True),
+                    Column("action", String(200), nullable=False),
+                    Column("details", JSON, nullable=True),
+                    Column("is_security_event", Boolean, default=False),
+                    Column("is_suspicious", Boolean, default=False),
+                    Index(f"ix_{name}_timestamp", "timestamp"),
+                    Index(f"ix_{name}_ip_address", "ip_address", "timestamp")
+                )
+                self._tables[day] = table
+            return table
+
+    def _ensure_partition(self, connection: Connection, day: date) -> Table:
+        table = self.partition_table(day)
+        if day not in self._created:
+            connection.execute(CreateTable(table, if_not_exists=True))
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+            self._created.add(day)
+        return table
+
+    def _forget_partition(self, day: date) -> None:
+        with self._lock:
+            table = self._tables.pop(day, None)
+            self._created.discard(day)
+            if table is not None:
+                self.metadata.remove(table)
+
+    def partition_days(self, connection: Connection) -> List[date]:
+        """Days that have a partition table, oldest first"""
+        days = []
+        for name in inspect(connection).get_table_names():
+            match = _PARTITION_NAME.match(name)
+            if match:
+                days.append(datetime.strptime(match.group(1), "%Y%m%d").date())
+        return sorted(days)
+
+    # Writes
+
+    def insert_rows(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Write events (each with its UTC timestamp) and their rollup counts; the caller commits"""
+        connection = db.connection()
+        by_day: Dict[date, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_day[row["timestamp"].date()].append(row)
+
+        for day, day_rows in by_day.items():
+            connection.execute(insert(self._ensure_partition(connection, day)), day_rows)
+        self._upsert_rollups(connection, self._count(rows))
+
+    def insert_row(self, db: Session, row: Dict[str, Any]) -> int:
+        """Write one event and return its public id; the caller commits"""
+        connection = db.connection()
+        day = row["timestamp"].date()
+        result = connection.execute(insert(self._ensure_partition(connection, day)).values(**row))
+        self._upsert_rollups(connection, self._count([row]))
+        return day.toordinal() * _ID_STRIDE + result.inserted_primary_key[0]
+
+    # Rollups
+
+    @staticmethod
+    def _count(rows: Iterable[Mapping[str, Any]], counts: Optional[RollupCounts] = None) -> RollupCounts:
+        counts = counts if counts is not None else defaultdict(lambda: [0] * len(_COUNTERS))
+        for row in rows:
+            bucket = counts[(_hour(row["timestamp"]), row.get("ip_address") or "")]
+            for index, value in enumerate(_classify(row)):
+                bucket[index] += value
+        return counts
+
+    def _upsert_rollups(self, connection: Connection, counts: RollupCounts) -> None:
+        if not counts:
+            return
+        table = SystemLogRollup.__table__
+        values = [
+            {"hour": hour, "ip_address": ip_address, **dict(zip(_COUNTERS, bucket))}
+            for (hour, ip_address), bucket in counts.items()
+        ]
+
+        dialect = connection.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            statement = upsert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.hour, table.c.ip_address],
+                set_={name: table.c[name] + statement.excluded[name] for name in _COUNTERS}
+            )
+            connection.execute(statement, values)
+            return
+
+        for value in values:
+            result = connection.execute(
+                update(table)
+                .where(and_(table.c.hour == value["hour"], table.c.ip_address == value["ip_address"]))
+                .values({name: table.c[name] + value[name] for name in _COUNTERS})
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(**value))
+
+    def ensure(self, engine: Engine) -> None:
+        """Build the rollups of the events written before partitioning (first start only)"""
+        try:
+            with engine.begin() as connection:
+                if connection.execute(select(SystemLogRollup.hour).limit(1)).first() is not None:
+                    return
+                legacy = SystemLog.__table__
+                result = connection.execute(
+                    select(
+                        legacy.c.timestamp, legacy.c.ip_address, legacy.c.action,
+                        legacy.c.is_security_event, legacy.c.is_suspicious
+                    ).where(legacy.c.timestamp.isnot(None))
+                )
+                counts = None
+                for rows in result.mappings().partitions(10000):
+                    counts = self._count(rows, counts)
+                if counts:
+                    self._upsert_rollups(connection, counts)
+                    logger.info(f"System log rollups built for {len(counts)} hour/IP buckets")
+        except Exception as e:
+            logger.error(f"Failed to build system log rollups: {str(e)}")
+
+    def activity_since(self, db: Session, since: datetime) -> Dict[str, Dict[str, int]]:
+        """
+        Event counts per IP address ("" for events without one) since `since`
+
+        Whole hours come from the rollups; the first, partial hour is counted
+        on the raw events so the window stays exact.
+        """
+        boundary = _hour(since)
+        if boundary < since:
+            boundary += timedelta(hours=1)
+
+        totals: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+        rollup = SystemLogRollup.__table__
+        results = [db.execute(
+            select(rollup.c.ip_address, *[func.sum(rollup.c[name]) for name in _COUNTERS])
+            .where(rollup.c.hour >= boundary)
+            .group_by(rollup.c.ip_address)
+        )]
+
+        if since < boundary:
+            Log = self.log_entity(db, since, boundary)
+            ip_address = func.coalesce(Log.ip_address, "")
+            results.append(db.execute(
+                select(
+                    ip_address,
+                    func.count(),
+                    func.sum(case((Log.is_security_event == True, 1), else_=0)),
+                    func.sum(case((Log.is_suspicious == True, 1), else_=0)),
+                    func.sum(case((Log.action.like('%failed_login%'), 1), else_=0)),
+                    func.sum(case((Log.action.like('%unauthorized%'), 1), else_=0))
+                ).group_by(ip_address)
+            ))
+
+        for result in results:
+            for ip, *values in result:
+                entry = totals[ip or ""]
+                for name, value in zip(_COUNTERS, values):
+                    entry[name] += value or 0
+        return dict(totals)
+
+    # Reads
+
+    def log_entity(self, db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """
+        SystemLog entity over the archive table and the partitions overlapping [since, until)
+
+        Query it like the model: `Log = storage.log_entity(db, since)`, then
+        `db.query(Log).filter(...)`. Only the partitions of the requested days are read.
+        """
+        arms = [self._select(SystemLog.__table__, None, since, until)]
+        for day in self.partition_days(db.connection()):
+            if (since is not None and day < since.date()) or (until is not None and day > until.date()):
+                continue
+            arms.append(self._select(self.partition_table(day), day, since, until))
+
+        source = arms[0] if len(arms) == 1 else union_all(*arms)
+        return aliased(SystemLog, source.subquery("system_logs_all"), adapt_on_names=True)
+
+    @staticmethod
+    def _select(table: Table, day: Optional[date], since: Optional[datetime], until: Optional[datetime]):
+        columns = [
+            (literal(day.toordinal() * _ID_STRIDE) + table.c.id).label("id")
+            if name == "id" and day is not None else table.c[name]
+            for name in _COLUMNS
+        ]
+        statement = select(*columns)
+        if since is not None:
+            statement = statement.where(table.c.timestamp >= since)
+        if until is not None:
+            statement = statement.where(table.c.timestamp < until)
+        return statement
+
+    # Retention
+
+    def drop_expired(self, db: Session, days: int, security_days: int = 90) -> int:
+        """
+        Drop the partitions of days entirely older than `days` and return the number of events removed
+
+        Security events younger than `security_days` are moved to the archive
+        table first. The archive and the rollups are trimmed with range deletes,
+        which stay small: they hold security events and hourly counts only.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=days)
+        security_cutoff = now - timedelta(days=security_days)
+        legacy = SystemLog.__table__
+        removed = 0
+
+        for day in self.partition_days(db.connection()):
+            if day >= cutoff.date():
+                break
+            table = self.partition_table(day)
+            connection = db.connection()
+            count = connection.execute(select(func.count()).select_from(table)).scalar() or 0
+            archived = connection.execute(
+                insert(legacy).from_select(
+                    _DATA_COLUMNS,
+                    select(*[table.c[name] for name in _DATA_COLUMNS]).where(
+                        and_(table.c.is_security_event == True, table.c.timestamp >= security_cutoff)
+                    )
+                )
+            ).rowcount or 0
+            connection.execute(DropTable(table, if_exists=True))
+            # One transaction per partition: the write lock is released between days
+            db.commit()
+            self._forget_partition(day)
+            removed += count - archived
+            logger.info(f"Dropped {partition_name(day)} ({count} events, {archived} security events archived)")
+
+        # Archive table: expired security events and routine events written before partitioning
+        removed += db.execute(
+            delete(legacy).where(or_(
+                and_(legacy.c.is_security_event == True, legacy.c.timestamp < security_cutoff),
+                and_(legacy.c.is_security_event == False, legacy.c.timestamp < cutoff)
+            ))
+        ).rowcount or 0
+        rollup = SystemLogRollup.__table__
+        db.execute(delete(rollup).where(rollup.c.hour < _hour(security_cutoff)))
+        db.commit()
+        return removed
+
+
+# Instance globale
+system_log_storage = SystemLogStorage()
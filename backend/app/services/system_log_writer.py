@@ -0,0 +1,205 @@
+"""
+Asynchronous batched writer for SystemLog events
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import get_logger
+from app.models.system_log import LogLevel
+from app.services.system_log_service import SystemLogService
+from app.services.system_log_storage import system_log_storage
+
+logger = get_logger(__name__)
+
+# Levels kept when the buffer is full: they evict the oldest routine event instead
+_PRIORITY_LEVELS = (LogLevel.SECURITY, LogLevel.ERROR)
+
+
+class SystemLogWriter:
+    """
+    In-process sink for SystemLog events
+
+    Producers call `enqueue`, which only appends to a bounded buffer. A
+    background task flushes the buffer with bulk inserts when `batch_size`
+    events are waiting or every `flush_interval` seconds. When the buffer is
+    full, routine events are dropped; security and error events evict the
+    oldest routine event instead.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue_size: Optional[int] = None
+    ):
+        self.batch_size = batch_size or settings.system_log_batch_size
+        self.flush_interval = flush_interval or settings.system_log_flush_interval
+        self.max_queue_size = max_queue_size or settings.system_log_queue_size
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        # Classification only (build_log_data): no session needed, shared by all batches
+        self._classifier = SystemLogService(db=None)
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'write_errors': 0
+        }
+
+    def enqueue(
+        self,
+        level: LogLevel,
+        source: str,
+        action: str,
+        details: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> bool:
+        """Queue an event for the next batch; returns False if it was dropped"""
+        event = {
+            'timestamp': datetime.utcnow(),
+            'level': level,
+            'source': source,
+            'action': action,
+            'details': details,
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent
+        }
+
+        with self._lock:
+            if len(self._buffer) >= self.max_queue_size and not self._make_room(level):
+                self.stats['dropped'] += 1
+                return False
+            self._buffer.append(event)
+            self.stats['enqueued'] += 1
+            full_batch = len(self._buffer) >= self.batch_size
+
+        if full_batch:
+            self._wake()
+        return True
+
+    def _make_room(self, level: LogLevel) -> bool:
+        """Evict the oldest routine event for a priority event (called with the lock held)"""
+        if level not in _PRIORITY_LEVELS:
+            return False
+        for index, queued in enumerate(self._buffer):
+            if queued['level'] not in _PRIORITY_LEVELS:
+                del self._buffer[index]
+                self.stats['dropped'] += 1
+                return True
+        return False
+
+    def _wake(self) -> None:
+        if self._wakeup is None or self._loop is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info("System log writer started")
+
+    async def stop(self) -> None:
+        """Stop the background task and write what is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while await self.flush():
+            pass
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drain full batches; a partial batch waits for the next tick
+            while await self.flush():
+                with self._lock:
+                    if len(self._buffer) < self.batch_size:
+                        break
+
+    async def flush(self) -> int:
+        """Write up to one batch; returns the number of events taken from the buffer"""
+        with self._lock:
+            count = min(len(self._buffer), self.batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+        if not batch:
+            return 0
+
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except Exception as e:
+            with self._lock:
+                self.stats['write_errors'] += 1
+                self.stats['dropped'] += len(batch)
+            logger.error(f"Failed to write {len(batch)} system log events: {str(e)}")
+        return len(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.time()
+        db = SessionLocal()
+        try:
+            rows = []
+            for event in batch:
+                row = self._classifier.build_log_data(
+                    event['level'], event['source'], event['action'], event['details'],
+                    event['user_id'], event['ip_address'], event['user_agent']
+                )
+                row['timestamp'] = event['timestamp']
+                rows.append(row)
+
+            system_log_storage.insert_rows(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        logger.debug(f"{len(batch)} system log events written in {time.time() - started:.3f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queued'] = len(self._buffer)
+        stats['running'] = self._task is not None
+        stats['batch_size'] = self.batch_size
+        stats['flush_interval'] = self.flush_interval
+        stats['max_queue_size'] = self.max_queue_size
+        return stats
+
+
+# Instance globale
+system_log_writer = SystemLogWriter()
@@ -0,0 +1,78 @@
+"""
+Découpage de texte pour DocuSense AI
+Produit des morceaux bornés en tokens, coupés sur les pages puis les paragraphes
+"""
+
+import re
+from typing import List
+
+# Estimation identique à AIService._estimate_tokens : 1 token ≈ 4 caractères
+CHARS_PER_TOKEN = 4
+
+# Séparateurs du plus grossier au plus fin : saut de page, paragraphe, ligne, phrase
+_PAGE_BREAK = re.compile(r"\f")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_LINE_BREAK = re.compile(r"\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+")
+_SEPARATORS = [
+    (_PAGE_BREAK, "\f"),
+    (_PARAGRAPH_BREAK, "\n\n"),
+    (_LINE_BREAK, "\n"),
+    (_SENTENCE_BREAK, " "),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estime le nombre de tokens d'un texte"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Découpe un texte en morceaux d'au plus `max_tokens` tokens estimés
+
+    Les coupures se font de préférence sur les sauts de page, puis sur les
+    paragraphes, les lignes et les phrases ; un bloc indivisible plus grand que
+    le budget est coupé à la taille brute.
+    """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    chunks = [chunk.strip() for chunk in _split(text, max_chars, 0)]
+    return [chunk for chunk in chunks if chunk]
+
+
+def _split(text: str, max_chars: int, level: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+
+    if level >= len(_SEPARATORS):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    pattern, joiner = _SEPARATORS[level]
+    pieces = pattern.split(text)
+    if len(pieces) == 1:
+        return _split(text, max_chars, level + 1)
+
+    # Regrouper les morceaux voisins tant qu'ils tiennent dans le budget
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if len(piece) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split(piece, max_chars, level + 1))
+            continue
+
+        candidate = f"{current}{joiner}{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = piece
+
+    if current:
+        chunks.append(current)
+    return chunks
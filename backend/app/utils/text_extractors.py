@@ -0,0 +1,580 @@
+"""
+Fonctions d'extraction de texte exécutées dans les processus du moteur d'extraction
+
+Ce module est importé par les workers : il ne doit dépendre d'aucun module
+applicatif (configuration, base de données) pour garder des processus légers.
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def extract_image_ocr(file_path: Path) -> Optional[str]:
+    """OCR d'une image (français + anglais), espaces normalisés"""
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        text = pytesseract.image_to_string(image, lang='fra+eng')
+
+    if text:
+        # Remove extra whitespace and normalize
+        text = ' '.join(text.split())
+        return text if text.strip() else None
+    return None
+
+
+def pdf_page_count(file_path: Path) -> int:
+    """Nombre de pages d'un PDF (PyPDF2 si pdfplumber ne peut pas l'ouvrir)"""
+    import pdfplumber
+
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        logger.warning(f"pdfplumber failed, trying PyPDF2: {e}")
+
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _needs_ocr(page, text: str, min_chars: int) -> bool:
+    """Page scannée : pas de couche texte exploitable mais au moins une image"""
+    return len(''.join(text.split())) < min_chars and bool(page.images)
+
+
+def _ocr_page(page, dpi: int) -> Optional[str]:
+    """Rastérise une page pdfplumber et la passe à tesseract"""
+    try:
+        import pytesseract
+    except ImportError:
+        logger.warning("pytesseract not available, scanned PDF page left without OCR")
+        return None
+
+    try:
+        image = page.to_image(resolution=dpi).original
+    except Exception as e:
+        # pdfplumber < 0.10 : rendu via Wand/ImageMagick, souvent absent
+        logger.warning(f"Rastérisation de la page {page.page_number} impossible: {e}")
+        return None
+
+    text = pytesseract.image_to_string(image, lang='fra+eng')
+    return text.strip() if text else None
+
+
+def extract_pdf_pages(
+    file_path: Path,
+    first_page: int,
+    last_page: int,
+    ocr_enabled: bool = True,
+    dpi: int = 300,
+    min_chars: int = 25
+) -> List[Dict[str, Any]]:
+    """
+    Extrait les pages [first_page, last_page) d'un PDF (index à partir de 0)
+
+    La couche texte est lue par pdfplumber (PyPDF2 pour une page ou un fichier
+    qu'il ne sait pas lire) ; seules les pages scannées sont rastérisées et
+    passées à l'OCR. Retourne une entrée {"page", "text", "ocr"} par page.
+    """
+    import pdfplumber
+
+    fallback_reader = None
+
+    def pypdf2_page_text(number: int) -> str:
+        nonlocal fallback_reader
+        try:
+            if fallback_reader is None:
+                import PyPDF2
+                fallback_reader = PyPDF2.PdfReader(str(file_path))
+            return (fallback_reader.pages[number].extract_text() or '').strip()
+        except Exception as e:
+            logger.warning(f"PyPDF2 failed on page {number + 1}: {e}")
+            return ''
+
+    try:
+        pdf = pdfplumber.open(file_path)
+    except Exception as e:
+        logger.warning(f"pdfplumber failed, trying PyPDF2: {e}")
+        return [
+            {"page": number + 1, "text": pypdf2_page_text(number), "ocr": False}
+            for number in range(first_page, last_page)
+        ]
+
+    pages = []
+    with pdf:
+        for number in range(first_page, min(last_page, len(pdf.pages))):
+            page = pdf.pages[number]
+            try:
+                text = (page.extract_text() or '').strip()
+            except Exception as e:
+                logger.warning(f"pdfplumber failed on page {number + 1}, trying PyPDF2: {e}")
+                text = pypdf2_page_text(number)
+
+            used_ocr = False
+            if ocr_enabled and _needs_ocr(page, text, min_chars):
+                ocr_text = _ocr_page(page, dpi)
+                if ocr_text and len(ocr_text) > len(text):
+                    text, used_ocr = ocr_text, True
+
+            pages.append({"page": number + 1, "text": text, "ocr": used_ocr})
+            # Libère les objets mis en cache par pdfplumber pour cette page
+            if hasattr(page, 'flush_cache'):
+                page.flush_cache()
+
+    return pages
+
+
+def extract_docx(file_path: Path) -> str:
+    """Extrait le texte d'un fichier DOCX"""
+    try:
+        from docx import Document
+
+        doc = Document(file_path)
+        text_parts = []
+
+        # Extraire le texte des paragraphes
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                text_parts.append(paragraph.text)
+
+        # Extraire le texte des tableaux
+        for table in doc.tables:
+            for row in table.rows:
+                row_text = []
+                for cell in row.cells:
+                    if cell.text.strip():
+                        row_text.append(cell.text.strip())
+                if row_text:
+                    text_parts.append(" | ".join(row_text))
+
+        return "\n".join(text_parts) if text_parts else ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction DOCX {file_path}: {str(e)}")
+        return ""
+
+
+def extract_doc(file_path: Path) -> str:
+    """Extrait le texte d'un fichier DOC (Word 97-2003)"""
+    try:
+        # Pour les fichiers DOC, on utilise une approche simple
+        # En production, vous pourriez utiliser python-docx2txt ou antiword
+        import subprocess
+
+        # Essayer d'utiliser antiword si disponible
+        try:
+            result = subprocess.run(['antiword', str(file_path)], 
+                                  capture_output=True, text=True, timeout=30)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            pass
+
+        # Fallback: essayer de lire comme texte brut
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                if content.strip():
+                    return content.strip()
+        except:
+            pass
+
+        return f"Document Word (format .doc): {file_path.name}"
+
+    except Exception as e:
+        logger.error(f"Erreur extraction DOC {file_path}: {str(e)}")
+        return ""
+
+
+def _within_budget(lines: Iterable[str], max_rows: int = 0, max_bytes: int = 0) -> Iterator[str]:
+    """Interrompt un flux de lignes au-delà des budgets (0 = illimité), avec une ligne de troncature"""
+    rows = 0
+    size = 0
+    for line in lines:
+        rows += 1
+        size += len(line.encode('utf-8')) + 1
+        if (max_rows and rows > max_rows) or (max_bytes and size > max_bytes):
+            yield f"[... contenu tronqué après {rows - 1} lignes]"
+            return
+        yield line
+
+
+def iter_xlsx_text(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> Iterator[str]:
+    """
+    Texte d'un fichier XLSX ligne par ligne
+
+    Le classeur est ouvert en lecture seule : les lignes sont lues en flux
+    depuis l'archive, sans charger les feuilles en mémoire.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+
+    def lines() -> Iterator[str]:
+        for sheet in workbook.worksheets:
+            has_rows = False
+            for row in sheet.iter_rows(values_only=True):
+                row_text = [str(cell_value).strip() for cell_value in row if cell_value is not None]
+                if row_text:
+                    if not has_rows:
+                        yield f"Feuille: {sheet.title}"
+                        has_rows = True
+                    yield " | ".join(row_text)
+            if has_rows:
+                yield ""  # Ligne vide entre les feuilles
+
+    try:
+        yield from _within_budget(lines(), max_rows, max_bytes)
+    finally:
+        # Le mode lecture seule garde l'archive ouverte jusqu'à la fermeture explicite
+        workbook.close()
+
+
+def iter_xls_text(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> Iterator[str]:
+    """Texte d'un fichier XLS ligne par ligne, une feuille chargée à la fois"""
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+
+    def lines() -> Iterator[str]:
+        for sheet_name in workbook.sheet_names():
+            sheet = workbook.sheet_by_name(sheet_name)
+            has_rows = False
+            for row_idx in range(sheet.nrows):
+                row_text = [str(cell_value).strip() for cell_value in sheet.row_values(row_idx) if cell_value]
+                if row_text:
+                    if not has_rows:
+                        yield f"Feuille: {sheet_name}"
+                        has_rows = True
+                    yield " | ".join(row_text)
+            workbook.unload_sheet(sheet_name)
+            if has_rows:
+                yield ""  # Ligne vide entre les feuilles
+
+    try:
+        yield from _within_budget(lines(), max_rows, max_bytes)
+    finally:
+        workbook.release_resources()
+
+
+def iter_csv_text(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> Iterator[str]:
+    """Texte d'un fichier CSV ligne par ligne, lu en flux"""
+    import csv
+
+    with open(file_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        rows = (" | ".join(cell.strip() for cell in row if cell.strip()) for row in csv.reader(f))
+        yield from _within_budget((row_text for row_text in rows if row_text), max_rows, max_bytes)
+
+
+def extract_xlsx(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> str:
+    """Extrait le texte d'un fichier XLSX (lecture en flux, bornée par les budgets)"""
+    try:
+        return "\n".join(iter_xlsx_text(file_path, max_rows, max_bytes))
+
+    except Exception as e:
+        logger.error(f"Erreur extraction XLSX {file_path}: {str(e)}")
+        return ""
+
+
+def extract_xls(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> str:
+    """Extrait le texte d'un fichier XLS (Excel 97-2003)"""
+    try:
+        return "\n".join(iter_xls_text(file_path, max_rows, max_bytes))
+
+    except Exception as e:
+        logger.error(f"Erreur extraction XLS {file_path}: {str(e)}")
+        return ""
+
+
+def extract_csv(file_path: Path, max_rows: int = 0, max_bytes: int = 0) -> str:
+    """Extrait le texte d'un fichier CSV"""
+    try:
+        return "\n".join(iter_csv_text(file_path, max_rows, max_bytes))
+
+    except Exception as e:
+        logger.error(f"Erreur extraction CSV {file_path}: {str(e)}")
+        return ""
+
+
+def extract_pptx(file_path: Path) -> str:
+    """Extrait le texte d'un fichier PPTX"""
+    try:
+        from pptx import Presentation
+
+        prs = Presentation(file_path)
+        text_parts = []
+
+        for slide_num, slide in enumerate(prs.slides, 1):
+            slide_text = [f"Diapositive {slide_num}"]
+
+            for shape in slide.shapes:
+                if hasattr(shape, "text") and shape.text.strip():
+                    slide_text.append(shape.text.strip())
+
+            if len(slide_text) > 1:  # Plus que juste le numéro de diapositive
+                text_parts.extend(slide_text)
+                text_parts.append("")  # Ligne vide entre les diapositives
+
+        return "\n".join(text_parts) if text_parts else ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction PPTX {file_path}: {str(e)}")
+        return ""
+
+
+def extract_ppt(file_path: Path) -> str:
+    """Extrait le texte d'un fichier PPT (PowerPoint 97-2003)"""
+    try:
+        # Pour les fichiers PPT, on utilise une approche simple
+        # En production, vous pourriez utiliser python-pptx ou d'autres outils
+        return f"Présentation PowerPoint (format .ppt): {file_path.name}"
+
+    except Exception as e:
+        logger.error(f"Erreur extraction PPT {file_path}: {str(e)}")
+        return ""
+
+
+def extract_pdf(file_path: Path) -> str:
+    """Extrait le texte d'un fichier PDF"""
+    try:
+        import PyPDF2
+
+        text_parts = []
+        with open(file_path, 'rb') as f:
+            pdf_reader = PyPDF2.PdfReader(f)
+
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                page_text = page.extract_text()
+                if page_text.strip():
+                    text_parts.append(f"Page {page_num}:")
+                    text_parts.append(page_text.strip())
+                    text_parts.append("")  # Ligne vide entre les pages
+
+        return "\n".join(text_parts) if text_parts else ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction PDF {file_path}: {str(e)}")
+        return ""
+
+
+def extract_txt(file_path: Path) -> str:
+    """Extrait le texte d'un fichier TXT"""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+            return content.strip() if content.strip() else ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction TXT {file_path}: {str(e)}")
+        return ""
+
+
+def extract_html(file_path: Path) -> str:
+    """Extrait le texte d'un fichier HTML"""
+    try:
+        import re
+
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            html_content = f.read()
+
+        # Supprimer les balises HTML
+        text = re.sub(r'<[^>]+>', ' ', html_content)
+
+        # Supprimer les espaces multiples
+        text = re.sub(r'\s+', ' ', text)
+
+        # Supprimer les entités HTML communes
+        text = text.replace('&nbsp;', ' ')
+        text = text.replace('&amp;', '&')
+        text = text.replace('&lt;', '<')
+        text = text.replace('&gt;', '>')
+        text = text.replace('&quot;', '"')
+        text = text.replace('&#39;', "'")
+
+        return text.strip() if text.strip() else ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction HTML {file_path}: {str(e)}")
+        return ""
+
+
+def extract_rtf(file_path: Path) -> str:
+    """Extrait le texte d'un fichier RTF"""
+    try:
+        import subprocess
+
+        # Essayer d'utiliser untext si disponible
+        try:
+            result = subprocess.run(['untext', str(file_path)], 
+                                  capture_output=True, text=True, timeout=30)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            pass
+
+        # Fallback: essayer de lire comme texte brut
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                if content.strip():
+                    return content.strip()
+        except:
+            pass
+
+        return f"Document RTF: {file_path.name}"
+
+    except Exception as e:
+        logger.error(f"Erreur extraction RTF {file_path}: {str(e)}")
+        return ""
+
+
+def extract_odt(file_path: Path) -> str:
+    """Extrait le texte d'un fichier ODT (OpenDocument Text)"""
+    try:
+        import zipfile
+        import xml.etree.ElementTree as ET
+
+        # Les fichiers ODT sont des archives ZIP
+        with zipfile.ZipFile(file_path, 'r') as zip_file:
+            # Le contenu principal est dans content.xml
+            if 'content.xml' in zip_file.namelist():
+                content_xml = zip_file.read('content.xml')
+
+                # Parser le XML
+                root = ET.fromstring(content_xml)
+
+                # Extraire le texte des éléments text:p (paragraphes)
+                text_parts = []
+                for elem in root.iter():
+                    if elem.tag.endswith('}p'):  # Paragraphes
+                        text = ''.join(elem.itertext()).strip()
+                        if text:
+                            text_parts.append(text)
+
+                return "\n".join(text_parts) if text_parts else ""
+
+        return ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction ODT {file_path}: {str(e)}")
+        return ""
+
+
+def extract_ods(file_path: Path) -> str:
+    """Extrait le texte d'un fichier ODS (OpenDocument Spreadsheet)"""
+    try:
+        import zipfile
+        import xml.etree.ElementTree as ET
+
+        # Les fichiers ODS sont des archives ZIP
+        with zipfile.ZipFile(file_path, 'r') as zip_file:
+            # Le contenu principal est dans content.xml
+            if 'content.xml' in zip_file.namelist():
+                content_xml = zip_file.read('content.xml')
+
+                # Parser le XML
+                root = ET.fromstring(content_xml)
+
+                # Extraire le texte des cellules
+                text_parts = []
+                for elem in root.iter():
+                    if elem.tag.endswith('}table-cell'):  # Cellules
+                        text = ''.join(elem.itertext()).strip()
+                        if text:
+                            text_parts.append(text)
+
+                return " | ".join(text_parts) if text_parts else ""
+
+        return ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction ODS {file_path}: {str(e)}")
+        return ""
+
+
+def extract_odp(file_path: Path) -> str:
+    """Extrait le texte d'un fichier ODP (OpenDocument Presentation)"""
+    try:
+        import zipfile
+        import xml.etree.ElementTree as ET
+
+        # Les fichiers ODP sont des archives ZIP
+        with zipfile.ZipFile(file_path, 'r') as zip_file:
+            # Le contenu principal est dans content.xml
+            if 'content.xml' in zip_file.namelist():
+                content_xml = zip_file.read('content.xml')
+
+                # Parser le XML
+                root = ET.fromstring(content_xml)
+
+                # Extraire le texte des éléments de présentation
+                text_parts = []
+                for elem in root.iter():
+                    if elem.tag.endswith('}p'):  # Paragraphes
+                        text = ''.join(elem.itertext()).strip()
+                        if text:
+                            text_parts.append(text)
+
+                return "\n".join(text_parts) if text_parts else ""
+
+        return ""
+
+    except Exception as e:
+        logger.error(f"Erreur extraction ODP {file_path}: {str(e)}")
+        return ""
+
+
+# Tâches exécutables par le moteur : nom -> fonction (le nom seul traverse la frontière de processus)
+TASKS = {
+    'image_ocr': extract_image_ocr,
+    'pdf_page_count': pdf_page_count,
+    'pdf_pages': extract_pdf_pages,
+    'docx': extract_docx,
+    'doc': extract_doc,
+    'rtf': extract_rtf,
+    'odt': extract_odt,
+    'xlsx': extract_xlsx,
+    'xls': extract_xls,
+    'ods': extract_ods,
+    'csv': extract_csv,
+    'pptx': extract_pptx,
+    'ppt': extract_ppt,
+    'odp': extract_odp,
+    'pdf': extract_pdf,
+    'txt': extract_txt,
+    'html': extract_html,
+    'htm': extract_html,
+}
+
+
+def run_task(task: str, file_path: str, *args):
+    """Point d'entrée des workers"""
+    return TASKS[task](Path(file_path), *args)
+
+
+def init_worker(memory_limit_mb: int = 0, tesseract_cmd: Optional[str] = None) -> None:
+    """Initialise un worker : binaire tesseract et plafond mémoire (POSIX uniquement)"""
+    if tesseract_cmd:
+        try:
+            import pytesseract
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        except ImportError:
+            pass
+
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Windows : pas de RLIMIT_AS, le worker reste isolé mais sans plafond
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Plafond mémoire du worker non appliqué: {e}")
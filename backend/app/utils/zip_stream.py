@@ -0,0 +1,269 @@
+"""
+Archive ZIP générée à la volée, sans fichier temporaire
+
+Chaque entrée est émise dès sa lecture : en-tête local sans CRC ni tailles,
+données, puis descripteur de données (bit 3). Le répertoire central est
+écrit à la fin. ZIP64 est utilisé pour les entrées, offsets et archives
+dépassant 4 Go ou 65535 entrées.
+"""
+
+import logging
+import os
+import stat
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1024 * 1024
+
+# Formats déjà compressés : les recompresser coûte du CPU sans réduire la taille
+STORED_EXTENSIONS = frozenset({
+    # Images
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.avif',
+    # Médias
+    '.mp4', '.m4v', '.mov', '.mkv', '.avi', '.webm', '.wmv', '.flv',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus', '.flac', '.wma',
+    # Archives
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar',
+    # Conteneurs ZIP (Office, OpenDocument)
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub', '.jar'
+})
+
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+_MADE_BY_UNIX = 3 << 8
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_FILECOUNT_LIMIT = 0xFFFF
+# Marge pour l'expansion du deflate sur des données incompressibles
+_ZIP64_ENTRY_THRESHOLD = _ZIP64_LIMIT - 64 * 1024 * 1024
+
+# Bloc final vide d'un flux deflate brut
+_DEFLATE_END = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH)
+
+
+class ZipEntry(NamedTuple):
+    """Fichier à ajouter à l'archive, avec ses métadonnées au moment de la sélection"""
+    path: Path
+    arcname: str
+    size: int
+    mtime: float
+    mode: int
+
+
+class _CentralRecord(NamedTuple):
+    name: bytes
+    method: int
+    dos_time: int
+    dos_date: int
+    crc: int
+    compressed_size: int
+    size: int
+    offset: int
+    mode: int
+    zip64: bool
+
+
+def zip_entry(path: Path, arcname: str, st: Optional[os.stat_result] = None) -> ZipEntry:
+    """Entrée d'archive pour un fichier (chemin interne en séparateurs '/')"""
+    st = st or path.stat()
+    return ZipEntry(path, arcname.replace(os.sep, "/").lstrip("/"), st.st_size, st.st_mtime, stat.S_IMODE(st.st_mode))
+
+
+def _dos_datetime(mtime: float):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    year = min(t.tm_year, 2107)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _deflate_block(data: bytes, level: int) -> bytes:
+    """
+    Compresse un bloc en deflate brut terminé par un vidage synchrone
+
+    Les blocs ainsi produits sont alignés sur l'octet et se concatènent en un
+    flux deflate valide (même principe que pigz) : ils peuvent être compressés
+    en parallèle, au prix d'un dictionnaire repartant de zéro à chaque bloc.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ZipStream:
+    """
+    Itérable d'octets d'une archive ZIP
+
+    Les formats déjà compressés sont stockés tels quels ; les autres sont
+    compressés par blocs, en parallèle dans `executor` s'il est fourni. Un
+    fichier illisible au moment de son tour est ignoré ; une erreur de lecture
+    en cours d'entrée interrompt le flux.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[ZipEntry],
+        executor: Optional[Executor] = None,
+        compress_level: int = 6,
+        max_pending_blocks: int = 8,
+        block_size: int = BLOCK_SIZE
+    ):
+        self.entries = entries
+        self.executor = executor
+        self.compress_level = compress_level
+        self.max_pending_blocks = max(1, max_pending_blocks)
+        self.block_size = block_size
+        self.bytes_written = 0
+        self.files_written = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        records: List[_CentralRecord] = []
+        for entry in self.entries:
+            try:
+                f = open(entry.path, "rb")
+            except OSError as e:
+                logger.warning(f"Impossible d'ajouter le fichier {entry.path} au ZIP: {e}")
+                continue
+
+            with f:
+                record = yield from self._write_entry(f, entry)
+            records.append(record)
+            self.files_written += 1
+
+        yield from self._emit(self._central_directory(records))
+
+    def _emit(self, data: bytes) -> Iterator[bytes]:
+        if data:
+            self.bytes_written += len(data)
+            yield data
+
+    def _write_entry(self, f, entry: ZipEntry):
+        offset = self.bytes_written
+        name = entry.arcname.encode("utf-8")
+        method = _ZIP_STORED if Path(entry.arcname).suffix.lower() in STORED_EXTENSIONS else _ZIP_DEFLATED
+        zip64 = entry.size >= _ZIP64_ENTRY_THRESHOLD
+        dos_time, dos_date = _dos_datetime(entry.mtime)
+
+        # CRC et tailles ne sont connus qu'après les données : ils vont dans le descripteur
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+            header_size = _ZIP64_LIMIT
+        else:
+            extra = b""
+            header_size = 0
+        yield from self._emit(struct.pack(
+            "<IHHHHHIIIHH", 0x04034b50,
+            _VERSION_ZIP64 if zip64 else _VERSION_DEFAULT,
+            _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8, method, dos_time, dos_date,
+            0, header_size, header_size, len(name), len(extra)
+        ) + name + extra)
+
+        crc, size, compressed_size = 0, 0, 0
+        blocks = self._stored_blocks(f, entry.size) if method == _ZIP_STORED else self._deflated_blocks(f, entry.size)
+        for raw, data in blocks:
+            crc = zlib.crc32(raw, crc)
+            size += len(raw)
+            compressed_size += len(data)
+            yield from self._emit(data)
+
+        if zip64:
+            descriptor = struct.pack("<IIQQ", 0x08074b50, crc, compressed_size, size)
+        else:
+            descriptor = struct.pack("<IIII", 0x08074b50, crc, compressed_size, size)
+        yield from self._emit(descriptor)
+
+        return _CentralRecord(name, method, dos_time, dos_date, crc, compressed_size, size, offset, entry.mode, zip64)
+
+    def _read_blocks(self, f, limit: int) -> Iterator[bytes]:
+        """Blocs du fichier, limités à la taille relevée à la sélection (fichier en cours d'écriture)"""
+        remaining = limit
+        while remaining > 0:
+            block = f.read(min(self.block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+    def _stored_blocks(self, f, limit: int):
+        for block in self._read_blocks(f, limit):
+            yield block, block
+
+    def _deflated_blocks(self, f, limit: int):
+        if self.executor is None:
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            for block in self._read_blocks(f, limit):
+                yield block, compressor.compress(block)
+            yield b"", compressor.flush(zlib.Z_FINISH)
+            return
+
+        # Fenêtre de blocs en cours de compression : la mémoire reste bornée
+        pending = deque()
+        try:
+            for block in self._read_blocks(f, limit):
+                pending.append((block, self.executor.submit(_deflate_block, block, self.compress_level)))
+                if len(pending) >= self.max_pending_blocks:
+                    block, future = pending.popleft()
+                    yield block, future.result()
+            while pending:
+                block, future = pending.popleft()
+                yield block, future.result()
+            yield b"", _DEFLATE_END
+        finally:
+            # Client déconnecté : inutile de finir les compressions en attente
+            for _, future in pending:
+                future.cancel()
+
+    def _central_directory(self, records: List[_CentralRecord]) -> bytes:
+        start = self.bytes_written
+        parts = []
+        for record in records:
+            extra_values = []
+            size, compressed_size, offset = record.size, record.compressed_size, record.offset
+            if record.zip64 or size >= _ZIP64_LIMIT or compressed_size >= _ZIP64_LIMIT:
+                extra_values += [size, compressed_size]
+                size = compressed_size = _ZIP64_LIMIT
+            if offset >= _ZIP64_LIMIT:
+                extra_values.append(offset)
+                offset = _ZIP64_LIMIT
+
+            extra = b""
+            if extra_values:
+                extra = struct.pack(f"<HH{len(extra_values)}Q", 0x0001, 8 * len(extra_values), *extra_values)
+            version = _VERSION_ZIP64 if extra_values else _VERSION_DEFAULT
+            parts.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014b50,
+                _MADE_BY_UNIX | version, version,
+                _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8, record.method, record.dos_time, record.dos_date,
+                record.crc, compressed_size, size, len(record.name), len(extra), 0,
+                0, 0, (stat.S_IFREG | record.mode) << 16, offset
+            ) + record.name + extra)
+
+        directory = b"".join(parts)
+        size = len(directory)
+        count = len(records)
+        end = b""
+        if count >= _ZIP_FILECOUNT_LIMIT or start >= _ZIP64_LIMIT or size >= _ZIP64_LIMIT:
+            zip64_end_offset = start + size
+            end += struct.pack(
+                "<IQHHIIQQQQ", 0x06064b50, 44, _MADE_BY_UNIX | _VERSION_ZIP64, _VERSION_ZIP64,
+                0, 0, count, count, size, start
+            )
+            end += struct.pack("<IIQI", 0x07064b50, 0, zip64_end_offset, 1)
+        end += struct.pack(
+            "<IHHHHIIH", 0x06054b50, 0, 0,
+            min(count, _ZIP_FILECOUNT_LIMIT), min(count, _ZIP_FILECOUNT_LIMIT),
+            min(size, _ZIP64_LIMIT), min(start, _ZIP64_LIMIT), 0
+        )
+        return directory + end